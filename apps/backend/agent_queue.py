@@ -0,0 +1,189 @@
+"""
+Indexed escalation work queue.
+
+Waiting escalations are kept in a list sorted by ``escalated_at`` (bisect
+insert/remove, like ``SessionIndex``), so listing is a slice and claiming
+never scans ``human_agent_sessions``. ``claim`` is an atomic check-and-set,
+so two employees can't take the same session; claiming again as the current
+holder succeeds. Claimed escalations that see no agent activity for
+``ESCALATION_CLAIM_TTL_SEC`` are expired by ``expire_claimed`` so abandoned
+claims don't accumulate. The last ``CLOSED_ESCALATIONS_MAX`` closed or
+expired escalations are remembered so an employee can still take one again.
+"""
+import itertools
+import os
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+ESCALATION_CLAIM_TTL_SEC = float(os.getenv("ESCALATION_CLAIM_TTL_SEC", "86400"))
+CLOSED_ESCALATIONS_MAX = int(os.getenv("CLOSED_ESCALATIONS_MAX", "1000"))
+
+CLAIM_OK = "claimed"
+CLAIM_HELD = "held"  # already claimed by the same employee
+CLAIM_CONFLICT = "conflict"
+CLAIM_MISSING = "missing"
+
+
+def _to_epoch(escalated_at: Optional[str]) -> float:
+    if not escalated_at:
+        return time.time()
+    try:
+        return datetime.fromisoformat(escalated_at).timestamp()
+    except ValueError:
+        return time.time()
+
+
+def end_escalation(session: dict, agent_id: str) -> bool:
+    """Hand a chat session back to the bot once its escalation is closed or expired.
+
+    False if the session has since been escalated to a different agent.
+    """
+    if session.get("agent_id") != agent_id:
+        return False
+    session["escalated"] = False
+    session["agent_id"] = None
+    session["escalated_at"] = None
+    session["low_confidence_streak"] = 0
+    return True
+
+
+class EscalationQueue:
+    def __init__(self, closed_max: int = CLOSED_ESCALATIONS_MAX):
+        self._lock = threading.Lock()
+        self._order: List[Tuple[float, int, str]] = []  # sorted (escalated_ts, tiebreak, agent_id)
+        self._tiebreak = itertools.count()
+        self._waiting: Dict[str, dict] = {}  # agent_id -> entry
+        self._claimed: Dict[str, dict] = {}  # agent_id -> entry
+        self._closed: "OrderedDict[str, str]" = OrderedDict()  # agent_id -> session_id, most recent last
+        self._closed_max = max(0, closed_max)
+        self._counters = {"enqueued": 0, "claimed": 0, "completed": 0, "claim_conflicts": 0, "claims_expired": 0}
+        self._wait_total_sec = 0.0
+        self._wait_max_sec = 0.0
+
+    # -------------------------------------------------------------------------
+    # Queue operations
+    # -------------------------------------------------------------------------
+    def enqueue(self, agent_id: str, session_id: str, escalated_at: Optional[str]) -> bool:
+        """Add a waiting escalation. Returns False if it is already queued or claimed."""
+        with self._lock:
+            if agent_id in self._waiting or agent_id in self._claimed:
+                return False
+            self._closed.pop(agent_id, None)
+            key = (_to_epoch(escalated_at), next(self._tiebreak), agent_id)
+            self._waiting[agent_id] = {"agent_id": agent_id, "session_id": session_id,
+                                       "escalated_at": escalated_at, "escalated_ts": key[0], "key": key}
+            insort(self._order, key)
+            self._counters["enqueued"] += 1
+            return True
+
+    def try_claim(self, agent_id: str, claimed_by: Optional[str] = None) -> str:
+        """Atomically move a waiting escalation to claimed.
+
+        Returns CLAIM_OK for a new claim, CLAIM_HELD when ``claimed_by`` already holds it,
+        CLAIM_CONFLICT when someone else does and CLAIM_MISSING when it isn't queued.
+        """
+        with self._lock:
+            entry = self._waiting.pop(agent_id, None)
+            if entry is None:
+                held = self._claimed.get(agent_id)
+                if held is None:
+                    return CLAIM_MISSING
+                if claimed_by is not None and held.get("claimed_by") == claimed_by:
+                    held["last_active_ts"] = time.time()
+                    return CLAIM_HELD
+                self._counters["claim_conflicts"] += 1
+                return CLAIM_CONFLICT
+            self._remove_order(entry["key"])
+            now = time.time()
+            waited = max(0.0, now - entry["escalated_ts"])
+            entry["claimed_by"] = claimed_by
+            entry["claimed_at"] = datetime.now().isoformat()
+            entry["last_active_ts"] = now
+            self._claimed[agent_id] = entry
+            self._counters["claimed"] += 1
+            self._wait_total_sec += waited
+            self._wait_max_sec = max(self._wait_max_sec, waited)
+            return CLAIM_OK
+
+    def claim(self, agent_id: str, claimed_by: Optional[str] = None) -> bool:
+        """True if ``claimed_by`` holds the escalation afterwards (new claim or re-claim)."""
+        return self.try_claim(agent_id, claimed_by) in (CLAIM_OK, CLAIM_HELD)
+
+    def complete(self, agent_id: str) -> bool:
+        """Remove an escalation from the queue whether waiting or claimed."""
+        with self._lock:
+            entry = self._waiting.pop(agent_id, None)
+            if entry is not None:
+                self._remove_order(entry["key"])
+            else:
+                entry = self._claimed.pop(agent_id, None)
+                if entry is None:
+                    return False
+            self._remember_closed(entry)
+            self._counters["completed"] += 1
+            return True
+
+    def expire_claimed(self, idle_sec: float = ESCALATION_CLAIM_TTL_SEC, now: Optional[float] = None) -> List[str]:
+        """Drop claims with no activity for ``idle_sec``; returns their agent ids."""
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = [agent_id for agent_id, entry in self._claimed.items()
+                       if now - entry["last_active_ts"] > idle_sec]
+            for agent_id in expired:
+                self._remember_closed(self._claimed.pop(agent_id))
+            self._counters["claims_expired"] += len(expired)
+        return expired
+
+    # -------------------------------------------------------------------------
+    # Lookups
+    # -------------------------------------------------------------------------
+    def closed_session(self, agent_id: str) -> Optional[str]:
+        """Session id of a recently closed or expired escalation (None if unknown or still open)."""
+        return self._closed.get(agent_id)
+
+    def is_waiting(self, agent_id: str) -> bool:
+        return agent_id in self._waiting
+
+    def claimed_by(self, agent_id: str) -> Optional[str]:
+        entry = self._claimed.get(agent_id)
+        return entry.get("claimed_by") if entry else None
+
+    def waiting(self, limit: Optional[int] = None) -> List[dict]:
+        """Waiting escalations, oldest first."""
+        with self._lock:
+            keys = self._order if limit is None else self._order[:max(0, limit)]
+            return [self._waiting[agent_id] for _, _, agent_id in keys]
+
+    def __len__(self) -> int:
+        return len(self._waiting)
+
+    def _remember_closed(self, entry: dict):
+        self._closed[entry["agent_id"]] = entry["session_id"]
+        self._closed.move_to_end(entry["agent_id"])
+        while len(self._closed) > self._closed_max:
+            self._closed.popitem(last=False)
+
+    def _remove_order(self, key: tuple):
+        i = bisect_left(self._order, key)
+        if i < len(self._order) and self._order[i] == key:
+            del self._order[i]
+
+    # -------------------------------------------------------------------------
+    # Metrics
+    # -------------------------------------------------------------------------
+    def stats(self) -> dict:
+        with self._lock:
+            oldest_ts = self._order[0][0] if self._order else None
+            claimed = self._counters["claimed"]
+            return {
+                "depth": len(self._waiting),
+                "claimed_active": len(self._claimed),
+                "oldest_wait_sec": round(time.time() - oldest_ts, 3) if oldest_ts is not None else 0.0,
+                "avg_wait_to_claim_sec": round(self._wait_total_sec / claimed, 3) if claimed else 0.0,
+                "max_wait_to_claim_sec": round(self._wait_max_sec, 3),
+                **self._counters,
+            }
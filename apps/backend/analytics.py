@@ -0,0 +1,129 @@
+"""
+Incremental conversation analytics rollups.
+
+Chat handlers record events (session started, message, escalation) into an
+in-memory ``RollupAggregator`` keyed by hourly and daily bucket. Every
+``ANALYTICS_FLUSH_SEC`` the accumulated deltas are drained into the
+write-behind queue as ``rollup`` records, which upsert into
+``analytics_rollups`` by adding to the stored counters. Admin endpoints read
+only rollup rows (plus the not-yet-flushed deltas), so a dashboard query costs
+O(buckets) however many conversations there are.
+"""
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+ANALYTICS_FLUSH_SEC = float(os.getenv("ANALYTICS_FLUSH_SEC", "10"))
+
+GRANULARITY_HOUR = "hour"
+GRANULARITY_DAY = "day"
+GRANULARITIES = (GRANULARITY_HOUR, GRANULARITY_DAY)
+
+COUNTERS = (
+    "sessions_started", "user_messages", "bot_messages", "agent_messages",
+    "escalations", "confidence_sum", "confidence_count",
+)
+
+_MESSAGE_COUNTERS = {"user": "user_messages", "assistant": "bot_messages", "agent": "agent_messages"}
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    if granularity == GRANULARITY_HOUR:
+        return ts.replace(minute=0, second=0, microsecond=0)
+    if granularity == GRANULARITY_DAY:
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+
+
+def to_local_naive(ts: Optional[datetime]) -> Optional[datetime]:
+    """Buckets are naive local time (like every ``datetime.now()`` in the app); convert aware bounds to match."""
+    if ts is None or ts.tzinfo is None:
+        return ts
+    return ts.astimezone().replace(tzinfo=None)
+
+
+class RollupAggregator:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, datetime], Dict[str, float]] = {}
+        self.flushed_records = 0
+
+    def _add(self, ts: Optional[datetime], **deltas):
+        ts = ts or datetime.now()
+        with self._lock:
+            for granularity in GRANULARITIES:
+                counters = self._pending.setdefault((granularity, bucket_start(ts, granularity)), dict.fromkeys(COUNTERS, 0))
+                for name, value in deltas.items():
+                    counters[name] += value
+
+    def session_started(self, ts: Optional[datetime] = None):
+        self._add(ts, sessions_started=1)
+
+    def message(self, role: str, confidence: Optional[float] = None, ts: Optional[datetime] = None):
+        counter = _MESSAGE_COUNTERS.get(role)
+        if counter is None:
+            return
+        if confidence is None:
+            self._add(ts, **{counter: 1})
+        else:
+            self._add(ts, **{counter: 1, "confidence_sum": float(confidence), "confidence_count": 1})
+
+    def escalation(self, ts: Optional[datetime] = None):
+        self._add(ts, escalations=1)
+
+    def drain(self) -> List[dict]:
+        """Take the accumulated deltas as rollup records (granularity, bucket_start, counters)."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        records = [{"granularity": g, "bucket_start": b, **counters} for (g, b), counters in sorted(pending.items())]
+        self.flushed_records += len(records)
+        return records
+
+    def pending(self, granularity: str) -> List[dict]:
+        """Unflushed deltas for one granularity (read-only copy)."""
+        with self._lock:
+            return [{"granularity": g, "bucket_start": b, **counters}
+                    for (g, b), counters in sorted(self._pending.items()) if g == granularity]
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._pending)
+        return {"pending_buckets": pending, "flushed_records": self.flushed_records}
+
+
+def _derived(counters: Dict[str, float]) -> dict:
+    return {
+        "sessions_started": int(counters["sessions_started"]),
+        "user_messages": int(counters["user_messages"]),
+        "bot_messages": int(counters["bot_messages"]),
+        "agent_messages": int(counters["agent_messages"]),
+        "escalations": int(counters["escalations"]),
+        "escalation_rate": round(counters["escalations"] / counters["sessions_started"], 4) if counters["sessions_started"] else 0.0,
+        "average_confidence": round(counters["confidence_sum"] / counters["confidence_count"], 4) if counters["confidence_count"] else None,
+    }
+
+
+def merge_rollups(rows: Iterable[dict], pending: Iterable[dict], since: Optional[datetime] = None,
+                  until: Optional[datetime] = None) -> Tuple[List[dict], dict]:
+    """Stored rollup rows plus unflushed deltas: per-bucket metrics (ordered) and totals for the window."""
+    since, until = to_local_naive(since), to_local_naive(until)
+    merged: Dict[datetime, Dict[str, float]] = {}
+    totals = dict.fromkeys(COUNTERS, 0)
+    for row in list(rows) + list(pending):
+        start = row["bucket_start"]
+        if (since is not None and start < since) or (until is not None and start >= until):
+            continue
+        counters = merged.setdefault(start, dict.fromkeys(COUNTERS, 0))
+        for name in COUNTERS:
+            counters[name] += row.get(name) or 0
+            totals[name] += row.get(name) or 0
+    buckets = [{"bucket_start": start.isoformat(), **_derived(merged[start])} for start in sorted(merged)]
+    return buckets, _derived(totals)
+
+
+def default_window(granularity: str, now: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """Last 48 hours for hourly rollups, last 30 days for daily ones."""
+    now = now or datetime.now()
+    span = timedelta(hours=48) if granularity == GRANULARITY_HOUR else timedelta(days=30)
+    return bucket_start(now - span, granularity), now + timedelta(seconds=1)
@@ -1,12 +1,18 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from database import get_db_session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal
 from models import User
+from user_cache import UserCache
 import os
 from dotenv import load_dotenv
 
@@ -18,19 +24,72 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = max(1, int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event loop
+# and caps how many cores a login storm can take from chat traffic.
+_password_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_password_stats_lock = threading.Lock()
+_password_stats = {"hashes": 0, "verifies": 0, "in_flight": 0, "total_ms": 0.0, "max_ms": 0.0, "max_wait_ms": 0.0}
 
 # JWT token bearer
 security = HTTPBearer()
 
+# Resolved users by token subject; see user_cache.py
+user_cache = UserCache()
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash"""
+    """Verify a password against its hash (blocking; use verify_password_async on the event loop)"""
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    """Hash a password"""
+    """Hash a password (blocking; use get_password_hash_async on the event loop)"""
     return pwd_context.hash(password)
 
+async def _run_in_password_pool(counter: str, fn, *args):
+    submitted = time.perf_counter()
+
+    def timed():
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            done = time.perf_counter()
+            with _password_stats_lock:
+                _password_stats[counter] += 1
+                _password_stats["total_ms"] += (done - started) * 1000
+                _password_stats["max_ms"] = max(_password_stats["max_ms"], (done - started) * 1000)
+                _password_stats["max_wait_ms"] = max(_password_stats["max_wait_ms"], (started - submitted) * 1000)
+
+    with _password_stats_lock:
+        _password_stats["in_flight"] += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_password_pool, timed)
+    finally:
+        with _password_stats_lock:
+            _password_stats["in_flight"] -= 1
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password in the bcrypt worker pool"""
+    return await _run_in_password_pool("verifies", verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password in the bcrypt worker pool"""
+    return await _run_in_password_pool("hashes", get_password_hash, password)
+
+def password_pool_stats() -> dict:
+    with _password_stats_lock:
+        ops = _password_stats["hashes"] + _password_stats["verifies"]
+        return {
+            "workers": PASSWORD_HASH_WORKERS,
+            "bcrypt_rounds": BCRYPT_ROUNDS,
+            "avg_ms": round(_password_stats["total_ms"] / ops, 3) if ops else 0.0,
+            **{k: round(v, 3) if isinstance(v, float) else v for k, v in _password_stats.items() if k != "total_ms"},
+        }
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -51,18 +110,48 @@ def verify_token(token: str) -> Optional[dict]:
     except JWTError:
         return None
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
+
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
     """Authenticate a user with email and password"""
-    user = db.query(User).filter(User.email == email).first()
+    user = await get_user_by_email(db, email)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
+        return None
+    return user
+
+async def _resolve_user(email: str) -> Optional[User]:
+    """User for a token subject, from the cache or (on a miss) the database."""
+    user = user_cache.get(email)
+    if user is not None:
+        return user
+    generation = user_cache.generation()
+    async with AsyncSessionLocal() as db:
+        user = await get_user_by_email(db, email)
+    if user is not None:
+        user_cache.put(email, user, generation)  # expire_on_commit=False: attributes stay loaded once detached
+    return user
+
+def invalidate_cached_user(*emails: str):
+    """Forget cached users (call after changing is_active/role); no emails clears everything."""
+    user_cache.invalidate(*emails)
+
+async def user_from_token(token: Optional[str], roles=None) -> Optional[User]:
+    """Active user for a bearer token (e.g. a WebSocket ``?token=``), or None if it doesn't check out."""
+    payload = verify_token(token) if token else None
+    email = payload.get("sub") if payload else None
+    if email is None:
+        return None
+    user = await _resolve_user(email)
+    if user is None or not user.is_active or (roles is not None and user.role not in roles):
         return None
     return user
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db_session)
 ) -> User:
     """Get the current authenticated user from JWT token"""
     credentials_exception = HTTPException(
@@ -84,7 +173,7 @@ def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.email == email).first()
+    user = await _resolve_user(email)
     if user is None:
         raise credentials_exception
     
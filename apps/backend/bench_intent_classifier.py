@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark accuracy and per-message latency of intent routing.
+
+Compares the keyword rules in fast_path with the embedding classifier on a
+held-out set of paraphrases (none of them appear in INTENT_EXAMPLES), using
+the same sentence model the RAG pipeline loads.
+
+    python bench_intent_classifier.py [repeats]
+"""
+
+import os
+import sys
+import time
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fast_path import FastPathRouter, INTENT_GREETING, INTENT_THANKS, INTENT_GOODBYE, INTENT_HUMAN
+from intent_classifier import IntentClassifier, INTENT_QUESTION
+from vectorstore import embedding_model
+
+LABELLED = [
+    ("hey hey", INTENT_GREETING),
+    ("good afternoon folks", INTENT_GREETING),
+    ("hello, is anybody around?", INTENT_GREETING),
+    ("hi! how's it going", INTENT_GREETING),
+    ("thank you kindly", INTENT_THANKS),
+    ("brilliant, that's exactly what I needed", INTENT_THANKS),
+    ("you've been very helpful", INTENT_THANKS),
+    ("many thanks", INTENT_THANKS),
+    ("catch you later", INTENT_GOODBYE),
+    ("ok that's everything, bye now", INTENT_GOODBYE),
+    ("I'll log off now", INTENT_GOODBYE),
+    ("take care", INTENT_GOODBYE),
+    ("could a real person look at this?", INTENT_HUMAN),
+    ("I'd rather chat with one of your staff", INTENT_HUMAN),
+    ("get me someone who can actually help", INTENT_HUMAN),
+    ("please transfer me to a support engineer", INTENT_HUMAN),
+    ("is there an actual human I can message", INTENT_HUMAN),
+    ("do you offer managed kubernetes", INTENT_QUESTION),
+    ("what does a security audit include", INTENT_QUESTION),
+    ("I'm a project manager, what plans do you have?", INTENT_QUESTION),
+    ("my nginx server keeps returning 502", INTENT_QUESTION),
+    ("can you monitor our AWS bill", INTENT_QUESTION),
+    ("hi, do you have a helpdesk for weekends?", INTENT_QUESTION),
+    ("how fast can you respond to an outage", INTENT_QUESTION),
+]
+
+
+def _keyword_intent(router: FastPathRouter, message: str) -> str:
+    return router.classify(message) or INTENT_QUESTION
+
+
+def _embedding_intent(classifier: IntentClassifier, message: str) -> str:
+    prediction = classifier.classify(message)
+    return prediction.intent if prediction else INTENT_QUESTION
+
+
+def _evaluate(name: str, predict, repeats: int):
+    correct = 0
+    start = time.perf_counter()
+    for _ in range(repeats):
+        correct = sum(1 for message, label in LABELLED if predict(message) == label)
+    elapsed_ms = (time.perf_counter() - start) * 1000 / (repeats * len(LABELLED))
+    print(f"{name:<22}{correct:>6}/{len(LABELLED):<6}{correct / len(LABELLED):>10.1%}{elapsed_ms:>14.3f}")
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    router = FastPathRouter()
+    classifier = IntentClassifier(embedding_model)
+
+    start = time.perf_counter()
+    classifier.warm()
+    print(f"Centroid build: {(time.perf_counter() - start) * 1000:.0f} ms  (repeats={repeats})")
+    print("-" * 64)
+    print(f"{'router':<22}{'correct':>13}{'accuracy':>10}{'ms/message':>14}")
+    _evaluate("keywords", lambda m: _keyword_intent(router, m), repeats)
+    _evaluate("embedding centroids", lambda m: _embedding_intent(classifier, m), repeats)
+    _evaluate("keywords + centroids", lambda m: router.classify(m) or _embedding_intent(classifier, m), repeats)
+
+    print("-" * 64)
+    misses = [(m, label, _embedding_intent(classifier, m)) for m, label in LABELLED if _embedding_intent(classifier, m) != label]
+    for message, label, got in misses:
+        print(f"miss: {message!r}  expected={label}  got={got}")
+
+
+if __name__ == "__main__":
+    main()
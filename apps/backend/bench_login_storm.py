@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark chat latency on the event loop during a login storm.
+
+A "chat" coroutine ticks every 10 ms (standing in for WebSocket turns) while
+a burst of concurrent logins verifies bcrypt hashes, first inline on the event
+loop (the old behavior) and then through the auth worker pool. Reports login
+throughput and how late the chat ticks ran.
+
+    BCRYPT_ROUNDS=12 python bench_login_storm.py [logins]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import auth
+
+TICK_SEC = 0.01
+
+
+async def chat_ticker(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK_SEC)
+        lags.append((time.perf_counter() - start - TICK_SEC) * 1000)
+
+
+async def run_storm(logins: int, hashed: str, offload: bool):
+    async def login():
+        if offload:
+            return await auth.verify_password_async("correct horse", hashed)
+        return auth.verify_password("correct horse", hashed)
+
+    stop, lags = asyncio.Event(), []
+    ticker = asyncio.create_task(chat_ticker(stop, lags))
+    await asyncio.sleep(TICK_SEC * 3)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await ticker
+    assert all(results)
+    return logins / elapsed, lags
+
+
+def _pct(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    hashed = auth.get_password_hash("correct horse")
+    print(f"bcrypt rounds: {auth.BCRYPT_ROUNDS}  workers: {auth.PASSWORD_HASH_WORKERS}  logins: {logins}")
+    print("-" * 72)
+    print(f"{'mode':<12}{'logins/s':>12}{'chat p50 ms':>16}{'chat p99 ms':>16}{'chat max ms':>16}")
+    for name, offload in (("inline", False), ("pool", True)):
+        rate, lags = asyncio.run(run_storm(logins, hashed, offload))
+        p50 = statistics.median(lags) if lags else 0.0
+        print(f"{name:<12}{rate:>12,.1f}{p50:>16.2f}{_pct(lags, 0.99):>16.2f}{max(lags, default=0.0):>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark encode/decode throughput of the WebSocket wire format.
+
+Uses the real event shapes sent by the /ws endpoints and compares the
+encoder picked by ws_messages against the stdlib json module.
+
+    python bench_ws_messages.py [iterations]
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import ws_messages
+
+
+def sample_history(n: int = 40) -> list:
+    history = []
+    for i in range(n):
+        history.append({"role": "user", "content": f"Do you offer 24/7 server monitoring for plan {i}?", "timestamp": datetime.now().isoformat()})
+        history.append({
+            "role": "assistant",
+            "content": "Yes. SupportSages provides round-the-clock monitoring with proactive incident response. " * 3,
+            "confidence": 0.82,
+            "timestamp": datetime.now().isoformat(),
+        })
+    return history
+
+
+OUTBOUND_EVENTS = {
+    "bot_message": {
+        "type": "bot_message",
+        "message": "We offer DevOps, CloudOps, SRE and helpdesk services tailored to your stack. " * 2,
+        "escalated": False,
+        "confidence_score": 0.85,
+        "timestamp": datetime.now().isoformat(),
+    },
+    "user_typing": {"type": "user_typing", "session_id": "session_1234abcd", "timestamp": datetime.now().isoformat()},
+    "agent_message": {"type": "agent_message", "message": "Hi, I'm taking over from here.", "agent_id": "agent_1a2b3c4d", "timestamp": datetime.now().isoformat()},
+    "history_snapshot": {"type": "history_snapshot", "session_id": "session_1234abcd", "history": sample_history()},
+}
+
+INBOUND_FRAMES = {
+    "user_message": json.dumps({"type": "user_message", "message": "Can you help me migrate to Kubernetes?"}),
+    "typing": json.dumps({"type": "typing"}),
+    "agent_message": json.dumps({"type": "agent_message", "session_id": "session_1234abcd", "message": "Sure, let me check."}),
+}
+
+
+def _rate(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+    return iterations / elapsed if elapsed > 0 else float("inf")
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"Encoder backend: {ws_messages.JSON_BACKEND}  (iterations={iterations})")
+    print("-" * 72)
+    print(f"{'encode':<20}{'stdlib ops/s':>16}{'fast ops/s':>16}{'speedup':>12}")
+    for name, event in OUTBOUND_EVENTS.items():
+        n = iterations // 20 if name == "history_snapshot" else iterations
+        base = _rate(lambda: json.dumps(event), n)
+        fast = _rate(lambda: ws_messages.encode(event), n)
+        print(f"{name:<20}{base:>16,.0f}{fast:>16,.0f}{fast / base:>11.1f}x")
+
+    print("-" * 72)
+    print(f"{'decode':<20}{'stdlib ops/s':>16}{'typed ops/s':>16}{'speedup':>12}")
+    for name, raw in INBOUND_FRAMES.items():
+        base = _rate(lambda: json.loads(raw), iterations)
+        fast = _rate(lambda: ws_messages.decode_frame(raw), iterations)
+        print(f"{name:<20}{base:>16,.0f}{fast:>16,.0f}{fast / base:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Aggregates for persisted bot test runs.
+
+Every ``/admin/bot/test`` and ``/admin/bot/accuracy-test`` call is stored as a
+``BotTestRun`` with one ``BotTestCase`` per message. The run row carries
+these precomputed aggregates (pass counts, average confidence, latency
+percentiles), so ``/admin/bot/test-history`` can chart trends across runs
+without touching the per-case rows.
+"""
+import math
+from typing import Iterable, List, Sequence
+
+# a case passes when the bot is at least this confident
+BOT_TEST_PASS_CONFIDENCE = 0.6
+
+LATENCY_PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted values (0 for no values)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return float(sorted_values[rank - 1])
+
+
+def case_passed(confidence_score: float) -> bool:
+    return confidence_score >= BOT_TEST_PASS_CONFIDENCE
+
+
+def run_aggregates(confidences: Iterable[float], response_times_ms: Iterable[int]) -> dict:
+    """Columns of a BotTestRun row, computed once when the run is stored."""
+    confidences: List[float] = list(confidences)
+    latencies = sorted(response_times_ms)
+    total = len(confidences)
+    passed = sum(1 for c in confidences if case_passed(c))
+    aggregates = {
+        "total_tests": total,
+        "passed_tests": passed,
+        "failed_tests": total - passed,
+        "accuracy_percentage": passed / total * 100 if total else 0.0,
+        "average_confidence": sum(confidences) / total if total else 0.0,
+        "average_response_ms": sum(latencies) / len(latencies) if latencies else 0.0,
+        "max_response_ms": float(latencies[-1]) if latencies else 0.0,
+    }
+    for pct in LATENCY_PERCENTILES:
+        aggregates[f"p{pct}_response_ms"] = percentile(latencies, pct)
+    return aggregates
@@ -0,0 +1,171 @@
+"""
+Per-session serialization and burst coalescing of bot turns.
+
+At most one bot turn (retrieval + LLM call) runs per session at a time: each
+session with pending work has exactly one driver task that runs its turns in
+order. Messages that arrive while a turn is in flight, or within the short
+``CHAT_COALESCE_WINDOW_SEC`` before it starts, are merged into a single
+follow-up turn; every caller in that batch receives the same result.
+
+In-flight turns are also cancellable:
+
+- a newer message supersedes the running turn (up to ``CHAT_MAX_SUPERSEDES``
+  times in a row, so a chatty customer can't starve their own reply); the
+  cancelled turn's callers are folded into the restarted one.
+- ``cancel()`` drops in-flight and queued work when nobody is left to read
+  the answer (e.g. the customer's socket closed).
+"""
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+CHAT_COALESCE_WINDOW_SEC = float(os.getenv("CHAT_COALESCE_WINDOW_SEC", "0.3"))
+CHAT_SUPERSEDE_IN_FLIGHT = os.getenv("CHAT_SUPERSEDE_IN_FLIGHT", "true").lower() in ("1", "true", "yes")
+CHAT_MAX_SUPERSEDES = int(os.getenv("CHAT_MAX_SUPERSEDES", "2"))
+
+
+class _Batch:
+    __slots__ = ("future", "size", "awaiters")
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.size = 1
+        self.awaiters = 0  # callers blocked on the result (REST); WebSocket callers don't wait
+
+
+class _SessionState:
+    __slots__ = ("next_batch", "driver", "current_batch", "current_task", "supersedes")
+
+    def __init__(self):
+        self.next_batch: Optional[_Batch] = None
+        self.driver: Optional[asyncio.Task] = None
+        self.current_batch: Optional[_Batch] = None
+        self.current_task: Optional[asyncio.Task] = None
+        self.supersedes = 0
+
+
+class SessionTurnCoordinator:
+    def __init__(self, run_turn: Callable[[str], Awaitable[Any]], coalesce_window: float = CHAT_COALESCE_WINDOW_SEC,
+                 supersede: bool = CHAT_SUPERSEDE_IN_FLIGHT, max_supersedes: int = CHAT_MAX_SUPERSEDES):
+        self._run_turn = run_turn
+        self.coalesce_window = coalesce_window
+        self.supersede = supersede
+        self.max_supersedes = max_supersedes
+        self._states: Dict[str, _SessionState] = {}
+        self._counters = {
+            "messages": 0,
+            "turns_run": 0,
+            "llm_calls_saved": 0,
+            "turn_errors": 0,
+            "turns_superseded": 0,
+            "turns_cancelled": 0,
+        }
+
+    def submit_nowait(self, session_id: str) -> asyncio.Future:
+        """Request a bot turn for ``session_id``; the returned future resolves with the turn's result.
+
+        The caller must already have appended its message to the session history.
+        """
+        self._counters["messages"] += 1
+        state = self._states.get(session_id)
+        if state is None:
+            state = self._states[session_id] = _SessionState()
+
+        if state.next_batch is not None:
+            # a turn for this session is still forming; ride along with it
+            state.next_batch.size += 1
+            self._counters["llm_calls_saved"] += 1
+            return state.next_batch.future
+
+        running = state.current_task
+        if (self.supersede and running is not None and not running.done()
+                and state.supersedes < self.max_supersedes):
+            # the in-flight answer is obsolete: restart it with this message included
+            state.supersedes += 1
+            batch = state.next_batch = state.current_batch
+            batch.size += 1
+            running.cancel()
+            self._counters["turns_superseded"] += 1
+            self._counters["llm_calls_saved"] += 1
+            return batch.future
+
+        batch = _Batch(asyncio.get_running_loop().create_future())
+        # callers that don't await the result (WebSocket) must not leave exceptions unretrieved
+        batch.future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        state.next_batch = batch
+        if state.driver is None or state.driver.done():
+            state.driver = asyncio.create_task(self._drive(session_id, state))
+        return batch.future
+
+    async def submit(self, session_id: str) -> Any:
+        future = self.submit_nowait(session_id)
+        state = self._states[session_id]
+        batch = next((b for b in (state.next_batch, state.current_batch) if b is not None and b.future is future), None)
+        if batch is not None:
+            batch.awaiters += 1
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if batch is not None:
+                batch.awaiters -= 1  # a caller that went away no longer pins the turn
+
+    def cancel(self, session_id: str) -> bool:
+        """Abandon queued and in-flight work for a session unless a caller is still waiting on it."""
+        state = self._states.get(session_id)
+        if state is None:
+            return False
+        batches = [b for b in (state.current_batch, state.next_batch) if b is not None]
+        if any(b.awaiters for b in batches):
+            return False
+        state.next_batch = None
+        for b in batches:
+            b.future.cancel()
+        if state.current_task is not None and not state.current_task.done():
+            state.current_task.cancel()
+            self._counters["turns_cancelled"] += 1
+        return True
+
+    async def _drive(self, session_id: str, state: _SessionState):
+        try:
+            # a single driver task per session is what serializes its turns
+            while state.next_batch is not None:
+                # coalescing window: give a burst a moment to land in the same batch
+                if self.coalesce_window > 0:
+                    await asyncio.sleep(self.coalesce_window)
+                batch, state.next_batch = state.next_batch, None
+                if batch is None or batch.future.done():
+                    continue  # cancelled while waiting to start
+
+                task = asyncio.create_task(self._run_turn(session_id))
+                state.current_batch, state.current_task = batch, task
+                await asyncio.wait({task})
+                state.current_batch = state.current_task = None
+
+                if task.cancelled():
+                    # superseded turns were put back as next_batch; anything else was abandoned
+                    if state.next_batch is not batch and not batch.future.done():
+                        batch.future.cancel()
+                    continue
+
+                error = task.exception()
+                if error is not None:
+                    self._counters["turn_errors"] += 1
+                    print(f"[ERROR] Bot turn failed for session {session_id}: {error}")
+                    if not batch.future.done():
+                        batch.future.set_exception(error)
+                else:
+                    self._counters["turns_run"] += 1
+                    if not batch.future.done():
+                        batch.future.set_result(task.result())
+                state.supersedes = 0
+        finally:
+            if self._states.get(session_id) is state and state.next_batch is None:
+                del self._states[session_id]
+
+    def stats(self) -> dict:
+        return {
+            "coalesce_window_sec": self.coalesce_window,
+            "supersede_in_flight": self.supersede,
+            "sessions_in_flight": len(self._states),
+            **self._counters,
+        }
@@ -0,0 +1,211 @@
+"""
+WebSocket connection manager.
+
+Every connection gets a bounded outbound queue drained by its own writer task,
+so broadcasts are plain enqueues and never wait on a slow or dead socket.
+When a queue is full the slow-consumer policy kicks in:
+
+- ``drop_typing`` (default): typing indicators are dropped first, then the
+  connection is disconnected if real messages still don't fit.
+- ``disconnect``: the connection is disconnected as soon as its queue is full.
+"""
+import asyncio
+import os
+from collections import deque
+from typing import Dict, Optional
+
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+WS_SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "drop_typing").strip().lower()
+WS_SEND_TIMEOUT_SEC = float(os.getenv("WS_SEND_TIMEOUT_SEC", "10"))
+
+# close code used when we drop a connection that cannot keep up (1013 = try again later)
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+class _Outbox:
+    """Bounded send queue for a single connection; items are (message, droppable)."""
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.queue: deque = deque()
+        self.wakeup = asyncio.Event()
+        self.closed = False
+        self.writer: Optional[asyncio.Task] = None
+
+    def drop_droppable(self) -> int:
+        kept = deque(item for item in self.queue if not item[1])
+        dropped = len(self.queue) - len(kept)
+        self.queue = kept
+        return dropped
+
+
+class ConnectionManager:
+    def __init__(self, queue_size: int = WS_SEND_QUEUE_SIZE, policy: str = WS_SLOW_CONSUMER_POLICY,
+                 send_timeout: float = WS_SEND_TIMEOUT_SEC):
+        self.active_connections: Dict[str, object] = {}
+        self.session_connections: Dict[str, str] = {}
+        self.agent_connections: Dict[str, str] = {}
+        # watchers that observe a session (admins/employees viewing chat without intervening)
+        self.session_watchers: Dict[str, set] = {}
+        # reverse lookup to clean up on disconnect
+        self.connection_watches_session: Dict[str, str] = {}
+
+        self.queue_size = max(1, queue_size)
+        self.policy = policy if policy in ("drop_typing", "disconnect") else "drop_typing"
+        self.send_timeout = send_timeout
+        self._outboxes: Dict[str, _Outbox] = {}
+        self._counters = {
+            "messages_enqueued": 0,
+            "messages_sent": 0,
+            "typing_dropped": 0,
+            "slow_consumer_disconnects": 0,
+            "send_errors": 0,
+            "peak_queue_depth": 0,
+        }
+
+    async def connect(self, websocket, connection_id: str):
+        await websocket.accept()
+        self.active_connections[connection_id] = websocket
+        outbox = _Outbox(websocket)
+        outbox.writer = asyncio.create_task(self._writer(connection_id, outbox))
+        self._outboxes[connection_id] = outbox
+
+    def disconnect(self, connection_id: str):
+        if connection_id in self.active_connections:
+            del self.active_connections[connection_id]
+
+        outbox = self._outboxes.pop(connection_id, None)
+        if outbox is not None:
+            self._close_outbox(outbox)
+
+        # reverse lookups
+        session_id = None
+        agent_id = None
+        # session client
+        for sid, cid in self.session_connections.items():
+            if cid == connection_id:
+                session_id = sid
+                break
+        # agent client
+        for aid, cid in self.agent_connections.items():
+            if cid == connection_id:
+                agent_id = aid
+                break
+
+        if session_id:
+            del self.session_connections[session_id]
+        if agent_id:
+            del self.agent_connections[agent_id]
+
+        # remove from watchers if present
+        watched_session = self.connection_watches_session.get(connection_id)
+        if watched_session:
+            watchers = self.session_watchers.get(watched_session)
+            if watchers and connection_id in watchers:
+                watchers.discard(connection_id)
+            self.connection_watches_session.pop(connection_id, None)
+
+    # -------------------------------------------------------------------------
+    # Sending (non-blocking enqueues)
+    # -------------------------------------------------------------------------
+    def enqueue(self, message: str, connection_id: str, droppable: bool = False) -> bool:
+        """Queue a message for a connection. Returns False if it was dropped."""
+        outbox = self._outboxes.get(connection_id)
+        if outbox is None or outbox.closed:
+            return False
+
+        if len(outbox.queue) >= self.queue_size:
+            if self.policy == "drop_typing":
+                if droppable:
+                    self._counters["typing_dropped"] += 1
+                    return False
+                self._counters["typing_dropped"] += outbox.drop_droppable()
+            if len(outbox.queue) >= self.queue_size:
+                print(f"[WS][WARN] Slow consumer {connection_id} (queue={len(outbox.queue)}), disconnecting")
+                self._counters["slow_consumer_disconnects"] += 1
+                self._evict(connection_id, outbox)
+                return False
+
+        outbox.queue.append((message, droppable))
+        outbox.wakeup.set()
+        self._counters["messages_enqueued"] += 1
+        if len(outbox.queue) > self._counters["peak_queue_depth"]:
+            self._counters["peak_queue_depth"] = len(outbox.queue)
+        return True
+
+    async def send_personal_message(self, message: str, connection_id: str, droppable: bool = False):
+        self.enqueue(message, connection_id, droppable)
+
+    async def broadcast_to_session(self, message: str, session_id: str, droppable: bool = False):
+        # primary customer connection
+        if session_id in self.session_connections:
+            self.enqueue(message, self.session_connections[session_id], droppable)
+        # any watchers observing this session
+        for cid in list(self.session_watchers.get(session_id, set())):
+            self.enqueue(message, cid, droppable)
+
+    async def broadcast_to_agent(self, message: str, agent_id: str, droppable: bool = False):
+        if agent_id in self.agent_connections:
+            self.enqueue(message, self.agent_connections[agent_id], droppable)
+
+    async def broadcast_to_watchers(self, message: str, session_id: str, droppable: bool = False):
+        for cid in list(self.session_watchers.get(session_id, set())):
+            self.enqueue(message, cid, droppable)
+
+    def publish_to_agents(self, message: str) -> int:
+        """Enqueue a message for every connected agent dashboard; returns how many accepted it."""
+        return sum(1 for cid in list(self.agent_connections.values()) if self.enqueue(message, cid))
+
+    # -------------------------------------------------------------------------
+    # Writer tasks
+    # -------------------------------------------------------------------------
+    async def _writer(self, connection_id: str, outbox: _Outbox):
+        try:
+            while not outbox.closed:
+                if not outbox.queue:
+                    outbox.wakeup.clear()
+                    await outbox.wakeup.wait()
+                    continue
+                message, _ = outbox.queue.popleft()
+                await asyncio.wait_for(outbox.websocket.send_text(message), timeout=self.send_timeout)
+                self._counters["messages_sent"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[WS][WARN] Send to {connection_id} failed: {e}")
+            self._counters["send_errors"] += 1
+            self._evict(connection_id, outbox)
+
+    def _close_outbox(self, outbox: _Outbox):
+        outbox.closed = True
+        outbox.queue.clear()
+        outbox.wakeup.set()
+        writer = outbox.writer
+        if writer is not None and writer is not asyncio.current_task() and not writer.done():
+            writer.cancel()
+
+    def _evict(self, connection_id: str, outbox: _Outbox):
+        """Drop a connection we can no longer deliver to and close its socket."""
+        self.disconnect(connection_id)
+        asyncio.ensure_future(self._safe_close(outbox.websocket))
+
+    @staticmethod
+    async def _safe_close(websocket):
+        try:
+            await websocket.close(code=SLOW_CONSUMER_CLOSE_CODE)
+        except Exception:
+            pass
+
+    # -------------------------------------------------------------------------
+    # Metrics
+    # -------------------------------------------------------------------------
+    def stats(self) -> dict:
+        depths = [len(o.queue) for o in self._outboxes.values()]
+        return {
+            "connections": len(self._outboxes),
+            "queue_size_limit": self.queue_size,
+            "slow_consumer_policy": self.policy,
+            "queued_messages": sum(depths),
+            "max_queue_depth": max(depths) if depths else 0,
+            **self._counters,
+        }
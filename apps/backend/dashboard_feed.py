@@ -0,0 +1,77 @@
+"""
+Push-based dashboard updates for /ws/agent.
+
+After the initial ``agent_status`` snapshot, dashboards receive ``queue_delta``
+events instead of polling ``GET /agent/sessions`` and ``GET /sessions``:
+
+- ``escalated`` / ``taken`` / ``closed`` are pushed immediately.
+- ``message_count`` changes are coalesced per session and flushed every
+  ``DASHBOARD_FLUSH_INTERVAL_SEC`` as one batched event.
+
+Every delta carries a ``version``; a client that sees a gap should reconnect
+to get a fresh snapshot.
+"""
+import asyncio
+import os
+from typing import Callable, Dict, Optional
+
+from ws_messages import encode
+
+DASHBOARD_FLUSH_INTERVAL_SEC = float(os.getenv("DASHBOARD_FLUSH_INTERVAL_SEC", "1.0"))
+
+
+class DashboardFeed:
+    def __init__(self, publish: Callable[[str], int], flush_interval: float = DASHBOARD_FLUSH_INTERVAL_SEC):
+        self._publish = publish
+        self.flush_interval = flush_interval
+        self.version = 0
+        self._pending_counts: Dict[str, int] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._counters = {"deltas_published": 0, "frames_delivered": 0, "message_counts_coalesced": 0}
+
+    def _emit(self, event: dict):
+        self.version += 1
+        event["type"] = "queue_delta"
+        event["version"] = self.version
+        self._counters["deltas_published"] += 1
+        self._counters["frames_delivered"] += self._publish(encode(event))
+
+    # -------------------------------------------------------------------------
+    # Immediate deltas
+    # -------------------------------------------------------------------------
+    def session_escalated(self, agent_id: str, session_id: str, escalated_at: Optional[str], message_count: int):
+        self._emit({"op": "escalated", "agent_id": agent_id, "session_id": session_id,
+                    "escalated_at": escalated_at, "message_count": message_count})
+
+    def session_taken(self, agent_id: str, session_id: str, claimed_by: Optional[str] = None):
+        self._emit({"op": "taken", "agent_id": agent_id, "session_id": session_id, "claimed_by": claimed_by})
+
+    def session_closed(self, agent_id: str, session_id: str):
+        self._emit({"op": "closed", "agent_id": agent_id, "session_id": session_id})
+
+    # -------------------------------------------------------------------------
+    # Coalesced deltas
+    # -------------------------------------------------------------------------
+    def message_count_changed(self, session_id: str, message_count: int):
+        if session_id in self._pending_counts:
+            self._counters["message_counts_coalesced"] += 1
+        self._pending_counts[session_id] = message_count
+        if self._flush_task is None or self._flush_task.done():
+            try:
+                self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+            except RuntimeError:
+                pass  # no loop yet (boot-time restore); flushed with the next change
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        self.flush()
+
+    def flush(self):
+        if not self._pending_counts:
+            return
+        sessions = [{"session_id": sid, "message_count": count} for sid, count in self._pending_counts.items()]
+        self._pending_counts = {}
+        self._emit({"op": "message_count", "sessions": sessions})
+
+    def stats(self) -> dict:
+        return {"version": self.version, "pending_message_counts": len(self._pending_counts), **self._counters}
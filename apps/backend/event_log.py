@@ -0,0 +1,73 @@
+"""
+Per-session, sequence-numbered event log.
+
+Every chat event broadcast for a session (user, bot and agent messages) is
+stamped with a monotonically increasing ``seq`` and the log's ``epoch`` (a
+random id per log instance, so seqs from before a restart or a re-created
+session are never mistaken for current ones) and kept, already encoded, in a
+bounded ring buffer. A client that reconnects with ``last_seq`` and ``epoch``
+is replayed only the frames it missed; if the epoch doesn't match or the gap
+has already fallen out of the buffer the caller falls back to a full history
+snapshot.
+"""
+import os
+import uuid
+from collections import deque
+from typing import List, Optional
+
+from ws_messages import encode
+
+SESSION_EVENT_LOG_SIZE = int(os.getenv("SESSION_EVENT_LOG_SIZE", "200"))
+
+# who an event was delivered to: the customer and watchers, or watchers (and agent) only
+AUDIENCE_SESSION = "session"
+AUDIENCE_WATCHERS = "watchers"
+
+_counters = {"events_logged": 0, "resumes_delta": 0, "resumes_snapshot": 0, "frames_replayed": 0}
+
+
+class SessionEventLog:
+    def __init__(self, maxlen: int = SESSION_EVENT_LOG_SIZE, last_seq: int = 0, epoch: Optional[str] = None):
+        self._events: deque = deque(maxlen=max(1, maxlen))
+        self.last_seq = last_seq
+        self.epoch = epoch or uuid.uuid4().hex[:12]
+
+    def append(self, event: dict, audience: str = AUDIENCE_SESSION) -> str:
+        """Stamp ``event`` with the next seq (and the epoch) and return its encoded frame."""
+        self.last_seq += 1
+        event["seq"] = self.last_seq
+        event["epoch"] = self.epoch
+        frame = encode(event)
+        self._events.append((self.last_seq, audience, frame))
+        _counters["events_logged"] += 1
+        return frame
+
+    def since(self, last_seq: int, epoch: Optional[str], audience: str = AUDIENCE_WATCHERS) -> Optional[List[str]]:
+        """Frames after ``last_seq`` visible to ``audience``, or None if they can't be replayed.
+
+        ``epoch`` must be the one the client's ``last_seq`` came from. Watchers see every
+        event; the customer only sees AUDIENCE_SESSION events.
+        """
+        if epoch != self.epoch:
+            return None  # seq from another log (server restarted, session re-created) or none given
+        if last_seq > self.last_seq or last_seq < 0:
+            return None
+        first_seq = self._events[0][0] if self._events else self.last_seq + 1
+        if last_seq < first_seq - 1:
+            return None  # gap already evicted from the ring buffer
+        return [
+            frame for seq, aud, frame in self._events
+            if seq > last_seq and (audience == AUDIENCE_WATCHERS or aud == AUDIENCE_SESSION)
+        ]
+
+
+def record_resume(frames: Optional[List[str]]):
+    if frames is None:
+        _counters["resumes_snapshot"] += 1
+    else:
+        _counters["resumes_delta"] += 1
+        _counters["frames_replayed"] += len(frames)
+
+
+def stats() -> dict:
+    return {"ring_size": SESSION_EVENT_LOG_SIZE, **_counters}
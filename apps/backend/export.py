@@ -0,0 +1,68 @@
+"""
+Streaming NDJSON export of conversations and transcripts.
+
+Rows arrive in partitions from a server-side cursor (``yield_per``), each
+partition becomes one NDJSON chunk, and the chunk is optionally run through
+a streaming gzip compressor. Nothing holds more than one partition, so memory
+stays flat however many rows are exported.
+"""
+import os
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Callable, Sequence
+
+from ws_messages import encode
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_GZIP_LEVEL = int(os.getenv("EXPORT_GZIP_LEVEL", "6"))
+
+KIND_CONVERSATIONS = "conversations"
+KIND_MESSAGES = "messages"
+EXPORT_KINDS = (KIND_CONVERSATIONS, KIND_MESSAGES)
+
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def conversation_record(row) -> dict:
+    return {
+        "id": row.id,
+        "session_id": row.session_id,
+        "agent_id": row.agent_id,
+        "escalated": bool(row.escalated),
+        "escalated_at": _iso(row.escalated_at),
+        "timestamp": _iso(row.timestamp),
+        "email": row.email,
+        "phone": row.phone,
+        "summary": row.summary,
+    }
+
+
+def message_record(row) -> dict:
+    return {
+        "session_id": row.session_id,
+        "seq": row.seq,
+        "role": row.role,
+        "content": row.content,
+        "confidence": row.confidence,
+        "agent_id": row.agent_id,
+        "timestamp": _iso(row.timestamp),
+    }
+
+
+async def ndjson_chunks(partitions: AsyncIterator[Sequence], to_record: Callable[[object], dict]) -> AsyncIterator[bytes]:
+    """One NDJSON chunk (newline-terminated lines) per partition of rows."""
+    async for rows in partitions:
+        if rows:
+            yield "".join(encode(to_record(row)) + "\n" for row in rows).encode("utf-8")
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes], level: int = EXPORT_GZIP_LEVEL) -> AsyncIterator[bytes]:
+    """Compress a byte stream into a single gzip member, chunk by chunk."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip header + trailer
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
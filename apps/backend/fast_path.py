@@ -0,0 +1,179 @@
+"""
+Pre-LLM router for small talk and explicit human-agent requests.
+
+Greetings, thanks and goodbyes are answered from templates and explicit
+"talk to a human" requests escalate straight away, so none of them pay for a
+retrieval pass or a Groq round trip. Anything else falls through to RAG.
+
+Replies can be overridden with ``FAST_PATH_GREETING_REPLY``,
+``FAST_PATH_THANKS_REPLY`` and ``FAST_PATH_GOODBYE_REPLY``; the whole router
+can be switched off with ``FAST_PATH_ENABLED=false``.
+
+With an ``IntentClassifier`` attached, messages the keyword rules don't
+recognise are also checked against the embedding centroids, which makes
+``route`` blocking (run it in a thread).
+"""
+import os
+import re
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() in ("1", "true", "yes")
+FAST_PATH_CONFIDENCE = float(os.getenv("FAST_PATH_CONFIDENCE", "0.9"))
+# classifier-detected small talk only gets a canned reply when the message is this short
+FAST_PATH_CLASSIFIER_MAX_WORDS = int(os.getenv("FAST_PATH_CLASSIFIER_MAX_WORDS", "8"))
+
+INTENT_GREETING = "greeting"
+INTENT_THANKS = "thanks"
+INTENT_GOODBYE = "goodbye"
+INTENT_HUMAN = "human_agent"
+
+DEFAULT_TEMPLATES = {
+    INTENT_GREETING: os.getenv("FAST_PATH_GREETING_REPLY", "Hello! Welcome to SupportSages. How can I help you today?"),
+    INTENT_THANKS: os.getenv("FAST_PATH_THANKS_REPLY", "You're welcome! Is there anything else I can help you with?"),
+    INTENT_GOODBYE: os.getenv("FAST_PATH_GOODBYE_REPLY", "Thanks for chatting with SupportSages. Have a great day!"),
+}
+
+# -----------------------------------------------------------------------------
+# Human intent & greeting
+# -----------------------------------------------------------------------------
+BRAND_NAME = "supportsages"  # used to prevent 'support' false positives
+
+def is_simple_greeting(message: str) -> bool:
+    msg = message.lower().strip()
+    simple = [
+        "hello","hi","hey","good morning","good afternoon","good evening",
+        "morning","afternoon","evening","yo","sup","hey there","hiya"
+    ]
+    if msg in simple:
+        return True
+    return any(msg.startswith(g) and len(msg) <= len(g) + 5 for g in simple)
+
+_HUMAN_INTENT_PATTERNS = [
+    r"\b(connect|talk|speak)\s+(to|with)\s+(a\s+)?(human|agent|person|representative|rep)\b",
+    r"\b(human|live)\s+(agent|person|representative|rep)\b",
+    r"\b(escalate|escalation|supervisor|manager)\b",
+    r"\b(contact|reach)\s+(customer\s+service|support\s*team|help\s*desk)\b",
+    r"\bneed\s+(help|assistance)\s+from\s+(a\s+)?(person|human|agent)\b",
+]
+_HUMAN_INTENT_RE = re.compile("|".join(_HUMAN_INTENT_PATTERNS), re.IGNORECASE)
+
+def user_wants_human_agent(message: str) -> bool:
+    """
+    True only for explicit human-agent intent; ignores brand token 'SupportSages'.
+    """
+    if not message:
+        return False
+    if is_simple_greeting(message):
+        return False
+
+    msg_lc = message.lower()
+    if BRAND_NAME in msg_lc:
+        msg_lc = msg_lc.replace(BRAND_NAME, "")
+    return bool(_HUMAN_INTENT_RE.search(msg_lc))
+
+
+# Templated replies skip the LLM entirely, so these only match whole messages
+# that carry nothing else ("hi there!", "ok thanks a lot", "bye"), never a
+# greeting followed by a question.
+_FILLER = r"(?:(?:ok|okay|great|cool|perfect|awesome|alright|got it)[ ,]+)?"
+_GREETING_RE = re.compile(
+    r"^(?:hello|hi|hey|hiya|yo|howdy|greetings|good (?:morning|afternoon|evening)|morning|afternoon|evening)"
+    r"(?: (?:there|team|all|everyone|folks|supportsages))?$"
+)
+_THANKS_RE = re.compile(
+    _FILLER + r"(?:thanks?(?: you)?|thank u|thx|ty|cheers|much appreciated|appreciate it)"
+    r"(?: (?:so|very) much| a lot| again| for (?:the|your) help)?$"
+)
+_GOODBYE_RE = re.compile(
+    _FILLER + r"(?:(?:thanks?(?: you)?|thx)[ ,]+)?"
+    r"(?:bye|bye bye|goodbye|good bye|see (?:you|ya)(?: later)?|good night|that'?s all|have a (?:good|great|nice) day)$"
+)
+_TRAILING = re.compile(r"[\s!.,?~:)(]+$")
+
+
+def _normalize(message: str) -> str:
+    msg = " ".join((message or "").lower().split())
+    return _TRAILING.sub("", msg)
+
+
+class FastPathMatch(NamedTuple):
+    intent: str
+    reply: Optional[str]  # None for INTENT_HUMAN; the caller escalates
+    confidence: float
+
+
+class FastPathRouter:
+    def __init__(self, templates: Optional[Dict[str, str]] = None, enabled: bool = FAST_PATH_ENABLED,
+                 confidence: float = FAST_PATH_CONFIDENCE, classifier=None,
+                 classifier_max_words: int = FAST_PATH_CLASSIFIER_MAX_WORDS):
+        self.templates = {**DEFAULT_TEMPLATES, **(templates or {})}
+        self.enabled = enabled
+        self.confidence = confidence
+        self.classifier = classifier
+        self.classifier_max_words = classifier_max_words
+        self._lock = threading.Lock()
+        self._hits = {INTENT_GREETING: 0, INTENT_THANKS: 0, INTENT_GOODBYE: 0, INTENT_HUMAN: 0}
+        self._counters = {"turns": 0, "misses": 0, "classifier_hits": 0}
+
+    def classify(self, message: str) -> Optional[str]:
+        if user_wants_human_agent(message):
+            return INTENT_HUMAN
+        msg = _normalize(message)
+        if _GREETING_RE.match(msg):
+            return INTENT_GREETING
+        if _GOODBYE_RE.match(msg):
+            return INTENT_GOODBYE
+        if _THANKS_RE.match(msg):
+            return INTENT_THANKS
+        return None
+
+    def route(self, messages: List[str]) -> Optional[FastPathMatch]:
+        """Route the pending user messages of one bot turn, or return None to fall through to RAG.
+
+        An explicit human request anywhere in the batch escalates; a templated reply is only
+        used when every pending message is small talk (the last one picks the template).
+        """
+        if not self.enabled or not messages:
+            return None
+        intents = [self.classify(m) for m in messages]
+        from_classifier = False
+        if self.classifier is not None and INTENT_HUMAN not in intents and None in intents:
+            unmatched = [i for i, intent in enumerate(intents) if intent is None]
+            predictions = self.classifier.classify_batch([messages[i] for i in unmatched])
+            for i, prediction in zip(unmatched, predictions):
+                intents[i] = self._accept(messages[i], prediction)
+            from_classifier = any(intents[i] for i in unmatched)
+
+        with self._lock:
+            self._counters["turns"] += 1
+            if INTENT_HUMAN in intents:
+                intent = INTENT_HUMAN
+            elif all(intents) and self.templates.get(intents[-1]):
+                intent = intents[-1]
+            else:
+                self._counters["misses"] += 1
+                return None
+            self._hits[intent] += 1
+            if from_classifier:
+                self._counters["classifier_hits"] += 1
+        return FastPathMatch(intent, self.templates.get(intent), self.confidence)
+
+    def _accept(self, message: str, prediction) -> Optional[str]:
+        if prediction is None or prediction.intent not in self._hits:
+            return None
+        if prediction.intent != INTENT_HUMAN and len(message.split()) > self.classifier_max_words:
+            return None  # longer messages probably carry a question too; let the LLM answer
+        return prediction.intent
+
+    def stats(self) -> dict:
+        turns = self._counters["turns"]
+        hits = sum(self._hits.values())
+        return {
+            "enabled": self.enabled,
+            "turns": turns,
+            "hits": dict(self._hits),
+            "misses": self._counters["misses"],
+            "classifier_hits": self._counters["classifier_hits"],
+            "hit_rate": round(hits / turns, 4) if turns else 0.0,
+        }
@@ -17,19 +17,32 @@ groq_llm = ChatGroq(
     model=os.getenv("GROQ_MODEL", "llama3-8b-8192"),
 )
 
-def chat_with_groq(messages: list):
+def _to_lc_messages(messages: list) -> list:
     lc_messages = []
     for m in messages:
         if m["role"] == "system":
             lc_messages.append(SystemMessage(content=m["content"]))
         elif m["role"] == "user":
             lc_messages.append(HumanMessage(content=m["content"]))
+    return lc_messages
+
+def chat_with_groq(messages: list):
+    lc_messages = _to_lc_messages(messages)
 
     print("[INFO] Invoking Groq LLM...")
     response = groq_llm.invoke(lc_messages)
     print("[DEBUG] Groq response received.")
     return response
 
+async def achat_with_groq(messages: list):
+    """Async variant of chat_with_groq; cancelling the awaiting task aborts the upstream request."""
+    lc_messages = _to_lc_messages(messages)
+
+    print("[INFO] Invoking Groq LLM (async)...")
+    response = await groq_llm.ainvoke(lc_messages)
+    print("[DEBUG] Groq response received.")
+    return response
+
 def get_confidence_score(response_text: str) -> float:
     """
     Extract confidence score from LLM response.
@@ -0,0 +1,107 @@
+"""
+Idempotency-Key support for retried requests.
+
+A retry carrying the same key either joins the still-running original request
+or gets the stored response back, without re-running the handler. Completed
+responses are kept as plain JSON-safe records that expire after
+``IDEMPOTENCY_TTL_SEC``.
+
+By default records live in a per-process ``OrderedDict`` bounded to
+``IDEMPOTENCY_MAX_KEYS``, so a retry that lands on another replica runs the
+handler again. Any mapping with the same get/set/delete semantics can be
+passed in as ``records`` to share them. For such a mapping an expired record
+is only deleted when its key is read again, and ``max_keys`` is not applied,
+so size the mapping with its own eviction policy (e.g. a store with native
+TTLs).
+"""
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, MutableMapping, Optional, Tuple
+
+IDEMPOTENCY_TTL_SEC = float(os.getenv("IDEMPOTENCY_TTL_SEC", "600"))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+
+
+class IdempotencyKeyReused(Exception):
+    """The key was already used for a request with a different payload."""
+
+
+def fingerprint(*parts: Optional[str]) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update((part or "").encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class IdempotencyStore:
+    def __init__(self, ttl: float = IDEMPOTENCY_TTL_SEC, max_keys: int = IDEMPOTENCY_MAX_KEYS,
+                 records: Optional[MutableMapping[str, dict]] = None):
+        self.ttl = ttl
+        self.max_keys = max(1, max_keys)
+        self._records: MutableMapping[str, dict] = records if records is not None else OrderedDict()
+        self._inflight: Dict[str, Tuple[str, asyncio.Task]] = {}
+        self._counters = {"executed": 0, "replayed": 0, "joined": 0, "conflicts": 0, "evicted": 0}
+
+    async def run(self, key: str, request_fingerprint: str, handler: Callable[[], Awaitable[dict]]) -> Tuple[dict, bool]:
+        """Run ``handler`` once per key. Returns (response, replayed)."""
+        self._expire()
+
+        record = self._records.get(key)
+        if record is not None:
+            if record["expires_at"] > time.time():
+                self._check(record["fingerprint"], request_fingerprint)
+                self._counters["replayed"] += 1
+                return record["response"], True
+            self._records.pop(key, None)  # expired; any mapping, not just the default one
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._check(inflight[0], request_fingerprint)
+            self._counters["joined"] += 1
+            return await asyncio.shield(inflight[1]), True
+
+        # run in its own task so a retry can join even if the original client goes away
+        task = asyncio.ensure_future(handler())
+        self._inflight[key] = (request_fingerprint, task)
+        self._counters["executed"] += 1
+        task.add_done_callback(lambda t: self._finish(key, request_fingerprint, t))
+        return await asyncio.shield(task), False
+
+    def _finish(self, key: str, request_fingerprint: str, task: asyncio.Task):
+        # runs when the handler task ends, even if the caller that started it was cancelled
+        if self._inflight.get(key, (None, None))[1] is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is None:
+            self._store(key, request_fingerprint, task.result())
+
+    def _check(self, stored: str, incoming: str):
+        if stored != incoming:
+            self._counters["conflicts"] += 1
+            raise IdempotencyKeyReused()
+
+    def _store(self, key: str, request_fingerprint: str, response: dict):
+        self._records[key] = {"fingerprint": request_fingerprint, "response": response, "expires_at": time.time() + self.ttl}
+        if isinstance(self._records, OrderedDict):
+            self._records.move_to_end(key)
+            while len(self._records) > self.max_keys:
+                self._records.popitem(last=False)
+                self._counters["evicted"] += 1
+
+    def _expire(self):
+        # records are stored with a fixed TTL, so the oldest insertion expires first;
+        # other mappings can't be walked in insertion order and are expired on read in run()
+        if not isinstance(self._records, OrderedDict):
+            return
+        now = time.time()
+        while self._records:
+            key, record = next(iter(self._records.items()))
+            if record["expires_at"] > now:
+                break
+            del self._records[key]
+
+    def stats(self) -> dict:
+        return {"ttl_sec": self.ttl, "stored": len(self._records), "inflight": len(self._inflight), **self._counters}
@@ -0,0 +1,149 @@
+"""
+Embedding-based intent classifier for customer messages.
+
+Catches the paraphrases the keyword rules in fast_path miss ("could a real
+person look at this?", "cheers, that sorted it"). It reuses the sentence
+embedding model already loaded for RAG: every intent is represented by the
+normalised mean (centroid) of its example utterances, computed once, so
+classifying a message costs one embedding plus a single matrix-vector dot
+product against the centroid matrix.
+
+A prediction is only returned when the best centroid clears
+``INTENT_MIN_SCORE`` and beats the runner-up by ``INTENT_MIN_MARGIN``; the
+``support_question`` class exists to absorb genuine questions.
+"""
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from fast_path import INTENT_GREETING, INTENT_THANKS, INTENT_GOODBYE, INTENT_HUMAN
+
+INTENT_CLASSIFIER_ENABLED = os.getenv("INTENT_CLASSIFIER_ENABLED", "true").lower() in ("1", "true", "yes")
+INTENT_MIN_SCORE = float(os.getenv("INTENT_MIN_SCORE", "0.55"))
+INTENT_MIN_MARGIN = float(os.getenv("INTENT_MIN_MARGIN", "0.08"))
+
+INTENT_QUESTION = "support_question"
+
+INTENT_EXAMPLES: Dict[str, List[str]] = {
+    INTENT_GREETING: [
+        "hello", "hi there", "hey", "good morning", "good evening", "hiya",
+        "hello, anyone there?", "hi team", "greetings", "hey, how are you?",
+    ],
+    INTENT_THANKS: [
+        "thank you", "thanks a lot", "thanks for your help", "cheers, that helps",
+        "much appreciated", "great, thanks", "that was helpful, thank you",
+        "thanks, that sorted it", "awesome thank you so much", "appreciate the help",
+    ],
+    INTENT_GOODBYE: [
+        "bye", "goodbye", "see you later", "that's all for now", "have a nice day",
+        "ok bye", "talk to you later", "I'm done, thanks bye", "nothing else, bye",
+        "good night",
+    ],
+    INTENT_HUMAN: [
+        "I want to talk to a human", "can I speak with a real person",
+        "connect me to an agent", "put me through to customer service",
+        "I need a live representative", "let me talk to someone from your team",
+        "is there a real person I can chat with", "transfer me to support staff",
+        "this bot isn't helping, get me a person", "can a human look at my issue",
+        "I'd like to speak to your manager", "call me back, I need an engineer",
+    ],
+    INTENT_QUESTION: [
+        "what services do you offer", "how much does DevOps support cost",
+        "do you provide 24/7 server monitoring", "can you help migrate to Kubernetes",
+        "what is your SLA for incident response", "do you do penetration testing",
+        "my website is down, what should I do", "how do I set up a CI/CD pipeline",
+        "do you support AWS and Azure", "tell me about your helpdesk outsourcing",
+        "hi, what are your pricing plans", "thanks, but how do I reset my server password",
+        "what is VAPT", "how does cloud cost optimization work",
+    ],
+}
+
+
+class IntentPrediction(NamedTuple):
+    intent: str
+    score: float
+    margin: float
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+class IntentClassifier:
+    def __init__(self, embeddings, examples: Optional[Dict[str, List[str]]] = None,
+                 min_score: float = INTENT_MIN_SCORE, min_margin: float = INTENT_MIN_MARGIN):
+        """``embeddings`` is any LangChain-style embedder (``embed_query`` / ``embed_documents``)."""
+        self._embeddings = embeddings
+        self.examples = examples or INTENT_EXAMPLES
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self._labels: List[str] = list(self.examples)
+        self._centroids: Optional[np.ndarray] = None  # (n_intents, dim), rows L2-normalised
+        self._build_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._counters = {"classified": 0, "predicted": 0, "below_threshold": 0}
+        self._latency_total_ms = 0.0
+
+    def warm(self):
+        """Compute the centroids now instead of on the first message."""
+        if self._centroids is not None:
+            return
+        with self._build_lock:
+            if self._centroids is not None:
+                return
+            centroids = []
+            for label in self._labels:
+                vectors = _normalize_rows(np.asarray(self._embeddings.embed_documents(self.examples[label]), dtype=np.float32))
+                centroids.append(vectors.mean(axis=0))
+            self._centroids = _normalize_rows(np.vstack(centroids))
+            print(f"[INFO] Intent centroids ready: {len(self._labels)} intents, dim={self._centroids.shape[1]}")
+
+    def scores(self, message: str) -> Dict[str, float]:
+        self.warm()
+        query = _normalize_rows(np.asarray(self._embeddings.embed_query(message), dtype=np.float32))
+        return dict(zip(self._labels, (self._centroids @ query).tolist()))
+
+    def classify(self, message: str) -> Optional[IntentPrediction]:
+        """Blocking (runs the embedding model); call via asyncio.to_thread from handlers."""
+        return self.classify_batch([message])[0]
+
+    def classify_batch(self, messages: List[str]) -> List[Optional[IntentPrediction]]:
+        if not messages:
+            return []
+        self.warm()
+        start = time.perf_counter()
+        queries = _normalize_rows(np.asarray(self._embeddings.embed_documents(messages), dtype=np.float32))
+        sims = queries @ self._centroids.T  # (n_messages, n_intents)
+
+        top2 = np.argsort(sims, axis=1)[:, -2:]
+        out: List[Optional[IntentPrediction]] = []
+        for row, (second, best) in zip(sims, top2):
+            score = float(row[best])
+            margin = score - float(row[second])
+            if score >= self.min_score and margin >= self.min_margin:
+                out.append(IntentPrediction(self._labels[best], score, margin))
+            else:
+                out.append(None)
+
+        predicted = sum(1 for p in out if p is not None)
+        with self._stats_lock:
+            self._counters["classified"] += len(messages)
+            self._counters["predicted"] += predicted
+            self._counters["below_threshold"] += len(messages) - predicted
+            self._latency_total_ms += (time.perf_counter() - start) * 1000
+        return out
+
+    def stats(self) -> dict:
+        classified = self._counters["classified"]
+        return {
+            "ready": self._centroids is not None,
+            "intents": self._labels,
+            "min_score": self.min_score,
+            "min_margin": self.min_margin,
+            "avg_latency_ms": round(self._latency_total_ms / classified, 3) if classified else 0.0,
+            **self._counters,
+        }
@@ -1,27 +1,51 @@
-from fastapi import FastAPI, UploadFile, File, WebSocket, WebSocketDisconnect, Depends, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, WebSocket, WebSocketDisconnect, Depends, HTTPException, Header, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import Optional, List, Dict
+import asyncio
 import os
-import re
 import hashlib
 from datetime import datetime, timedelta
-import json
+from itertools import groupby
 import uuid
 
-from database import init_db, get_db_session
-from models import User, Conversation
-from auth import authenticate_user, create_access_token, get_current_user, require_role
+from database import init_db, get_db_session, get_async_db_session, AsyncSessionLocal, async_engine, pool_stats
+from models import User, Conversation, ChatMessage, BotTestRun, BotTestCase, AnalyticsRollup
+from auth import authenticate_user, create_access_token, get_current_user, require_role, get_user_by_email, invalidate_cached_user, user_cache, get_password_hash_async, password_pool_stats, user_from_token
 from schemas import LoginRequest, SignupRequest, Token, UserResponse, UserUpdate, UserCreate, BotTestRequest, BotTestResponse, BotAccuracyTest, BotAccuracyResult, BotValidationRequest
-from groq_client import chat_with_groq, get_confidence_score
-from utils import generate_brief_summary
+from groq_client import chat_with_groq, achat_with_groq, get_confidence_score
+from connections import ConnectionManager
+from typing_throttle import TypingThrottle
+import event_log
+from agent_queue import EscalationQueue, ESCALATION_CLAIM_TTL_SEC, CLAIM_OK, CLAIM_HELD, end_escalation
+from dashboard_feed import DashboardFeed
+from chat_turns import SessionTurnCoordinator
+from persistence import WriteBehindQueue
+from idempotency import IdempotencyStore, IdempotencyKeyReused, fingerprint
+from summaries import SummaryService, SessionSummary
+from search import SEARCH_PAGE_SIZE, SEARCH_SCOPES, SCOPE_CONVERSATIONS, search_query, search_params
+from bot_tests import run_aggregates, case_passed
+from analytics import RollupAggregator, ANALYTICS_FLUSH_SEC, COUNTERS as ROLLUP_COUNTERS, GRANULARITIES, GRANULARITY_HOUR, merge_rollups, default_window, to_local_naive
+from export import EXPORT_BATCH_SIZE, EXPORT_KINDS, KIND_CONVERSATIONS, conversation_record, message_record, ndjson_chunks, gzip_chunks
+from session_index import SessionStore, SESSIONS_PAGE_SIZE, HISTORY_PAGE_SIZE, SORT_ACTIVITY, history_window
+import session_history
+from fast_path import FastPathRouter, INTENT_HUMAN, user_wants_human_agent
+from intent_classifier import IntentClassifier, INTENT_CLASSIFIER_ENABLED
+from event_log import SessionEventLog, AUDIENCE_SESSION, AUDIENCE_WATCHERS
+from ws_messages import (
+    encode, decode_frame, FrameDecodeError,
+    UserMessageFrame, AgentMessageFrame, TypingFrame
+)
+from utils import generate_brief_summary, extend_brief_summary
 
 from scraper import scrape_website, compute_hash, crawl_site
 from vectorstore import (
     index_text, index_documents, extract_text_from_pdf,
-    retrieve_context, get_knowledge_base_stats, get_indexed_documents,
+    embedding_model, retrieve_context, get_knowledge_base_stats, get_indexed_documents,
     clear_knowledge_base as vs_clear
 )
 
@@ -71,80 +95,139 @@ WEBSITE_URL = os.getenv("WEBSITE_URL", "https://www.supportsages.com")
 last_scraped_hash = None
 
 # runtime state
-chat_sessions: Dict[str, dict] = {}
+chat_sessions: Dict[str, dict] = SessionStore()  # dict + ordered indexes for GET /sessions
 human_agent_sessions: Dict[str, dict] = {}
+escalation_queue = EscalationQueue()
+analytics = RollupAggregator()
+summary_service = SummaryService(generate_brief_summary, extend_brief_summary)
+
+
+# sessions restored after a restart keep only this many recent messages in memory
+RESTORE_HISTORY_TAIL = int(os.getenv("RESTORE_HISTORY_TAIL", "50"))
+# escalated conversations fetched per round trip when restoring at boot
+RESTORE_BATCH_SIZE = int(os.getenv("RESTORE_BATCH_SIZE", "1000"))
+
+
+async def append_history(session_id: str, session: dict, message: dict):
+    """Append a message to a session's history, persist it and let dashboards know the count changed.
+
+    If the stored transcript can't be loaded yet, the message stays in memory and is
+    persisted once the load succeeds (its seq isn't known before that).
+    """
+    loaded = await ensure_history_loaded(session_id, session)
+    seq = session_history.next_seq(session)
+    session["history"].append(message)
+    chat_sessions.touch(session_id)
+    analytics.message(message["role"], message.get("confidence"))
+    if loaded:
+        persist_message(session_id, seq, message)
+    dashboard_feed.message_count_changed(session_id, session_history.message_count(session))
+
+
+def persist_message(session_id: str, seq: int, message: dict):
+    if seq == 0:
+        analytics.session_started()
+    persistence_queue.submit("message", {
+        "session_id": session_id,
+        "seq": seq,
+        "role": message["role"],
+        "content": message.get("content") or "",
+        "confidence": message.get("confidence"),
+        "agent_id": message.get("agent_id"),
+        "timestamp": message.get("timestamp")
+    })
+
+
+async def ensure_history_loaded(session_id: str, session: dict) -> bool:
+    """Load the tail of a session's stored transcript the first time the session is touched.
+
+    Only the last RESTORE_HISTORY_TAIL messages come back into memory; ``history_offset``
+    is the seq of ``history[0]`` so new messages continue the stored numbering. Concurrent
+    first touches share one load. Returns False if the load failed; the session then stays
+    unloaded and the next touch retries.
+    """
+    try:
+        await session_history.ensure_loaded(session, lambda: _load_history_tail(session_id, session))
+        return True
+    except Exception as e:
+        print(f"[ERROR] Failed to load transcript for session {session_id}: {e}")
+        return False
+
+
+async def _load_history_tail(session_id: str, session: dict):
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(ChatMessage)
+            .where(ChatMessage.session_id == session_id)
+            .order_by(ChatMessage.seq.desc())
+            .limit(RESTORE_HISTORY_TAIL)
+        )
+        rows = result.scalars().all()
+
+    tail = [(row.seq, message_from_row(row)) for row in reversed(rows)]
+    for seq, message in session_history.restore_tail(session, tail):
+        persist_message(session_id, seq, message)  # appended while earlier loads failed
+    if not tail:
+        return
+    agent_id = session.get("agent_id")
+    if agent_id in human_agent_sessions:
+        human_agent_sessions[agent_id]["history"][:0] = [m.copy() for _, m in tail]
+    print(f"[INFO] Restored {len(tail)} message(s) of session {session_id} (from seq {session['history_offset']})")
+
+
+def message_from_row(row: ChatMessage) -> dict:
+    message = {"role": row.role, "content": row.content, "timestamp": row.timestamp.isoformat() if row.timestamp else None}
+    if row.confidence is not None:
+        message["confidence"] = row.confidence
+    if row.agent_id:
+        message["agent_id"] = row.agent_id
+    return message
+
+
+async def load_history_range(session_id: str, start: int, end: int) -> List[dict]:
+    """Stored messages with seq in [start, end) (older than what's kept in memory)."""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(ChatMessage)
+            .where(ChatMessage.session_id == session_id, ChatMessage.seq >= start, ChatMessage.seq < end)
+            .order_by(ChatMessage.seq)
+        )
+        return [message_from_row(row) for row in result.scalars()]
+
+
+def new_session(escalated: bool = False, agent_id: Optional[str] = None, escalated_at: Optional[str] = None) -> dict:
+    return {
+        "history": [],
+        "escalated": escalated,
+        "agent_id": agent_id,
+        "escalated_at": escalated_at,
+        "confidence_scores": [],
+        "low_confidence_streak": 0,
+        "turn_cursor": 0,  # history index up to which bot turns have answered
+        "history_offset": 0,  # seq of history[0]; older messages stay in the messages table
+        "history_loaded": False,  # False, a loading task, or True (see ensure_history_loaded)
+        "event_log": SessionEventLog(),
+        "summary": SessionSummary(),  # cached per history length, extended incrementally
+        "history_snapshot": None,  # (key, encoded frame), see encode_history_snapshot
+    }
 
 # -----------------------------------------------------------------------------
 # WebSocket connection manager
 # -----------------------------------------------------------------------------
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
-        self.session_connections: Dict[str, str] = {}
-        self.agent_connections: Dict[str, str] = {}
-        # watchers that observe a session (admins/employees viewing chat without intervening)
-        self.session_watchers: Dict[str, set] = {}
-        # reverse lookup to clean up on disconnect
-        self.connection_watches_session: Dict[str, str] = {}
-
-    async def connect(self, websocket: WebSocket, connection_id: str):
-        await websocket.accept()
-        self.active_connections[connection_id] = websocket
-
-    def disconnect(self, connection_id: str):
-        if connection_id in self.active_connections:
-            del self.active_connections[connection_id]
-
-        # reverse lookups
-        session_id = None
-        agent_id = None
-        # session client
-        for sid, cid in self.session_connections.items():
-            if cid == connection_id:
-                session_id = sid
-                break
-        # agent client
-        for aid, cid in self.agent_connections.items():
-            if cid == connection_id:
-                agent_id = aid
-                break
-
-        if session_id:
-            del self.session_connections[session_id]
-        if agent_id:
-            del self.agent_connections[agent_id]
-
-        # remove from watchers if present
-        watched_session = self.connection_watches_session.get(connection_id)
-        if watched_session:
-            watchers = self.session_watchers.get(watched_session)
-            if watchers and connection_id in watchers:
-                watchers.discard(connection_id)
-            self.connection_watches_session.pop(connection_id, None)
-
-    async def send_personal_message(self, message: str, connection_id: str):
-        if connection_id in self.active_connections:
-            await self.active_connections[connection_id].send_text(message)
-
-    async def broadcast_to_session(self, message: str, session_id: str):
-        # primary customer connection
-        if session_id in self.session_connections:
-            connection_id = self.session_connections[session_id]
-            await self.send_personal_message(message, connection_id)
-        # any watchers observing this session
-        for cid in list(self.session_watchers.get(session_id, set())):
-            await self.send_personal_message(message, cid)
-
-    async def broadcast_to_agent(self, message: str, agent_id: str):
-        if agent_id in self.agent_connections:
-            connection_id = self.agent_connections[agent_id]
-            await self.send_personal_message(message, connection_id)
-
-    async def broadcast_to_watchers(self, message: str, session_id: str):
-        for cid in list(self.session_watchers.get(session_id, set())):
-            await self.send_personal_message(message, cid)
-
 manager = ConnectionManager()
+dashboard_feed = DashboardFeed(manager.publish_to_agents)
+
+def encode_history_snapshot(session_id: str, session: dict) -> str:
+    """history_snapshot frame, cached on the session (so it goes away with it) until the history grows."""
+    history = session.get("history", [])
+    key = (len(history), session["event_log"].last_seq)
+    cached = session.get("history_snapshot")
+    if cached and cached[0] == key:
+        return cached[1]
+    frame = encode({"type": "history_snapshot", "session_id": session_id, "history": history,
+                    "seq": key[1], "epoch": session["event_log"].epoch})
+    session["history_snapshot"] = (key, frame)
+    return frame
 
 # -----------------------------------------------------------------------------
 # Auth endpoints (unchanged behavior)
@@ -153,17 +236,168 @@ manager = ConnectionManager()
 @app.get("/health")
 async def health():
     return {"status": "ok"}
+
+
+@app.get("/admin/metrics")
+async def runtime_metrics(current_user: User = Depends(require_role("admin"))):
+    """In-process runtime counters (WebSocket queues, etc.)."""
+    return JSONResponse({"status": "success", "data": {
+        "websocket": manager.stats(),
+        "typing": typing_throttle.stats(),
+        "event_log": event_log.stats(),
+        "escalation_queue": escalation_queue.stats(),
+        "dashboard_feed": dashboard_feed.stats(),
+        "chat_turns": turn_coordinator.stats(),
+        "idempotency": idempotency_store.stats(),
+        "fast_path": fast_path.stats(),
+        "summaries": summary_service.stats(),
+        "persistence": persistence_queue.stats(),
+        "db_pool": pool_stats(),
+        "analytics": analytics.stats(),
+        "auth_user_cache": user_cache.stats(),
+        "password_hashing": password_pool_stats(),
+        "intent_classifier": intent_classifier.stats() if intent_classifier else {"enabled": False},
+    }})
+
+
+@app.post("/admin/persistence/replay")
+async def replay_dead_letters(current_user: User = Depends(require_role("admin"))):
+    """Re-queue conversation writes that were dead-lettered (e.g. after a DB outage)."""
+    replayed = await asyncio.to_thread(persistence_queue.replay_dead_letters)
+    return JSONResponse({"status": "success", "replayed": replayed})
+
+
+@app.get("/admin/search")
+async def search_conversations(
+    q: str,
+    scope: str = SCOPE_CONVERSATIONS,
+    limit: int = SEARCH_PAGE_SIZE,
+    offset: int = 0,
+    current_user: User = Depends(require_role(["admin", "employee"]))
+):
+    """Ranked full-text search over conversation summaries or transcript messages."""
+    if scope not in SEARCH_SCOPES:
+        return JSONResponse({"status": "error", "message": f"scope must be one of {', '.join(SEARCH_SCOPES)}"}, status_code=400)
+    if not q.strip():
+        return JSONResponse({"status": "error", "message": "q must not be empty"}, status_code=400)
+
+    dialect = async_engine.dialect.name
+    try:
+        sql = search_query(dialect, scope)
+    except ValueError as e:
+        return JSONResponse({"status": "error", "message": str(e)}, status_code=501)
+    params, limit = search_params(dialect, q, limit, offset)
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(text(sql), params)).mappings().all()
+
+    results = []
+    for row in rows[:limit]:
+        hit = dict(row)
+        if isinstance(hit.get("timestamp"), datetime):
+            hit["timestamp"] = hit["timestamp"].isoformat()
+        if "escalated" in hit:
+            hit["escalated"] = bool(hit["escalated"])
+        hit["rank"] = round(float(hit["rank"]), 6)
+        results.append(hit)
+    return JSONResponse({
+        "status": "success",
+        "query": q,
+        "scope": scope,
+        "results": results,
+        "next_offset": params["offset"] + limit if len(rows) > limit else None,
+    })
+
+
+@app.get("/admin/analytics")
+async def analytics_rollups(
+    granularity: str = GRANULARITY_HOUR,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: User = Depends(require_role("admin"))
+):
+    """Escalation rate, confidence and message volume per hour/day, read from the rollup table only."""
+    if granularity not in GRANULARITIES:
+        return JSONResponse({"status": "error", "message": f"granularity must be one of {', '.join(GRANULARITIES)}"}, status_code=400)
+    default_since, default_until = default_window(granularity)
+    since, until = to_local_naive(since) or default_since, to_local_naive(until) or default_until
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(AnalyticsRollup)
+            .where(AnalyticsRollup.granularity == granularity,
+                   AnalyticsRollup.bucket_start >= since,
+                   AnalyticsRollup.bucket_start < until)
+            .order_by(AnalyticsRollup.bucket_start)
+        )).scalars().all()
+    stored = [{"bucket_start": row.bucket_start, **{name: getattr(row, name) for name in ROLLUP_COUNTERS}} for row in rows]
+    buckets, totals = merge_rollups(stored, analytics.pending(granularity), since, until)
+    return JSONResponse({"status": "success", "data": {
+        "granularity": granularity,
+        "since": since.isoformat(),
+        "until": until.isoformat(),
+        "buckets": buckets,
+        "totals": totals,
+    }})
+
+
+@app.get("/admin/export/{kind}")
+async def export_ndjson(
+    kind: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    escalated: Optional[bool] = None,
+    gzip: bool = False,
+    current_user: User = Depends(require_role("admin"))
+):
+    """Stream conversations or messages as NDJSON (optionally gzipped), in constant memory."""
+    if kind not in EXPORT_KINDS:
+        return JSONResponse({"status": "error", "message": f"kind must be one of {', '.join(EXPORT_KINDS)}"}, status_code=400)
+
+    if kind == KIND_CONVERSATIONS:
+        model, to_record = Conversation, conversation_record
+        stmt = select(Conversation).order_by(Conversation.id)
+        if escalated is not None:
+            stmt = stmt.where(Conversation.escalated == escalated)
+    else:
+        model, to_record = ChatMessage, message_record
+        stmt = select(ChatMessage).order_by(ChatMessage.session_id, ChatMessage.seq)
+        if escalated is not None:
+            escalated_sessions = select(Conversation.session_id).where(Conversation.escalated == True)
+            in_escalated = ChatMessage.session_id.in_(escalated_sessions)
+            stmt = stmt.where(in_escalated if escalated else ~in_escalated)
+    if since is not None:
+        stmt = stmt.where(model.timestamp >= since)
+    if until is not None:
+        stmt = stmt.where(model.timestamp < until)
+
+    async def partitions():
+        # the session lives as long as the response body; yield_per keeps a server-side cursor open
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+            async for rows in result.scalars().partitions():
+                yield rows
+
+    body = ndjson_chunks(partitions(), to_record)
+    filename = f"{kind}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.ndjson"
+    if gzip:
+        body = gzip_chunks(body)
+        filename += ".gz"
+    return StreamingResponse(
+        body,
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @app.post("/auth/signup", response_model=UserResponse)
-async def signup(user_data: SignupRequest, db: Session = Depends(get_db_session)):
+async def signup(user_data: SignupRequest, db: AsyncSession = Depends(get_async_db_session)):
     if user_data.role == "admin":
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Admin users cannot be created through signup")
 
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = await get_user_by_email(db, user_data.email)
     if existing_user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
 
-    from auth import get_password_hash
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     db_user = User(
         email=user_data.email,
         username=user_data.username,
@@ -171,13 +405,13 @@ async def signup(user_data: SignupRequest, db: Session = Depends(get_db_session)
         role=user_data.role,
         is_verified=True  # demo choice
     )
-    db.add(db_user); db.commit(); db.refresh(db_user)
+    db.add(db_user); await db.commit(); await db.refresh(db_user)
     return db_user
 
 
 @app.post("/auth/login", response_model=Token)
-async def login(login_data: LoginRequest, db: Session = Depends(get_db_session)):
-    user = authenticate_user(db, login_data.email, login_data.password)
+async def login(login_data: LoginRequest, db: AsyncSession = Depends(get_async_db_session)):
+    user = await authenticate_user(db, login_data.email, login_data.password)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect email or password")
     if not user.is_active:
@@ -197,8 +431,9 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
 
 
 @app.get("/admin/users", response_model=List[UserResponse])
-async def get_users(current_user: User = Depends(require_role("admin")), db: Session = Depends(get_db_session)):
-    return db.query(User).all()
+async def get_users(current_user: User = Depends(require_role("admin")), db: AsyncSession = Depends(get_async_db_session)):
+    result = await db.execute(select(User))
+    return result.scalars().all()
 
 
 @app.put("/admin/users/{user_id}", response_model=UserResponse)
@@ -206,15 +441,17 @@ async def update_user(
     user_id: int,
     user_update: UserUpdate,
     current_user: User = Depends(require_role("admin")),
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     for field, value in user_update.dict(exclude_unset=True).items():
         setattr(user, field, value)
-    db.commit(); db.refresh(user)
+    await db.commit(); await db.refresh(user)
+    # a cached copy would keep a deactivated user authorized until its TTL ran out
+    invalidate_cached_user(user.email)
     return user
 
 
@@ -222,15 +459,14 @@ async def update_user(
 async def create_user(
     new_user: UserCreate,
     current_user: User = Depends(require_role("admin")),
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """Admin-only: create a new user (employee or admin)."""
-    existing_user = db.query(User).filter(User.email == new_user.email).first()
+    existing_user = await get_user_by_email(db, new_user.email)
     if existing_user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
 
-    from auth import get_password_hash
-    hashed_password = get_password_hash(new_user.password)
+    hashed_password = await get_password_hash_async(new_user.password)
     db_user = User(
         email=new_user.email,
         username=new_user.username,
@@ -240,8 +476,8 @@ async def create_user(
         is_verified=True,
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 # -----------------------------------------------------------------------------
@@ -272,45 +508,6 @@ class SessionStatus(BaseModel):
     escalated_at: Optional[str] = None
     confidence_threshold: float = 0.4
 
-# -----------------------------------------------------------------------------
-# Human intent & greeting (fixed)
-# -----------------------------------------------------------------------------
-BRAND_NAME = "supportsages"  # used to prevent 'support' false positives
-
-def is_simple_greeting(message: str) -> bool:
-    msg = message.lower().strip()
-    simple = [
-        "hello","hi","hey","good morning","good afternoon","good evening",
-        "morning","afternoon","evening","yo","sup","hey there","hiya"
-    ]
-    if msg in simple:
-        return True
-    return any(msg.startswith(g) and len(msg) <= len(g) + 5 for g in simple)
-
-_HUMAN_INTENT_PATTERNS = [
-    r"\b(connect|talk|speak)\s+(to|with)\s+(a\s+)?(human|agent|person|representative|rep)\b",
-    r"\b(human|live)\s+(agent|person|representative|rep)\b",
-    r"\b(escalate|escalation|supervisor|manager)\b",
-    r"\b(contact|reach)\s+(customer\s+service|support\s*team|help\s*desk)\b",
-    r"\bneed\s+(help|assistance)\s+from\s+(a\s+)?(person|human|agent)\b",
-]
-_HUMAN_INTENT_RE = re.compile("|".join(_HUMAN_INTENT_PATTERNS), re.IGNORECASE)
-
-def user_wants_human_agent(message: str) -> bool:
-    """
-    True only for explicit human-agent intent; ignores brand token 'SupportSages'.
-    """
-    if not message:
-        return False
-    if is_simple_greeting(message):
-        return False
-
-    msg_lc = message.lower()
-    if BRAND_NAME in msg_lc:
-        msg_lc = msg_lc.replace(BRAND_NAME, "")
-    return bool(_HUMAN_INTENT_RE.search(msg_lc))
-
-
 # -----------------------------------------------------------------------------
 # Shared system prompt for both REST & WS
 # -----------------------------------------------------------------------------
@@ -340,30 +537,204 @@ End your reply with a confidence score tag exactly like: [CONFIDENCE: 0.85]
 # Conversation persistence helpers
 # -----------------------------------------------------------------------------
 def save_conversation_to_db(summary: str, email: str = None, phone: str = None, agent_id: str = None, session_id: str = None, escalated: bool = False):
-    try:
-        with next(get_db_session()) as db:
-            conversation = Conversation(
-                summary=summary,
-                email=email,
-                phone=phone,
-                agent_id=agent_id,
-                session_id=session_id,
-                escalated=escalated,
-                escalated_at=datetime.now() if escalated else None
-            )
-            db.add(conversation)
-            db.commit()
-            db.refresh(conversation)
-            print(f"[INFO] Conversation saved to database with ID: {conversation.id}")
-            return conversation
-    except Exception as e:
-        print(f"[ERROR] Failed to save conversation to database: {e}")
-        return None
+    """Queue a conversation row; the write-behind worker inserts it off the request path."""
+    persistence_queue.submit("conversation", {
+        "summary": summary,
+        "email": email,
+        "phone": phone,
+        "agent_id": agent_id,
+        "session_id": session_id,
+        "escalated": escalated,
+        "escalated_at": datetime.now().isoformat() if escalated else None
+    })
+
+
+def update_conversation_summary(session_id: str, agent_id: str, summary: str):
+    persistence_queue.submit("conversation_summary", {"session_id": session_id, "agent_id": agent_id, "summary": summary})
+
+
+def upsert_rollups(db: Session, records: List[dict]):
+    """Add rollup deltas to their buckets (INSERT ... ON CONFLICT DO UPDATE col = col + delta)."""
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    # one row per bucket: a single INSERT can't ON CONFLICT-update the same row twice
+    merged: Dict[tuple, dict] = {}
+    for r in records:
+        key = (r["granularity"], r["bucket_start"])
+        if key in merged:
+            for name in ROLLUP_COUNTERS:
+                merged[key][name] += r[name]
+        else:
+            merged[key] = {**r, "bucket_start": datetime.fromisoformat(r["bucket_start"])}
+    stmt = dialect_insert(AnalyticsRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["granularity", "bucket_start"],
+        set_={name: getattr(AnalyticsRollup, name) + getattr(stmt.excluded, name) for name in ROLLUP_COUNTERS},
+    )
+    db.execute(stmt, list(merged.values()))
+
+
+def write_persistence_batch(items: List[tuple]):
+    """Write one write-behind batch in a single transaction (runs on the worker thread).
+
+    Consecutive records of the same kind become one multi-row statement; order across
+    kinds is preserved so a summary update never lands before its conversation row.
+    """
+    with next(get_db_session()) as db:
+        for kind, records in groupby(items, key=lambda item: item[0]):
+            records = [record for _, record in records]
+            if kind == "message":
+                db.execute(insert(ChatMessage), [
+                    {**r, "timestamp": datetime.fromisoformat(r["timestamp"]) if r.get("timestamp") else None}
+                    for r in records
+                ])
+            elif kind == "conversation":
+                db.execute(insert(Conversation), [
+                    {**r, "escalated_at": datetime.fromisoformat(r["escalated_at"]) if r.get("escalated_at") else None}
+                    for r in records
+                ])
+            elif kind == "rollup":
+                upsert_rollups(db, records)
+            elif kind == "conversation_escalation":
+                # closing clears ``escalated`` (escalated_at is kept) so the row isn't restored at boot
+                for r in records:
+                    db.query(Conversation).filter(
+                        Conversation.session_id == r["session_id"],
+                        Conversation.agent_id == r["agent_id"]
+                    ).update({Conversation.escalated: r["escalated"]}, synchronize_session=False)
+            elif kind == "conversation_summary":
+                for r in records:
+                    db.query(Conversation).filter(
+                        Conversation.session_id == r["session_id"],
+                        Conversation.agent_id == r["agent_id"]
+                    ).update({Conversation.summary: r["summary"]}, synchronize_session=False)
+            else:
+                raise ValueError(f"unknown write-behind record kind: {kind}")
+        db.commit()
+
+
+persistence_queue = WriteBehindQueue(write_persistence_batch)
+persistence_queue.start()
+
+
+@app.on_event("startup")
+async def restore_escalated_sessions():
+    # Boot-time restore of escalations (transcripts are loaded lazily per session)
+    await load_escalated_sessions_from_db()
+
+
+def flush_analytics() -> int:
+    records = analytics.drain()
+    for record in records:
+        persistence_queue.submit("rollup", {**record, "bucket_start": record["bucket_start"].isoformat()})
+    return len(records)
+
+
+async def analytics_flush_loop():
+    while True:
+        await asyncio.sleep(ANALYTICS_FLUSH_SEC)
+        flush_analytics()
+
+
+async def expire_claims_loop():
+    # claims nobody has replied on for ESCALATION_CLAIM_TTL_SEC are dropped with their agent session
+    while True:
+        await asyncio.sleep(min(ESCALATION_CLAIM_TTL_SEC, 300))
+        for agent_id in escalation_queue.expire_claimed():
+            await release_agent_session(agent_id)
+
+
+_background_tasks: set = set()
+
+
+@app.on_event("startup")
+async def start_background_loops():
+    for loop in (analytics_flush_loop, expire_claims_loop):
+        task = asyncio.create_task(loop())
+        _background_tasks.add(task)  # keep a reference so the task isn't garbage-collected
+
+
+@app.on_event("shutdown")
+async def flush_persistence_queue():
+    flush_analytics()
+    await asyncio.to_thread(persistence_queue.stop)
+
+
+def claim_agent_session(agent_id: str, claimed_by: Optional[str] = None) -> bool:
+    """Atomically take a waiting escalation; True if ``claimed_by`` holds it afterwards
+    (including when it already did), False if someone else has it."""
+    result = escalation_queue.try_claim(agent_id, claimed_by)
+    if result == CLAIM_OK:
+        human_agent_sessions[agent_id]["status"] = "active"
+        dashboard_feed.session_taken(agent_id, human_agent_sessions[agent_id]["session_id"], claimed_by)
+    return result in (CLAIM_OK, CLAIM_HELD)
+
+
+async def release_agent_session(agent_id: str):
+    """End a closed or abandoned escalation: the customer is handed back to the bot, the
+    conversation row stops being restored as escalated, and human_agent_sessions forgets it
+    (a recently closed one can still be taken again, see reopen_agent_session)."""
+    escalation_queue.complete(agent_id)
+    agent_session = human_agent_sessions.pop(agent_id, None)
+    if agent_session is None:
+        return
+    session_id = agent_session["session_id"]
+    persistence_queue.submit("conversation_escalation", {"session_id": session_id, "agent_id": agent_id, "escalated": False})
+    dashboard_feed.session_closed(agent_id, session_id)
+    session = chat_sessions.get(session_id)
+    if session is not None and end_escalation(session, agent_id):
+        chat_sessions.set_escalated(session_id, False)
+        session["history_snapshot"] = None
+        await manager.broadcast_to_session(encode({
+            "type": "session_status",
+            "escalated": False,
+            "agent_id": None,
+            "seq": session["event_log"].last_seq,
+            "epoch": session["event_log"].epoch
+        }), session_id)
+
+
+def reopen_agent_session(agent_id: str) -> bool:
+    """Put a recently closed escalation back in the queue (e.g. an employee takes it again)."""
+    session_id = escalation_queue.closed_session(agent_id)
+    session = chat_sessions.get(session_id) if session_id else None
+    if session is None or (session.get("escalated") and session.get("agent_id") != agent_id):
+        return False
+    chat_sessions.set_escalated(session_id, True)
+    session["agent_id"] = agent_id
+    session["escalated_at"] = datetime.now().isoformat()
+    human_agent_sessions[agent_id] = {
+        "session_id": session_id,
+        "history": session["history"].copy(),
+        "escalated_at": session["escalated_at"],
+        "status": "waiting"
+    }
+    escalation_queue.enqueue(agent_id, session_id, session["escalated_at"])
+    persistence_queue.submit("conversation_escalation", {"session_id": session_id, "agent_id": agent_id, "escalated": True})
+    dashboard_feed.session_escalated(agent_id, session_id, session["escalated_at"], session_history.message_count(session))
+    return True
+
+
+def list_waiting_sessions() -> List[dict]:
+    """Waiting escalations, oldest first, straight from the queue index."""
+    out = []
+    for entry in escalation_queue.waiting():
+        session = chat_sessions.get(entry["session_id"], {})
+        out.append({
+            "agent_id": entry["agent_id"],
+            "session_id": entry["session_id"],
+            "escalated_at": entry["escalated_at"],
+            "message_count": session_history.message_count(session)
+        })
+    return out
 
 
 def escalate_to_human(session_id: str, session: dict):
-    session["escalated"] = True
+    chat_sessions.set_escalated(session_id, True)
     session["escalated_at"] = datetime.now().isoformat()
+    analytics.escalation()
 
     agent_id = f"agent_{uuid.uuid4().hex[:8]}"
     session["agent_id"] = agent_id
@@ -374,8 +745,15 @@ def escalate_to_human(session_id: str, session: dict):
         "escalated_at": session["escalated_at"],
         "status": "waiting"
     }
-
-    summary = generate_brief_summary(session["history"])
+    if escalation_queue.enqueue(agent_id, session_id, session["escalated_at"]):
+        dashboard_feed.session_escalated(agent_id, session_id, session["escalated_at"], session_history.message_count(session))
+
+    # cached/local summary so the customer's "connecting you" reply never waits on the LLM;
+    # the conversation row is updated once the background LLM summary is ready
+    summary, _, _ = summary_service.summarize(
+        f"escalation:{agent_id}", session["summary"], session["history"],
+        on_llm=lambda text: update_conversation_summary(session_id, agent_id, text)
+    )
     print(f"\n=== URGENT HUMAN ALERT ===")
     print(f"Session ID: {session_id}")
     print(f"Agent ID: {agent_id}")
@@ -386,95 +764,100 @@ def escalate_to_human(session_id: str, session: dict):
     return agent_id
 
 
-def load_escalated_sessions_from_db():
-    try:
-        with next(get_db_session()) as db:
-            rows = db.query(Conversation).filter(
-                Conversation.escalated == True,
-                Conversation.agent_id.isnot(None),
-                Conversation.session_id.isnot(None)
-            ).all()
-
-            for conversation in rows:
-                session_id = conversation.session_id
-                agent_id = conversation.agent_id
-                escalated_at = conversation.escalated_at.isoformat() if conversation.escalated_at else None
+async def load_escalated_sessions_from_db():
+    """Rebuild escalated sessions and the agent queue at boot.
 
-                if session_id not in chat_sessions:
-                    chat_sessions[session_id] = {
-                        "history": [],
-                        "escalated": True,
-                        "agent_id": agent_id,
+    Rows are streamed RESTORE_BATCH_SIZE at a time (server-side cursor on Postgres) in
+    escalation order, reading only the three columns the restore needs through the partial
+    ``ix_conversations_escalated`` index, and the loop yields between batches.
+    """
+    restored = 0
+    try:
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(
+                select(Conversation.session_id, Conversation.agent_id, Conversation.escalated_at)
+                .where(
+                    Conversation.escalated == True,
+                    Conversation.agent_id.isnot(None),
+                    Conversation.session_id.isnot(None)
+                )
+                .order_by(Conversation.escalated_at)
+                .execution_options(yield_per=RESTORE_BATCH_SIZE)
+            )
+            async for rows in result.partitions():
+                for session_id, agent_id, escalated_at in rows:
+                    escalated_at = escalated_at.isoformat() if escalated_at else None
+
+                    if session_id not in chat_sessions:
+                        chat_sessions[session_id] = new_session(escalated=True, agent_id=agent_id, escalated_at=escalated_at)
+                    else:
+                        chat_sessions.set_escalated(session_id, True)
+                        chat_sessions[session_id]["agent_id"] = agent_id
+                        chat_sessions[session_id]["escalated_at"] = escalated_at
+
+                    human_agent_sessions[agent_id] = {
+                        "session_id": session_id,
+                        "history": chat_sessions[session_id]["history"].copy(),
                         "escalated_at": escalated_at,
-                        "confidence_scores": [],
-                        "low_confidence_streak": 0,
+                        "status": "waiting"
                     }
-                else:
-                    chat_sessions[session_id]["escalated"] = True
-                    chat_sessions[session_id]["agent_id"] = agent_id
-                    chat_sessions[session_id]["escalated_at"] = escalated_at
-
-                human_agent_sessions[agent_id] = {
-                    "session_id": session_id,
-                    "history": chat_sessions[session_id]["history"].copy(),
-                    "escalated_at": escalated_at,
-                    "status": "waiting"
-                }
-
-                print(f"[INFO] Restored escalated session: {session_id} -> {agent_id}")
-            print(f"[INFO] Loaded {len(rows)} escalated sessions from database")
+                    escalation_queue.enqueue(agent_id, session_id, escalated_at)
+                    restored += 1
+                await asyncio.sleep(0)  # let other startup work run between batches
+        print(f"[INFO] Loaded {restored} escalated sessions from database")
     except Exception as e:
-        print(f"[ERROR] Failed to load escalated sessions from database: {e}")
+        print(f"[ERROR] Failed to load escalated sessions from database (after {restored}): {e}")
 
 
 # -----------------------------------------------------------------------------
-# REST: Chat (with fixed escalation)
+# Bot turns (shared by REST & WS)
 # -----------------------------------------------------------------------------
-@app.post("/chat")
-async def chat(req: ChatRequest, db: Session = Depends(get_db_session)):
-    session_id = req.session_id
-    user_message = (req.message or "").strip()
-    print(f"[User:{session_id}] {user_message}")
+def pending_user_messages(session: dict) -> List[str]:
+    """User messages not yet answered by a bot turn (more than one after a burst)."""
+    history = session["history"]
+    return [m["content"] for m in history[session.get("turn_cursor", 0):] if m["role"] == "user"]
 
-    # If already escalated, don't route back to LLM
-    if session_id in chat_sessions and chat_sessions[session_id].get("escalated"):
-        user_msg = {"role": "user", "content": user_message, "timestamp": datetime.now().isoformat()}
-        chat_sessions[session_id]["history"].append(user_msg)
-        agent_id = chat_sessions[session_id].get("agent_id")
-        if agent_id and agent_id in human_agent_sessions:
-            human_agent_sessions[agent_id]["history"].append(user_msg)
-            return JSONResponse({"reply": "Your message has been sent to the human agent. They will respond shortly.","escalated": True,"agent_id": agent_id})
-        else:
-            return JSONResponse({"reply": "This conversation has been escalated to a human agent. Please wait for their response.","escalated": True,"agent_id": agent_id})
 
-    # init session
-    if session_id not in chat_sessions:
-        chat_sessions[session_id] = {
-            "history": [],
-            "escalated": False,
-            "agent_id": None,
-            "escalated_at": None,
-            "confidence_scores": [],
-            "low_confidence_streak": 0,
-        }
+async def run_bot_turn(session_id: str) -> dict:
+    """One retrieval + LLM round trip covering every pending user message of the session.
 
+    The turn may be cancelled while awaiting retrieval or the LLM (superseded by a newer
+    message, or the customer left); nothing is committed to the session before that point.
+    """
     session = chat_sessions[session_id]
+    if session.get("escalated"):
+        # escalated while this turn was queued; the agent takes it from here
+        return {"reply": "This conversation has been escalated to a human agent. Please wait for their response.", "escalated": True, "agent_id": session.get("agent_id"), "session_id": session_id}
 
-    # history append
-    user_msg = {"role": "user", "content": user_message, "timestamp": datetime.now().isoformat()}
-    session["history"].append(user_msg)
+    turn_end = len(session["history"])
+    pending = pending_user_messages(session)
+    user_message = "\n".join(pending)
 
-    # RAG
-    retrieved_docs = retrieve_context(user_message, k=4)
+    # greetings, thanks/goodbye and explicit human requests skip retrieval and the LLM
+    if fast_path.classifier is not None:
+        route = await asyncio.to_thread(fast_path.route, pending)
+    else:
+        route = fast_path.route(pending)
+    if route is not None:
+        session["turn_cursor"] = turn_end
+        print(f"[FAST_PATH] {route.intent} (session={session_id})")
+        if route.intent == INTENT_HUMAN:
+            print("[ESCALATE]", "explicit_user_request")
+            return await escalate_turn(session_id, session, route.confidence)
+        return await send_bot_reply(session_id, session, route.reply, route.confidence)
+
+    # RAG (off the event loop)
+    retrieved_docs = await asyncio.to_thread(retrieve_context, user_message, 4)
     context_text = "\n".join([doc.page_content for doc in retrieved_docs])
 
     # prompt
     system_prompt = build_system_prompt(context_text)
-    messages = [{"role": "system", "content": system_prompt}] + session["history"]
+    messages = [{"role": "system", "content": system_prompt}] + session["history"][:turn_end]
 
-    # LLM call
-    response = chat_with_groq(messages)
+    # LLM call (async so cancellation aborts the upstream request)
+    response = await achat_with_groq(messages)
     bot_reply = response.content.strip()
+    session["turn_cursor"] = turn_end
 
     # confidence
     confidence_score = get_confidence_score(bot_reply)
@@ -512,10 +895,33 @@ async def chat(req: ChatRequest, db: Session = Depends(get_db_session)):
 
     if should_escalate and not session["escalated"]:
         print("[ESCALATE]", "explicit_user_request" if explicit_intent else f"auto_low_conf (conf={confidence:.2f}, streak={streak}, ctx_empty={context_is_empty})")
-        agent_id = escalate_to_human(session_id, session)
-        bot_reply_clean = f"Thank you. I'm connecting you to a human agent now. Your session ID is: {session_id}"
-        return JSONResponse({"reply": bot_reply_clean, "escalated": True, "agent_id": agent_id, "confidence_score": confidence, "session_id": session_id})
+        return await escalate_turn(session_id, session, confidence)
+
+    return await send_bot_reply(session_id, session, bot_reply_clean, confidence)
 
+
+async def escalate_turn(session_id: str, session: dict, confidence: float) -> dict:
+    agent_id = escalate_to_human(session_id, session)
+    bot_reply_clean = f"Thank you. I'm connecting you to a human agent now. Your session ID is: {session_id}"
+    await manager.broadcast_to_session(session["event_log"].append({
+        "type": "bot_message",
+        "message": bot_reply_clean,
+        "escalated": True,
+        "agent_id": agent_id,
+        "confidence_score": confidence
+    }), session_id)
+
+    # notify agent
+    await manager.broadcast_to_agent(encode({
+        "type": "new_escalated_session",
+        "session_id": session_id,
+        "agent_id": agent_id,
+        "message": f"New escalated session: {session_id}"
+    }), agent_id)
+    return {"reply": bot_reply_clean, "escalated": True, "agent_id": agent_id, "confidence_score": confidence, "session_id": session_id}
+
+
+async def send_bot_reply(session_id: str, session: dict, bot_reply_clean: str, confidence: float) -> dict:
     # record bot message
     bot_msg = {
         "role": "assistant",
@@ -523,15 +929,136 @@ async def chat(req: ChatRequest, db: Session = Depends(get_db_session)):
         "confidence": confidence,
         "timestamp": datetime.now().isoformat()
     }
-    session["history"].append(bot_msg)
+    await append_history(session_id, session, bot_msg)
     session["confidence_scores"].append(confidence)
 
-    return JSONResponse({"reply": bot_reply_clean, "escalated": False, "confidence_score": confidence, "session_id": session_id})
+    # send bot reply to the customer widget and watchers
+    await manager.broadcast_to_session(session["event_log"].append({
+        "type": "bot_message",
+        "message": bot_reply_clean,
+        "escalated": False,
+        "confidence_score": confidence,
+        "timestamp": bot_msg["timestamp"]
+    }), session_id)
+
+    return {"reply": bot_reply_clean, "escalated": False, "confidence_score": confidence, "session_id": session_id}
+
+
+intent_classifier = IntentClassifier(embedding_model) if INTENT_CLASSIFIER_ENABLED else None
+fast_path = FastPathRouter(classifier=intent_classifier)
+
+
+@app.on_event("startup")
+async def warm_intent_classifier():
+    # embed the centroid examples once at boot, off the event loop, not on the first customer message
+    if intent_classifier is None:
+        return
+    try:
+        await asyncio.to_thread(intent_classifier.warm)
+    except Exception as e:
+        print(f"[ERROR] Failed to precompute intent centroids (will retry on first use): {e}")
+turn_coordinator = SessionTurnCoordinator(run_bot_turn)
+idempotency_store = IdempotencyStore()
+
+
+# -----------------------------------------------------------------------------
+# REST: Chat (with fixed escalation)
+# -----------------------------------------------------------------------------
+async def process_chat_message(req: ChatRequest) -> dict:
+    session_id = req.session_id
+    user_message = (req.message or "").strip()
+    print(f"[User:{session_id}] {user_message}")
+
+    # If already escalated, don't route back to LLM
+    if session_id in chat_sessions and chat_sessions[session_id].get("escalated"):
+        user_msg = {"role": "user", "content": user_message, "timestamp": datetime.now().isoformat()}
+        await append_history(session_id, chat_sessions[session_id], user_msg)
+        agent_id = chat_sessions[session_id].get("agent_id")
+        if agent_id and agent_id in human_agent_sessions:
+            human_agent_sessions[agent_id]["history"].append(user_msg)
+            return {"reply": "Your message has been sent to the human agent. They will respond shortly.","escalated": True,"agent_id": agent_id}
+        else:
+            return {"reply": "This conversation has been escalated to a human agent. Please wait for their response.","escalated": True,"agent_id": agent_id}
+
+    # init session
+    if session_id not in chat_sessions:
+        chat_sessions[session_id] = new_session()
+
+    session = chat_sessions[session_id]
+
+    # history append
+    user_msg = {"role": "user", "content": user_message, "timestamp": datetime.now().isoformat()}
+    await append_history(session_id, session, user_msg)
+    await manager.broadcast_to_watchers(session["event_log"].append({
+        "type": "user_message",
+        "session_id": session_id,
+        "message": user_message,
+        "timestamp": user_msg["timestamp"]
+    }, AUDIENCE_WATCHERS), session_id)
+
+    # bot reply (serialized per session; bursts share one LLM turn)
+    return await turn_coordinator.submit(session_id)
+
+
+@app.post("/chat")
+async def chat(
+    req: ChatRequest,
+    db: Session = Depends(get_db_session),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """Customer chat. Retries that repeat the Idempotency-Key header get the original reply
+    (or join the still-running request) without touching history again."""
+    if not idempotency_key:
+        return JSONResponse(await process_chat_message(req))
+
+    try:
+        result, replayed = await idempotency_store.run(
+            f"{req.session_id}:{idempotency_key}",
+            fingerprint(req.session_id, req.message),
+            lambda: process_chat_message(req)
+        )
+    except IdempotencyKeyReused:
+        return JSONResponse({"status": "error", "message": "Idempotency-Key was already used for a different request"}, status_code=422)
+    return JSONResponse(result, headers={"Idempotent-Replayed": "true"} if replayed else None)
 
 
 # -----------------------------------------------------------------------------
 # Bot Testing & Validation Endpoints
 # -----------------------------------------------------------------------------
+async def store_bot_test_run(test_name: str, kind: str, cases: List[tuple], run_by: Optional[str] = None,
+                             description: Optional[str] = None) -> Optional[int]:
+    """Persist a run and its (BotTestRequest, BotTestResponse) cases; aggregates are computed here, once."""
+    aggregates = run_aggregates(
+        (result.confidence_score for _, result in cases),
+        (result.response_time_ms for _, result in cases),
+    )
+    try:
+        async with AsyncSessionLocal() as db:
+            run = BotTestRun(test_name=test_name, kind=kind, description=description, run_by=run_by,
+                             timestamp=datetime.now(), **aggregates)
+            db.add(run)
+            await db.flush()
+            if cases:
+                await db.execute(insert(BotTestCase), [{
+                    "run_id": run.id,
+                    "position": i,
+                    "test_id": result.test_id,
+                    "test_category": request.test_category,
+                    "message": request.message,
+                    "expected_response": request.expected_response,
+                    "bot_response": result.bot_response,
+                    "confidence_score": result.confidence_score,
+                    "response_time_ms": result.response_time_ms,
+                    "retrieved_documents": result.retrieved_documents,
+                    "passed": case_passed(result.confidence_score),
+                    "timestamp": result.timestamp,
+                } for i, (request, result) in enumerate(cases)])
+            await db.commit()
+            return run.id
+    except Exception as e:
+        print(f"[ERROR] Failed to store bot test run {test_name}: {e}")
+        return None
+
 
 @app.post("/admin/bot/test", response_model=BotTestResponse)
 async def test_bot_response(
@@ -575,7 +1102,7 @@ async def test_bot_response(
         # Extract context information
         context_used = [doc.page_content[:100] + "..." for doc in retrieved_docs] if retrieved_docs else []
         
-        return BotTestResponse(
+        result = BotTestResponse(
             bot_response=bot_reply_clean,
             confidence_score=float(confidence_score),
             response_time_ms=response_time,
@@ -584,6 +1111,9 @@ async def test_bot_response(
             test_id=test_session_id,
             timestamp=end_time
         )
+        await store_bot_test_run(test_request.test_category or "single", "single", [(test_request, result)],
+                                 run_by=current_user.email)
+        return result
         
     except Exception as e:
         print(f"[ERROR] Bot test failed: {str(e)}")
@@ -656,11 +1186,13 @@ async def run_accuracy_test(
         average_response_time = total_response_time / total_tests if total_tests > 0 else 0
         
         # Calculate accuracy based on confidence scores
-        passed_tests = sum(1 for result in test_results if result.confidence_score >= 0.6)
+        passed_tests = sum(1 for result in test_results if case_passed(result.confidence_score))
         failed_tests = total_tests - passed_tests
         accuracy_percentage = (passed_tests / total_tests * 100) if total_tests > 0 else 0.0
         
         end_time = datetime.now()
+        await store_bot_test_run(accuracy_test.test_name, "accuracy", list(zip(accuracy_test.test_cases, test_results)),
+                                 run_by=current_user.email, description=accuracy_test.description)
         
         return BotAccuracyResult(
             test_name=accuracy_test.test_name,
@@ -795,24 +1327,36 @@ async def validate_bot_response(
         )
 
 
+def _iso_or_none(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
 @app.get("/admin/bot/test-history")
 async def get_test_history(
     current_user: User = Depends(require_role("admin")),
-    db: Session = Depends(get_db_session),
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    test_name: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
 ):
-    """Admin endpoint to retrieve bot test history"""
+    """Admin endpoint to retrieve bot test history (newest run first, with per-run aggregates)"""
+    limit = max(1, min(limit, 200))
+    filters = []
+    if test_name:
+        filters.append(BotTestRun.test_name == test_name)
+    if since:
+        filters.append(BotTestRun.timestamp >= since)
+    if until:
+        filters.append(BotTestRun.timestamp < until)
     try:
-        # For now, return a simple structure. In a real implementation,
-        # you'd store test results in the database
-        return {
-            "message": "Test history endpoint ready for database integration",
-            "limit": limit,
-            "offset": offset,
-            "total_tests": 0,
-            "tests": []
-        }
+        async with AsyncSessionLocal() as db:
+            total = (await db.execute(select(func.count()).select_from(BotTestRun).where(*filters))).scalar_one()
+            runs = (await db.execute(
+                select(BotTestRun).where(*filters)
+                .order_by(BotTestRun.timestamp.desc(), BotTestRun.id.desc())
+                .limit(limit).offset(max(0, offset))
+            )).scalars().all()
     except Exception as e:
         print(f"[ERROR] Failed to retrieve test history: {str(e)}")
         raise HTTPException(
@@ -820,6 +1364,61 @@ async def get_test_history(
             detail=f"Failed to retrieve test history: {str(e)}"
         )
 
+    return {
+        "limit": limit,
+        "offset": offset,
+        "total_tests": total,
+        "tests": [{
+            "run_id": run.id,
+            "test_name": run.test_name,
+            "kind": run.kind,
+            "description": run.description,
+            "run_by": run.run_by,
+            "timestamp": _iso_or_none(run.timestamp),
+            "total_tests": run.total_tests,
+            "passed_tests": run.passed_tests,
+            "failed_tests": run.failed_tests,
+            "accuracy_percentage": run.accuracy_percentage,
+            "average_confidence": run.average_confidence,
+            "latency_ms": {
+                "avg": run.average_response_ms,
+                "p50": run.p50_response_ms,
+                "p95": run.p95_response_ms,
+                "p99": run.p99_response_ms,
+                "max": run.max_response_ms,
+            },
+        } for run in runs],
+    }
+
+
+@app.get("/admin/bot/test-history/{run_id}")
+async def get_test_run_cases(run_id: int, current_user: User = Depends(require_role("admin"))):
+    """Per-case results of one stored test run"""
+    async with AsyncSessionLocal() as db:
+        run = await db.get(BotTestRun, run_id)
+        if run is None:
+            raise HTTPException(status_code=404, detail="Test run not found")
+        cases = (await db.execute(
+            select(BotTestCase).where(BotTestCase.run_id == run_id).order_by(BotTestCase.position)
+        )).scalars().all()
+    return {
+        "run_id": run.id,
+        "test_name": run.test_name,
+        "timestamp": _iso_or_none(run.timestamp),
+        "cases": [{
+            "test_id": case.test_id,
+            "test_category": case.test_category,
+            "message": case.message,
+            "expected_response": case.expected_response,
+            "bot_response": case.bot_response,
+            "confidence_score": case.confidence_score,
+            "response_time_ms": case.response_time_ms,
+            "retrieved_documents": case.retrieved_documents,
+            "passed": case.passed,
+            "timestamp": _iso_or_none(case.timestamp),
+        } for case in cases],
+    }
+
 
 # -----------------------------------------------------------------------------
 # Debug Chat (uses same prompt builder)
@@ -871,19 +1470,31 @@ async def agent_chat(
     if agent_session["session_id"] != session_id:
         return JSONResponse({"status": "error","message": "Agent not authorized for this session"}, status_code=403)
 
+    if not claim_agent_session(agent_id, current_user.email):
+        return JSONResponse({
+            "status": "error",
+            "message": "Session already taken",
+            "claimed_by": escalation_queue.claimed_by(agent_id)
+        }, status_code=409)
+
     if session_id in chat_sessions:
-        chat_sessions[session_id]["history"].append({
+        await append_history(session_id, chat_sessions[session_id], {
             "role": "agent",
             "content": agent_message,
             "timestamp": datetime.now().isoformat(),
             "agent_id": agent_id
         })
-        agent_session["status"] = "active"
         agent_session["history"].append({
             "role": "agent",
             "content": agent_message,
             "timestamp": datetime.now().isoformat()
         })
+        await manager.broadcast_to_session(chat_sessions[session_id]["event_log"].append({
+            "type": "agent_message",
+            "message": agent_message,
+            "agent_id": agent_id,
+            "timestamp": datetime.now().isoformat()
+        }), session_id)
 
     return JSONResponse({"status": "success","message": "Agent message sent successfully"})
 
@@ -894,9 +1505,14 @@ async def take_session(
     current_user: User = Depends(require_role(["admin", "employee"])),
     db: Session = Depends(get_db_session)
 ):
-    if agent_id not in human_agent_sessions:
+    if agent_id not in human_agent_sessions and not reopen_agent_session(agent_id):
         return JSONResponse({"status": "error","message": "Agent session not found"}, status_code=404)
-    human_agent_sessions[agent_id]["status"] = "active"
+    if not claim_agent_session(agent_id, current_user.email):
+        return JSONResponse({
+            "status": "error",
+            "message": "Session already taken",
+            "claimed_by": escalation_queue.claimed_by(agent_id)
+        }, status_code=409)
     return JSONResponse({
         "status": "success",
         "message": f"Session taken by agent {agent_id}",
@@ -910,25 +1526,47 @@ async def get_session_status(session_id: str):
     if session_id not in chat_sessions:
         return JSONResponse({"status": "error","message": "Session not found"}, status_code=404)
     session = chat_sessions[session_id]
+    await ensure_history_loaded(session_id, session)
     return JSONResponse({
         "session_id": session_id,
         "is_escalated": session.get("escalated", False),
         "agent_id": session.get("agent_id"),
         "escalated_at": session.get("escalated_at"),
-        "message_count": len(session.get("history", [])),
+        "message_count": session_history.message_count(session),
         "confidence_scores": session.get("confidence_scores", []),
         "low_confidence_streak": session.get("low_confidence_streak", 0),
     })
 
 
 @app.get("/session/{session_id}/history")
-async def get_session_history(session_id: str):
+async def get_session_history(session_id: str, limit: int = HISTORY_PAGE_SIZE, before: Optional[int] = None, after: Optional[int] = None):
+    """One page of the transcript, newest first by default.
+
+    ``before``/``after`` are message seqs; page backwards with ``before=next_before``.
+    Messages older than the in-memory tail are read from the messages table.
+    """
     if session_id not in chat_sessions:
         return JSONResponse({"status": "error","message": "Session not found"}, status_code=404)
     session = chat_sessions[session_id]
+    await ensure_history_loaded(session_id, session)
+    history = session.get("history", [])
+    offset = session["history_offset"]
+    start, end = history_window(len(history), offset, limit, before, after)
+
+    async def load_older(lo: int, hi: int) -> List[dict]:
+        try:
+            return await load_history_range(session_id, lo, hi)
+        except Exception as e:
+            print(f"[ERROR] Failed to load history page of session {session_id}: {e}")
+            return []
+
+    page = await session_history.read_page(session, start, end, load_older)
     return JSONResponse({
         "session_id": session_id,
-        "history": session.get("history", []),
+        "history": page,
+        "start_seq": start,
+        "total_messages": offset + len(history),
+        "next_before": start if start > 0 else None,
         "escalated": session.get("escalated", False),
         "agent_id": session.get("agent_id"),
         "escalated_at": session.get("escalated_at")
@@ -940,13 +1578,16 @@ async def get_session_summary(session_id: str):
     if session_id not in chat_sessions:
         return JSONResponse({"status": "error","message": "Session not found"}, status_code=404)
     session = chat_sessions[session_id]
+    await ensure_history_loaded(session_id, session)
     history = session.get("history", [])
     if not history:
         return JSONResponse({"status": "success","summary": "No conversation history available.","message_count": 0})
-    summary = generate_brief_summary(history)
+    # free for unchanged sessions; new messages are folded into the cached summary
+    summary, source, _ = summary_service.summarize(f"session:{session_id}", session["summary"], history)
     return JSONResponse({
         "status": "success",
         "summary": summary,
+        "summary_source": source,
         "message_count": len(history),
         "escalated": session.get("escalated", False),
         "agent_id": session.get("agent_id"),
@@ -956,44 +1597,77 @@ async def get_session_summary(session_id: str):
 
 @app.get("/agent/sessions")
 async def get_escalated_sessions(current_user: User = Depends(require_role(["admin", "employee"])), db: Session = Depends(get_db_session)):
-    escalated_sessions = []
-    for aid, session_data in human_agent_sessions.items():
-        if session_data["status"] == "waiting":
-            escalated_sessions.append({
-                "agent_id": aid,
-                "session_id": session_data["session_id"],
-                "escalated_at": session_data["escalated_at"],
-                "message_count": len(session_data["history"])
-            })
-    return JSONResponse({"escalated_sessions": escalated_sessions,"total_waiting": len(escalated_sessions)})
+    escalated_sessions = list_waiting_sessions()
+    return JSONResponse({"escalated_sessions": escalated_sessions,"total_waiting": len(escalated_sessions),"version": dashboard_feed.version})
+
+
+@app.post("/agent/sessions/{agent_id}/close")
+async def close_session(
+    agent_id: str,
+    current_user: User = Depends(require_role(["admin", "employee"])),
+    db: Session = Depends(get_db_session)
+):
+    if agent_id not in human_agent_sessions:
+        return JSONResponse({"status": "error","message": "Agent session not found"}, status_code=404)
+    session_id = human_agent_sessions[agent_id]["session_id"]
+    await release_agent_session(agent_id)
+    return JSONResponse({
+        "status": "success",
+        "message": f"Session closed for agent {agent_id}",
+        "agent_id": agent_id,
+        "session_id": session_id
+    })
 
 # New: list all chat sessions (bot + user messages)
 @app.get("/sessions")
-async def list_all_sessions(current_user: User = Depends(require_role(["admin", "employee"]))):
+async def list_all_sessions(
+    limit: int = SESSIONS_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    sort: str = SORT_ACTIVITY,
+    order: str = "desc",
+    status: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: User = Depends(require_role(["admin", "employee"]))
+):
+    """One page of sessions from the session index; pass ``next_cursor`` back as ``cursor``.
+
+    ``status`` is escalated/active/idle; ``since``/``until`` bound the ``sort`` field.
+    """
+    index = chat_sessions.index
+    try:
+        ids, next_cursor = index.page(
+            chat_sessions, sort=sort, order=order, status=status,
+            since=since.timestamp() if since else None,
+            until=until.timestamp() if until else None,
+            limit=limit, cursor=cursor,
+        )
+    except ValueError as e:
+        return JSONResponse({"status": "error", "message": str(e)}, status_code=400)
+
     out = []
-    for sid, sess in chat_sessions.items():
+    for sid in ids:
+        sess = chat_sessions[sid]
+        times = index.times(sid)
         out.append({
             "session_id": sid,
             "escalated": sess.get("escalated", False),
             "agent_id": sess.get("agent_id"),
             "escalated_at": sess.get("escalated_at"),
-            "message_count": len(sess.get("history", [])),
+            "message_count": session_history.message_count(sess),
+            "status": index.status(sid),
+            "created_at": datetime.fromtimestamp(times["created_at"]).isoformat(),
+            "last_activity": datetime.fromtimestamp(times["last_activity"]).isoformat(),
         })
-    return JSONResponse({"sessions": out})
+    return JSONResponse({"sessions": out, "next_cursor": next_cursor, "total": len(chat_sessions), "version": dashboard_feed.version})
 
 # New: escalate by session_id so an employee/admin can intervene
 @app.post("/agent/sessions/{session_id}/escalate")
 async def escalate_session(session_id: str, current_user: User = Depends(require_role(["admin", "employee"])), db: Session = Depends(get_db_session)):
     if session_id not in chat_sessions:
-        chat_sessions[session_id] = {
-            "history": [],
-            "escalated": False,
-            "agent_id": None,
-            "escalated_at": None,
-            "confidence_scores": [],
-            "low_confidence_streak": 0,
-        }
+        chat_sessions[session_id] = new_session()
     session = chat_sessions[session_id]
+    await ensure_history_loaded(session_id, session)
     if session.get("escalated"):
         return JSONResponse({"status": "already_escalated", "message": "Session already escalated", "agent_id": session.get("agent_id"), "session_id": session_id})
 
@@ -1143,12 +1817,60 @@ async def upload_pdf(file: UploadFile = File(...)):
     return {"status": "success", "message": f"{file.filename} uploaded and indexed."}
 
 
+# -----------------------------------------------------------------------------
+# Typing indicators (throttled)
+# -----------------------------------------------------------------------------
+typing_throttle = TypingThrottle()
+
+
+async def forward_user_typing(session_id: str, event_type: str):
+    """Send a customer typing/stopped-typing event to the assigned agent and watchers."""
+    frame = encode({"type": event_type, "session_id": session_id, "timestamp": datetime.now().isoformat()})
+    droppable = event_type == "user_typing"
+    session = chat_sessions.get(session_id)
+    # forward typing indicator from customer to agent if escalated
+    if session and session.get("escalated"):
+        agent_id = session.get("agent_id")
+        if agent_id and agent_id in human_agent_sessions:
+            await manager.broadcast_to_agent(frame, agent_id, droppable=droppable)
+    # also reflect typing to watchers (optional UX)
+    await manager.broadcast_to_watchers(frame, session_id, droppable=droppable)
+
+
+async def forward_agent_typing(session_id: str, event_type: str):
+    """Send an agent typing/stopped-typing event to the customer and watchers."""
+    frame = encode({"type": event_type, "session_id": session_id, "timestamp": datetime.now().isoformat()})
+    await manager.broadcast_to_session(frame, session_id, droppable=event_type == "agent_typing")
+
+
 # -----------------------------------------------------------------------------
 # WebSocket endpoints (customer & agent) — unchanged except escalation logic reuse
 # -----------------------------------------------------------------------------
+BOT_TURN_ERROR_MESSAGE = "Sorry, something went wrong while generating a reply. Please try again."
+
+
+def report_failed_turn(session_id: str, turn: asyncio.Future):
+    """Tell the customer's socket that a background bot turn failed (REST callers get the exception)."""
+    if turn.cancelled() or turn.exception() is None:
+        return
+    connection_id = manager.session_connections.get(session_id)
+    if connection_id is None:
+        return
+    task = asyncio.ensure_future(manager.send_personal_message(encode({
+        "type": "error",
+        "session_id": session_id,
+        "message": BOT_TURN_ERROR_MESSAGE
+    }), connection_id))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
 @app.websocket("/ws/session/{session_id}")
-async def websocket_session(websocket: WebSocket, session_id: str):
+async def websocket_session(websocket: WebSocket, session_id: str, last_seq: Optional[int] = None, epoch: Optional[str] = None):
+    """Customer chat socket. Reconnect with ?last_seq=N&epoch=E (from the last frame seen) to
+    receive only the events missed since N; a stale or missing epoch gets a full snapshot."""
     connection_id = f"session_{session_id}_{uuid.uuid4().hex[:8]}"
+    reported_turn = None
 
     try:
         await manager.connect(websocket, connection_id)
@@ -1157,177 +1879,95 @@ async def websocket_session(websocket: WebSocket, session_id: str):
 
         # Ensure session is initialized immediately on connect
         if session_id not in chat_sessions:
-            chat_sessions[session_id] = {
-                "history": [],
-                "escalated": False,
-                "agent_id": None,
-                "escalated_at": None,
-                "confidence_scores": [],
-                "low_confidence_streak": 0,
-            }
+            chat_sessions[session_id] = new_session()
 
         session = chat_sessions[session_id]
+        await ensure_history_loaded(session_id, session)
         status_message = {
             "type": "session_status",
             "escalated": session.get("escalated", False),
             "agent_id": session.get("agent_id"),
-            "message_count": len(session.get("history", []))
+            "message_count": session_history.message_count(session),
+            "seq": session["event_log"].last_seq,
+            "epoch": session["event_log"].epoch
         }
-        await manager.send_personal_message(json.dumps(status_message), connection_id)
+        await manager.send_personal_message(encode(status_message), connection_id)
+
+        # resume: replay only what this client missed
+        if last_seq is not None:
+            missed = session["event_log"].since(last_seq, epoch, AUDIENCE_SESSION)
+            event_log.record_resume(missed)
+            if missed is None:
+                await manager.send_personal_message(encode_history_snapshot(session_id, session), connection_id)
+            else:
+                for frame in missed:
+                    await manager.send_personal_message(frame, connection_id)
 
         while True:
             data = await websocket.receive_text()
-            message_data = json.loads(data)
+            try:
+                frame = decode_frame(data)
+            except FrameDecodeError as e:
+                await manager.send_personal_message(encode({"type": "error", "message": str(e)}), connection_id)
+                continue
 
-            if message_data["type"] == "user_message":
-                user_message = (message_data["message"] or "").strip()
+            if isinstance(frame, UserMessageFrame):
+                user_message = frame.message.strip()
+                typing_throttle.clear(connection_id)
 
                 # init
                 if session_id not in chat_sessions:
-                    chat_sessions[session_id] = {
-                        "history": [],
-                        "escalated": False,
-                        "agent_id": None,
-                        "escalated_at": None,
-                        "confidence_scores": [],
-                        "low_confidence_streak": 0,
-                    }
+                    chat_sessions[session_id] = new_session()
 
                 session = chat_sessions[session_id]
 
                 # append user message
                 user_msg = {"role": "user", "content": user_message, "timestamp": datetime.now().isoformat()}
-                session["history"].append(user_msg)
-                # mirror to watchers immediately
-                await manager.broadcast_to_watchers(json.dumps({
+                await append_history(session_id, session, user_msg)
+                # mirror to watchers immediately (same frame is reused for the agent)
+                user_frame = session["event_log"].append({
                     "type": "user_message",
                     "session_id": session_id,
                     "message": user_message,
                     "timestamp": user_msg["timestamp"]
-                }), session_id)
+                }, AUDIENCE_WATCHERS)
+                await manager.broadcast_to_watchers(user_frame, session_id)
 
                 # if already escalated, just pass through to agent without repeating notices
                 if session.get("escalated"):
                     agent_id = session.get("agent_id")
                     if agent_id and agent_id in human_agent_sessions:
-                        agent_message = {
-                            "type": "user_message",
-                            "session_id": session_id,
-                            "message": user_message,
-                            "timestamp": datetime.now().isoformat()
-                        }
-                        await manager.broadcast_to_agent(json.dumps(agent_message), agent_id)
+                        await manager.broadcast_to_agent(user_frame, agent_id)
                     # Do not send repetitive bot notices to the customer
                     continue
 
-                # RAG
-                retrieved_docs = retrieve_context(user_message, k=4)
-                context_text = "\n".join([doc.page_content for doc in retrieved_docs])
-
-                # prompt + LLM
-                system_prompt = build_system_prompt(context_text)
-                messages = [{"role": "system", "content": system_prompt}] + session["history"]
-                response = chat_with_groq(messages)
-                bot_reply = response.content.strip()
-
-                confidence_score = get_confidence_score(bot_reply)
-                bot_reply_clean = bot_reply.replace(f"[CONFIDENCE: {confidence_score}]", "").strip()
-
-                try:
-                    confidence = float(confidence_score)
-                except Exception:
-                    confidence = 0.0
-
-                context_is_empty = not context_text.strip()
-                retrieved_count = len(retrieved_docs)
-                if not context_is_empty and retrieved_count > 0 and confidence < 0.35:
-                    confidence = 0.35
-
-                # two-strike tracking
-                streak = session.get("low_confidence_streak", 0)
-                if confidence < 0.25:
-                    streak += 1
-                else:
-                    streak = 0
-                session["low_confidence_streak"] = streak
-
-                explicit_intent = user_wants_human_agent(user_message)
-
-                should_escalate = (
-                    explicit_intent or
-                    (
-                        confidence < 0.2 and
-                        (context_is_empty or retrieved_count == 0) and
-                        streak >= 2
-                    )
-                )
+                # bot reply runs in the background so this socket keeps reading;
+                # messages sent meanwhile are coalesced into one follow-up turn
+                turn = turn_coordinator.submit_nowait(session_id)
+                if turn is not reported_turn:  # one report per batch, not per coalesced message
+                    reported_turn = turn
+                    turn.add_done_callback(lambda f: report_failed_turn(session_id, f))
 
-                if should_escalate and not session["escalated"]:
-                    print("[ESCALATE][WS]", "explicit_user_request" if explicit_intent else f"auto_low_conf (conf={confidence:.2f}, streak={streak}, ctx_empty={context_is_empty})")
-                    agent_id = escalate_to_human(session_id, session)
-                    out = {
-                        "type": "bot_message",
-                        "message": f"Thank you. I'm connecting you to a human agent now. Your session ID is: {session_id}",
-                        "escalated": True,
-                        "agent_id": agent_id,
-                        "confidence_score": confidence
-                    }
-                    await manager.broadcast_to_session(json.dumps(out), session_id)
-
-                    # notify agent
-                    await manager.broadcast_to_agent(json.dumps({
-                        "type": "new_escalated_session",
-                        "session_id": session_id,
-                        "agent_id": agent_id,
-                        "message": f"New escalated session: {session_id}"
-                    }), agent_id)
-                else:
-                    # normal bot message
-                    bot_msg = {
-                        "role": "assistant",
-                        "content": bot_reply_clean,
-                        "confidence": confidence,
-                        "timestamp": datetime.now().isoformat()
-                    }
-                    session["history"].append(bot_msg)
-                    session["confidence_scores"].append(confidence)
-
-                    # send bot reply to the customer widget and watchers
-                    await manager.broadcast_to_session(json.dumps({
-                        "type": "bot_message",
-                        "message": bot_reply_clean,
-                        "escalated": False,
-                        "confidence_score": confidence,
-                        "timestamp": bot_msg["timestamp"]
-                    }), session_id)
-
-            elif message_data["type"] == "typing":
-                # forward typing indicator from customer to agent if escalated
-                if session_id in chat_sessions and chat_sessions[session_id].get("escalated"):
-                    agent_id = chat_sessions[session_id].get("agent_id")
-                    if agent_id and agent_id in human_agent_sessions:
-                        await manager.broadcast_to_agent(json.dumps({
-                            "type": "user_typing",
-                            "session_id": session_id,
-                            "timestamp": datetime.now().isoformat()
-                        }), agent_id)
-                # removed incorrect bot response send here
-                # also reflect typing to watchers (optional UX)
-                await manager.broadcast_to_watchers(json.dumps({
-                    "type": "user_typing",
-                    "session_id": session_id,
-                    "timestamp": datetime.now().isoformat()
-                }), session_id)
+            elif isinstance(frame, TypingFrame):
+                # throttled: at most one indicator per interval, plus a "stopped" event when idle
+                if typing_throttle.observe(connection_id, lambda: forward_user_typing(session_id, "user_stopped_typing")):
+                    await forward_user_typing(session_id, "user_typing")
 
     except WebSocketDisconnect:
-        manager.disconnect(connection_id)
         print(f"[WS] Customer disconnected from session {session_id}")
+    finally:
+        typing_throttle.clear(connection_id)
+        # nobody is left to read a pending bot reply; stop paying for it
+        if manager.session_connections.get(session_id) == connection_id and turn_coordinator.cancel(session_id):
+            print(f"[WS] Cancelled pending bot turn for session {session_id}")
+        manager.disconnect(connection_id)
 
 
 @app.websocket("/ws/watch/{session_id}")
-async def websocket_watch_session(websocket: WebSocket, session_id: str):
+async def websocket_watch_session(websocket: WebSocket, session_id: str, last_seq: Optional[int] = None, epoch: Optional[str] = None):
     """Allow admins/employees to passively watch a session in real time without intervening.
     They receive all bot and agent messages broadcast to the session.
+    Reconnecting with ?last_seq=N&epoch=E replays only the events after N instead of the full history.
     """
     connection_id = f"watch_{session_id}_{uuid.uuid4().hex[:8]}"
     try:
@@ -1339,41 +1979,47 @@ async def websocket_watch_session(websocket: WebSocket, session_id: str):
 
         # On connect, send current session status
         if session_id not in chat_sessions:
-            chat_sessions[session_id] = {
-                "history": [],
-                "escalated": False,
-                "agent_id": None,
-                "escalated_at": None,
-                "confidence_scores": [],
-                "low_confidence_streak": 0,
-            }
+            chat_sessions[session_id] = new_session()
         session = chat_sessions[session_id]
-        await manager.send_personal_message(json.dumps({
+        await ensure_history_loaded(session_id, session)
+        await manager.send_personal_message(encode({
             "type": "session_status",
             "escalated": session.get("escalated", False),
             "agent_id": session.get("agent_id"),
-            "message_count": len(session.get("history", []))
+            "message_count": session_history.message_count(session),
+            "seq": session["event_log"].last_seq,
+            "epoch": session["event_log"].epoch
         }), connection_id)
 
-        # Also send existing history so the viewer has context
-        await manager.send_personal_message(json.dumps({
-            "type": "history_snapshot",
-            "session_id": session_id,
-            "history": session.get("history", [])
-        }), connection_id)
+        # Resume from last_seq when possible, otherwise send existing history so the viewer has context
+        missed = session["event_log"].since(last_seq, epoch, AUDIENCE_WATCHERS) if last_seq is not None else None
+        if last_seq is not None:
+            event_log.record_resume(missed)
+        if missed is None:
+            await manager.send_personal_message(encode_history_snapshot(session_id, session), connection_id)
+        else:
+            for frame in missed:
+                await manager.send_personal_message(frame, connection_id)
 
         # Keep the connection open; viewers don't send messages
         while True:
             # keepalive: will close on disconnect
             await websocket.receive_text()
     except WebSocketDisconnect:
-        manager.disconnect(connection_id)
         print(f"[WS] Watcher disconnected from session {session_id}")
+    finally:
+        manager.disconnect(connection_id)
 
 
 @app.websocket("/ws/agent/{agent_id}")
-async def websocket_agent(websocket: WebSocket, agent_id: str):
+async def websocket_agent(websocket: WebSocket, agent_id: str, token: Optional[str] = None):
+    """Agent socket; requires ?token=<JWT> of an admin/employee (the dashboard deltas name
+    employees). Replies claim the escalation for that employee."""
     connection_id = f"agent_{agent_id}_{uuid.uuid4().hex[:8]}"
+    employee = await user_from_token(token, roles=("admin", "employee"))
+    if employee is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
 
     try:
         await manager.connect(websocket, connection_id)
@@ -1381,47 +2027,52 @@ async def websocket_agent(websocket: WebSocket, agent_id: str):
         print(f"[WS] Agent {agent_id} connected")
 
         # send waiting sessions
-        escalated_sessions = []
-        for aid, session_data in human_agent_sessions.items():
-            if session_data["status"] == "waiting":
-                escalated_sessions.append({
-                    "agent_id": aid,
-                    "session_id": session_data["session_id"],
-                    "escalated_at": session_data["escalated_at"],
-                    "message_count": len(session_data["history"])
-                })
+        escalated_sessions = list_waiting_sessions()
 
-        await manager.send_personal_message(json.dumps({
+        await manager.send_personal_message(encode({
             "type": "agent_status",
             "agent_id": agent_id,
-            "escalated_sessions": escalated_sessions
+            "escalated_sessions": escalated_sessions,
+            "version": dashboard_feed.version
         }), connection_id)
 
         while True:
             data = await websocket.receive_text()
-            message_data = json.loads(data)
+            try:
+                frame = decode_frame(data)
+            except FrameDecodeError as e:
+                await manager.send_personal_message(encode({"type": "error", "message": str(e)}), connection_id)
+                continue
 
-            if message_data["type"] == "agent_message":
-                session_id = message_data["session_id"]
-                agent_message = message_data["message"]
+            if isinstance(frame, AgentMessageFrame):
+                session_id = frame.session_id
+                agent_message = frame.message
+                typing_throttle.clear(f"{connection_id}:{session_id}")
 
                 if agent_id not in human_agent_sessions:
-                    await manager.send_personal_message(json.dumps({"type": "error", "message": "Invalid agent ID or session not found"}), connection_id)
+                    await manager.send_personal_message(encode({"type": "error", "message": "Invalid agent ID or session not found"}), connection_id)
                     continue
 
                 agent_session = human_agent_sessions[agent_id]
                 if agent_session["session_id"] != session_id:
-                    await manager.send_personal_message(json.dumps({"type": "error", "message": "Agent not authorized for this session"}), connection_id)
+                    await manager.send_personal_message(encode({"type": "error", "message": "Agent not authorized for this session"}), connection_id)
+                    continue
+
+                if not claim_agent_session(agent_id, employee.email):
+                    await manager.send_personal_message(encode({
+                        "type": "error",
+                        "message": "Session already taken",
+                        "claimed_by": escalation_queue.claimed_by(agent_id)
+                    }), connection_id)
                     continue
 
                 if session_id in chat_sessions:
-                    chat_sessions[session_id]["history"].append({
+                    await append_history(session_id, chat_sessions[session_id], {
                         "role": "agent",
                         "content": agent_message,
                         "timestamp": datetime.now().isoformat(),
                         "agent_id": agent_id
                     })
-                    agent_session["status"] = "active"
                     agent_session["history"].append({
                         "role": "agent",
                         "content": agent_message,
@@ -1429,57 +2080,59 @@ async def websocket_agent(websocket: WebSocket, agent_id: str):
                     })
 
                 # deliver to customer and watchers
-                await manager.broadcast_to_session(json.dumps({
+                agent_event = {
                     "type": "agent_message",
                     "message": agent_message,
                     "agent_id": agent_id,
                     "timestamp": datetime.now().isoformat()
-                }), session_id)
+                }
+                if session_id in chat_sessions:
+                    agent_frame = chat_sessions[session_id]["event_log"].append(agent_event)
+                else:
+                    agent_frame = encode(agent_event)
+                await manager.broadcast_to_session(agent_frame, session_id)
 
-                await manager.send_personal_message(json.dumps({
+                await manager.send_personal_message(encode({
                     "type": "message_sent",
                     "session_id": session_id,
                     "message": "Message sent successfully"
                 }), connection_id)
 
-            elif message_data["type"] == "user_message":
-                session_id = message_data["session_id"]
-                user_message = message_data["message"]
+            elif isinstance(frame, UserMessageFrame):
+                session_id = frame.session_id
+                user_message = frame.message
 
                 if agent_id not in human_agent_sessions:
-                    await manager.send_personal_message(json.dumps({"type": "error", "message": "Invalid agent ID or session not found"}), connection_id)
+                    await manager.send_personal_message(encode({"type": "error", "message": "Invalid agent ID or session not found"}), connection_id)
                     continue
 
                 agent_session = human_agent_sessions[agent_id]
                 if agent_session["session_id"] != session_id:
-                    await manager.send_personal_message(json.dumps({"type": "error", "message": "Agent not authorized for this session"}), connection_id)
+                    await manager.send_personal_message(encode({"type": "error", "message": "Agent not authorized for this session"}), connection_id)
                     continue
 
-                await manager.send_personal_message(json.dumps({
+                await manager.send_personal_message(encode({
                     "type": "user_message",
                     "session_id": session_id,
                     "message": user_message,
-                    "timestamp": message_data.get("timestamp", datetime.now().isoformat())
+                    "timestamp": frame.timestamp or datetime.now().isoformat()
                 }), connection_id)
 
-            elif message_data["type"] == "typing":
+            elif isinstance(frame, TypingFrame):
                 # Agent typing indicator → forward to session
                 # Determine session_id from message (preferred) or agent_session
-                session_id = message_data.get("session_id")
+                session_id = frame.session_id
                 if not session_id and agent_id in human_agent_sessions:
                     session_id = human_agent_sessions[agent_id].get("session_id")
                 if not session_id:
                     continue
-                await manager.broadcast_to_session(json.dumps({
-                    "type": "agent_typing",
-                    "session_id": session_id,
-                    "timestamp": datetime.now().isoformat()
-                }), session_id)
+                typing_key = f"{connection_id}:{session_id}"
+                if typing_throttle.observe(typing_key, lambda sid=session_id: forward_agent_typing(sid, "agent_stopped_typing")):
+                    await forward_agent_typing(session_id, "agent_typing")
 
     except WebSocketDisconnect:
-        manager.disconnect(connection_id)
         print(f"[WS] Agent {agent_id} disconnected")
+    finally:
+        typing_throttle.clear_prefix(f"{connection_id}:")
+        manager.disconnect(connection_id)
 
-
-# Boot-time restore of escalations
-load_escalated_sessions_from_db()
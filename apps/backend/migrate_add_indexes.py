@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Schema migration: create indexes declared in models.py that an existing
+database doesn't have yet.
+
+``init_db()`` (``create_all``) only creates missing tables, so indexes added to
+existing tables (e.g. the ``conversations`` lookup indexes) need this script.
+On PostgreSQL indexes are built with CREATE INDEX CONCURRENTLY, so the app can
+keep writing while a large table is indexed; ANALYZE runs afterwards so the
+planner picks them up.
+
+The full-text search columns and indexes from search.py are built here too.
+Run this before deploying so init_db doesn't build them (non-concurrently) on a
+large table. The first run adds stored generated ``tsvector`` columns, which
+rewrites ``conversations`` and ``messages`` once under an exclusive lock, so
+schedule it for a quiet window; later runs are no-ops.
+
+    python migrate_add_indexes.py [--dry-run]
+"""
+
+import os
+import sys
+import time
+from dotenv import load_dotenv
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+def missing_indexes(engine, metadata):
+    """(table, index) pairs declared in ``metadata`` but absent from the database."""
+    from sqlalchemy import inspect
+
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    missing = []
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue  # create_all will build the table together with its indexes
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda ix: ix.name):
+            if index.name not in existing:
+                missing.append((table, index))
+    return missing
+
+
+def add_search_indexes(engine, concurrently: bool) -> bool:
+    """Full-text indexes (see search.py) aren't in the metadata; their DDL is idempotent."""
+    from search import setup_search
+
+    start = time.perf_counter()
+    try:
+        setup_search(engine, concurrently=concurrently)
+    except Exception as e:
+        print(f"✗ Full-text index migration failed: {e}")
+        return False
+    print(f"✓ Full-text search indexes ready ({time.perf_counter() - start:.1f}s)")
+    return True
+
+
+def add_indexes(dry_run: bool = False) -> bool:
+    from sqlalchemy import text
+    from database import engine
+    from models import Base
+
+    postgres = engine.dialect.name == "postgresql"
+    if not dry_run and not add_search_indexes(engine, concurrently=postgres):
+        return False
+
+    missing = missing_indexes(engine, Base.metadata)
+    if not missing:
+        print("✓ All declared indexes already exist")
+        return True
+
+    touched = set()
+    try:
+        # CONCURRENTLY can't run inside a transaction block
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for table, index in missing:
+                columns = ", ".join(c.name for c in index.columns)
+                if dry_run:
+                    print(f"  would create {index.name} on {table.name} ({columns})")
+                    continue
+                if postgres:
+                    index.dialect_options["postgresql"]["concurrently"] = True
+                start = time.perf_counter()
+                index.create(conn)
+                touched.add(table.name)
+                print(f"✓ Created {index.name} on {table.name} ({columns}) in {time.perf_counter() - start:.1f}s")
+            for name in sorted(touched):
+                conn.execute(text(f"ANALYZE {name}"))
+    except Exception as e:
+        print(f"✗ Index migration failed: {e}")
+        if postgres:
+            print("A failed concurrent build can leave an INVALID index behind; drop it before re-running.")
+        return False
+    return True
+
+
+def main():
+    load_dotenv()
+    dry_run = "--dry-run" in sys.argv[1:]
+    print("=" * 50)
+    print("Index migration")
+    print("=" * 50)
+    sys.exit(0 if add_indexes(dry_run=dry_run) else 1)
+
+
+if __name__ == "__main__":
+    main()
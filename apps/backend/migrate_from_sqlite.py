@@ -2,129 +2,189 @@
 """
 Migration script to move data from old SQLite database to PostgreSQL.
 Run this if you have existing data in the old SQLite database.
+
+Rows are streamed from SQLite in rowid order, MIGRATE_BATCH_SIZE at a time, and
+each chunk is bulk-inserted in one transaction, so memory stays flat however
+large ``conversations.db`` is. After every committed chunk the last migrated
+rowid is written to a checkpoint file; re-running the script resumes from it.
+
+    python migrate_from_sqlite.py [--yes] [--restart] [--batch-size N] [path/to/conversations.db]
 """
 
 import os
 import sys
 import sqlite3
+import time
 from datetime import datetime
+from typing import Callable, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
 
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-def migrate_sqlite_to_postgres():
+MIGRATE_BATCH_SIZE = int(os.getenv("MIGRATE_BATCH_SIZE", "5000"))
+
+SOURCE_COLUMNS = ("timestamp", "summary", "email", "phone", "agent_id", "session_id", "escalated", "escalated_at")
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_record(row: tuple) -> dict:
+    """Map a SQLite row (SOURCE_COLUMNS order) onto Conversation columns."""
+    record = dict(zip(SOURCE_COLUMNS, row))
+    record["timestamp"] = _parse_timestamp(record["timestamp"]) or datetime.now()
+    record["escalated_at"] = _parse_timestamp(record["escalated_at"])
+    record["escalated"] = bool(record["escalated"])
+    return record
+
+
+def read_checkpoint(path: str) -> int:
+    """Last migrated SQLite rowid (0 when starting fresh)."""
+    try:
+        with open(path) as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def write_checkpoint(path: str, rowid: int):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(str(rowid))
+    os.replace(tmp, path)  # atomic: a crash never leaves a half-written checkpoint
+
+
+def iter_chunks(sqlite_conn: sqlite3.Connection, after_rowid: int, batch_size: int) -> Iterator[Tuple[int, List[dict]]]:
+    """Yield (last_rowid, records) chunks using keyset pagination on rowid."""
+    columns = ", ".join(SOURCE_COLUMNS)
+    while True:
+        rows = sqlite_conn.execute(
+            f"SELECT rowid, {columns} FROM conversations WHERE rowid > ? ORDER BY rowid LIMIT ?",
+            (after_rowid, batch_size),
+        ).fetchall()
+        if not rows:
+            return
+        after_rowid = rows[-1][0]
+        yield after_rowid, [to_record(row[1:]) for row in rows]
+
+
+def migrate_rows(sqlite_conn: sqlite3.Connection, write_chunk: Callable[[List[dict]], None],
+                 checkpoint_path: str, batch_size: int = MIGRATE_BATCH_SIZE) -> int:
+    """Stream every row after the checkpoint through ``write_chunk`` (one transaction per call).
+
+    The checkpoint is advanced only after ``write_chunk`` returns, so an interrupted run
+    resumes at the first chunk that wasn't committed. Returns the number of rows migrated.
+    """
+    start_rowid = read_checkpoint(checkpoint_path)
+    remaining = sqlite_conn.execute("SELECT COUNT(*) FROM conversations WHERE rowid > ?", (start_rowid,)).fetchone()[0]
+    if start_rowid:
+        print(f"Resuming after SQLite rowid {start_rowid}")
+    print(f"Found {remaining} conversations to migrate")
+
+    migrated = 0
+    started = time.perf_counter()
+    for last_rowid, records in iter_chunks(sqlite_conn, start_rowid, batch_size):
+        write_chunk(records)
+        write_checkpoint(checkpoint_path, last_rowid)
+        migrated += len(records)
+        elapsed = time.perf_counter() - started
+        rate = migrated / elapsed if elapsed > 0 else 0.0
+        eta = (remaining - migrated) / rate if rate else 0.0
+        print(f"  {migrated}/{remaining} rows ({rate:,.0f} rows/sec, ~{eta:.0f}s left)")
+
+    elapsed = time.perf_counter() - started
+    if migrated:
+        print(f"Migrated {migrated} rows in {elapsed:.1f}s ({migrated / elapsed if elapsed > 0 else 0:,.0f} rows/sec)")
+    return migrated
+
+
+def migrate_sqlite_to_postgres(sqlite_db_path: str = "conversations.db", batch_size: int = MIGRATE_BATCH_SIZE,
+                               restart: bool = False):
     """Migrate data from SQLite to PostgreSQL"""
-    sqlite_db_path = "conversations.db"
-    
     if not os.path.exists(sqlite_db_path):
         print("No SQLite database found. Nothing to migrate.")
         return
-    
+
+    checkpoint_path = f"{sqlite_db_path}.checkpoint"
+    if restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
     try:
-        from database import get_db_session, init_db
+        from sqlalchemy import insert
+        from database import SessionLocal, init_db
         from models import Conversation
-        
+
         print("Starting migration from SQLite to PostgreSQL...")
-        
+
         # Initialize PostgreSQL database
         init_db()
-        
-        # Connect to SQLite database
+
+        def write_chunk(records: List[dict]):
+            # executemany; on psycopg 3 SQLAlchemy's insertmanyvalues sends it as multi-row INSERT ... VALUES batches
+            with SessionLocal() as db:
+                db.execute(insert(Conversation), records)
+                db.commit()
+
         sqlite_conn = sqlite3.connect(sqlite_db_path)
-        sqlite_cursor = sqlite_conn.cursor()
-        
-        # Get all conversations from SQLite
-        sqlite_cursor.execute("""
-            SELECT timestamp, summary, email, phone, agent_id, session_id, escalated, escalated_at
-            FROM conversations
-        """)
-        
-        conversations = sqlite_cursor.fetchall()
-        print(f"Found {len(conversations)} conversations to migrate")
-        
-        if not conversations:
-            print("No conversations to migrate.")
-            return
-        
-        # Migrate each conversation
-        migrated_count = 0
-        with next(get_db_session()) as db:
-            for conv_data in conversations:
-                timestamp_str, summary, email, phone, agent_id, session_id, escalated, escalated_at = conv_data
-                
-                # Parse timestamp
-                try:
-                    if timestamp_str:
-                        timestamp = datetime.fromisoformat(timestamp_str)
-                    else:
-                        timestamp = datetime.now()
-                except:
-                    timestamp = datetime.now()
-                
-                # Parse escalated_at
-                escalated_at_dt = None
-                if escalated_at:
-                    try:
-                        escalated_at_dt = datetime.fromisoformat(escalated_at)
-                    except:
-                        escalated_at_dt = None
-                
-                # Create new conversation in PostgreSQL
-                conversation = Conversation(
-                    timestamp=timestamp,
-                    summary=summary,
-                    email=email,
-                    phone=phone,
-                    agent_id=agent_id,
-                    session_id=session_id,
-                    escalated=bool(escalated),
-                    escalated_at=escalated_at_dt
-                )
-                
-                db.add(conversation)
-                migrated_count += 1
-        
-        # Commit all changes
-        db.commit()
-        print(f"✓ Successfully migrated {migrated_count} conversations")
-        
-        # Close SQLite connection
-        sqlite_conn.close()
-        
+        try:
+            migrate_rows(sqlite_conn, write_chunk, checkpoint_path, batch_size)
+        finally:
+            sqlite_conn.close()
+
+        print("✓ Successfully migrated all conversations")
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
         # Optionally backup and remove old SQLite database
         backup_path = f"{sqlite_db_path}.backup"
         os.rename(sqlite_db_path, backup_path)
         print(f"✓ Old SQLite database backed up to {backup_path}")
         print("You can delete this backup file after verifying the migration was successful.")
-        
+
     except Exception as e:
         print(f"✗ Migration failed: {e}")
-        print("Your original SQLite database remains unchanged.")
+        print("Your original SQLite database remains unchanged; re-run to resume from the last checkpoint.")
         return False
-    
+
     return True
 
 def main():
     """Main migration function"""
     load_dotenv()
-    
+
+    args = sys.argv[1:]
+    assume_yes = "--yes" in args
+    restart = "--restart" in args
+    batch_size = MIGRATE_BATCH_SIZE
+    if "--batch-size" in args:
+        batch_size = int(args[args.index("--batch-size") + 1])
+    paths = [a for i, a in enumerate(args) if not a.startswith("--") and (i == 0 or args[i - 1] != "--batch-size")]
+    sqlite_db_path = paths[0] if paths else "conversations.db"
+
     print("=" * 50)
     print("SQLite to PostgreSQL Migration Tool")
     print("=" * 50)
-    
+
     print("This tool will migrate your existing SQLite data to PostgreSQL.")
     print("Make sure you have:")
     print("1. PostgreSQL running with the chatbot database created")
     print("2. Environment variables configured in .env file")
     print("3. All dependencies installed")
-    
-    response = input("\nDo you want to continue with the migration? (y/N): ")
-    if response.lower() != 'y':
-        print("Migration cancelled.")
-        return
-    
-    if migrate_sqlite_to_postgres():
+
+    if not assume_yes:
+        response = input("\nDo you want to continue with the migration? (y/N): ")
+        if response.lower() != 'y':
+            print("Migration cancelled.")
+            return
+
+    if migrate_sqlite_to_postgres(sqlite_db_path, batch_size, restart):
         print("\n🎉 Migration completed successfully!")
         print("Your data is now in PostgreSQL and ready to use.")
     else:
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Float, Index, text
 from sqlalchemy.sql import func
 from datetime import datetime
 from database import Base
@@ -18,6 +18,14 @@ class User(Base):
 
 class Conversation(Base):
     __tablename__ = "conversations"
+    __table_args__ = (
+        # per-session lookups and the (session_id, agent_id) summary update
+        Index("ix_conversations_session_agent", "session_id", "agent_id"),
+        # boot-time restore of escalated sessions; partial so it only holds the (few) escalated rows
+        Index("ix_conversations_escalated", "escalated_at", "session_id", "agent_id",
+              postgresql_where=text("escalated"), sqlite_where=text("escalated")),
+        Index("ix_conversations_timestamp", "timestamp"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
@@ -29,3 +37,83 @@ class Conversation(Base):
     escalated = Column(Boolean, default=False)
     escalated_at = Column(DateTime(timezone=True))
     user_id = Column(Integer, nullable=True)  # Link to user if authenticated
+
+class ChatMessage(Base):
+    """One transcript entry; ``seq`` is the message's position in the session history."""
+    __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_session_seq", "session_id", "seq", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    session_id = Column(String, nullable=False)
+    seq = Column(Integer, nullable=False)
+    role = Column(String, nullable=False)  # 'user', 'assistant' or 'agent'
+    content = Column(Text, nullable=False)
+    confidence = Column(Float)
+    agent_id = Column(String)
+    timestamp = Column(DateTime(timezone=True))
+
+class BotTestRun(Base):
+    """One bot test or accuracy-test call, with aggregates precomputed at write time (see bot_tests.py)."""
+    __tablename__ = "bot_test_runs"
+    __table_args__ = (
+        Index("ix_bot_test_runs_name_timestamp", "test_name", "timestamp"),
+        Index("ix_bot_test_runs_timestamp", "timestamp"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    test_name = Column(String, nullable=False)
+    kind = Column(String, nullable=False)  # 'single' or 'accuracy'
+    description = Column(Text)
+    run_by = Column(String)
+    timestamp = Column(DateTime(timezone=True), nullable=False)
+    total_tests = Column(Integer, nullable=False)
+    passed_tests = Column(Integer, nullable=False)
+    failed_tests = Column(Integer, nullable=False)
+    accuracy_percentage = Column(Float, nullable=False)
+    average_confidence = Column(Float, nullable=False)
+    average_response_ms = Column(Float, nullable=False)
+    p50_response_ms = Column(Float, nullable=False)
+    p95_response_ms = Column(Float, nullable=False)
+    p99_response_ms = Column(Float, nullable=False)
+    max_response_ms = Column(Float, nullable=False)
+
+class BotTestCase(Base):
+    """Per-message result of a BotTestRun."""
+    __tablename__ = "bot_test_cases"
+    __table_args__ = (
+        Index("ix_bot_test_cases_run_position", "run_id", "position", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, nullable=False)
+    position = Column(Integer, nullable=False)
+    test_id = Column(String, nullable=False)
+    test_category = Column(String)
+    message = Column(Text, nullable=False)
+    expected_response = Column(Text)
+    bot_response = Column(Text)
+    confidence_score = Column(Float, nullable=False)
+    response_time_ms = Column(Integer, nullable=False)
+    retrieved_documents = Column(Integer, nullable=False)
+    passed = Column(Boolean, nullable=False)
+    timestamp = Column(DateTime(timezone=True))
+
+class AnalyticsRollup(Base):
+    """Hourly/daily conversation counters, maintained incrementally by analytics.py."""
+    __tablename__ = "analytics_rollups"
+    __table_args__ = (
+        Index("ix_analytics_rollups_bucket", "granularity", "bucket_start", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    granularity = Column(String, nullable=False)  # 'hour' or 'day'
+    bucket_start = Column(DateTime, nullable=False)
+    sessions_started = Column(Integer, nullable=False, default=0)
+    user_messages = Column(Integer, nullable=False, default=0)
+    bot_messages = Column(Integer, nullable=False, default=0)
+    agent_messages = Column(Integer, nullable=False, default=0)
+    escalations = Column(Integer, nullable=False, default=0)
+    confidence_sum = Column(Float, nullable=False, default=0.0)
+    confidence_count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,203 @@
+"""
+Write-behind persistence for conversation records.
+
+Request handlers ``submit`` records and return immediately; a single worker
+thread drains the bounded buffer and writes up to ``PERSIST_BATCH_SIZE``
+records per transaction through the ``write_batch`` callable (which owns the
+DB session and commit). Failed batches are retried with backoff; records that
+still fail, or arrive while the buffer is full, are appended to a JSONL
+dead-letter file instead of being dropped. ``stop()`` flushes what's left on
+shutdown.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+PERSIST_QUEUE_SIZE = int(os.getenv("PERSIST_QUEUE_SIZE", "10000"))
+PERSIST_BATCH_SIZE = int(os.getenv("PERSIST_BATCH_SIZE", "200"))
+PERSIST_FLUSH_INTERVAL_SEC = float(os.getenv("PERSIST_FLUSH_INTERVAL_SEC", "0.5"))
+PERSIST_MAX_RETRIES = int(os.getenv("PERSIST_MAX_RETRIES", "3"))
+PERSIST_RETRY_BACKOFF_SEC = float(os.getenv("PERSIST_RETRY_BACKOFF_SEC", "0.5"))
+PERSIST_DEAD_LETTER_PATH = os.getenv("PERSIST_DEAD_LETTER_PATH", "persist_dead_letter.jsonl")
+
+# (kind, record); kinds are interpreted by the write_batch callable
+WriteItem = Tuple[str, dict]
+
+
+class WriteBehindQueue:
+    def __init__(self, write_batch: Callable[[List[WriteItem]], None], max_pending: int = PERSIST_QUEUE_SIZE,
+                 batch_size: int = PERSIST_BATCH_SIZE, flush_interval: float = PERSIST_FLUSH_INTERVAL_SEC,
+                 max_retries: int = PERSIST_MAX_RETRIES, retry_backoff: float = PERSIST_RETRY_BACKOFF_SEC,
+                 dead_letter_path: str = PERSIST_DEAD_LETTER_PATH):
+        """``write_batch(items)`` must write all items in one transaction or raise."""
+        self._write_batch = write_batch
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.dead_letter_path = dead_letter_path
+        self._queue: "queue.Queue[WriteItem]" = queue.Queue(maxsize=max(1, max_pending))
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._dead_letter_lock = threading.Lock()
+        self._counters = {
+            "submitted": 0, "written": 0, "batches": 0, "retries": 0,
+            "dead_lettered": 0, "overflowed": 0,
+        }
+        self._write_time_sec = 0.0
+        self._last_batch_ms = 0.0
+
+    # -------------------------------------------------------------------------
+    # Producer side (any thread, never blocks)
+    # -------------------------------------------------------------------------
+    def submit(self, kind: str, record: dict) -> bool:
+        """Queue a record for writing; False if the buffer was full and it went to the dead-letter file."""
+        self._counters["submitted"] += 1
+        try:
+            self._queue.put_nowait((kind, record))
+            return True
+        except queue.Full:
+            self._counters["overflowed"] += 1
+            self._dead_letter([(kind, record)], "write-behind queue full")
+            return False
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything submitted so far has been written or dead-lettered."""
+        if self._thread is None or not self._thread.is_alive():
+            self._drain()
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def stop(self, timeout: float = 10.0) -> bool:
+        """Flush pending records and stop the worker (call on shutdown)."""
+        flushed = self.flush(timeout)
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if not flushed:
+            self._drain()  # worker is stuck; whatever remains goes to the dead-letter file
+        print(f"[INFO] Write-behind queue stopped ({self._counters['written']} records written)")
+        return flushed
+
+    # -------------------------------------------------------------------------
+    # Worker
+    # -------------------------------------------------------------------------
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._take_batch(self.flush_interval)
+            if batch:
+                self._process(batch)
+
+    def _drain(self):
+        while True:
+            batch = self._take_batch(None)
+            if not batch:
+                return
+            self._process(batch)
+
+    def _take_batch(self, wait: Optional[float]) -> List[WriteItem]:
+        try:
+            first = self._queue.get(timeout=wait) if wait else self._queue.get_nowait()
+        except queue.Empty:
+            return []
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _process(self, batch: List[WriteItem]):
+        try:
+            if not self._write_with_retries(batch) and len(batch) > 1:
+                # isolate the bad record(s) so one poison row doesn't dead-letter the whole batch
+                for item in batch:
+                    self._write_with_retries([item], retries=0)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write_with_retries(self, batch: List[WriteItem], retries: Optional[int] = None) -> bool:
+        retries = self.max_retries if retries is None else retries
+        for attempt in range(retries + 1):
+            start = time.perf_counter()
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                error = e
+                if attempt < retries:
+                    self._counters["retries"] += 1
+                    time.sleep(self.retry_backoff * (2 ** attempt))
+                continue
+            elapsed = time.perf_counter() - start
+            self._write_time_sec += elapsed
+            self._last_batch_ms = elapsed * 1000
+            self._counters["batches"] += 1
+            self._counters["written"] += len(batch)
+            return True
+
+        print(f"[ERROR] Write-behind batch of {len(batch)} failed after {retries + 1} attempt(s): {error}")
+        if len(batch) == 1:
+            self._dead_letter(batch, str(error))
+        return False
+
+    def _dead_letter(self, items: List[WriteItem], error: str):
+        failed_at = datetime.now().isoformat()
+        try:
+            with self._dead_letter_lock, open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                for kind, record in items:
+                    f.write(json.dumps({"kind": kind, "record": record, "error": error, "failed_at": failed_at}, default=str) + "\n")
+            self._counters["dead_lettered"] += len(items)
+        except OSError as e:
+            print(f"[ERROR] Could not write dead-letter file {self.dead_letter_path}: {e} (lost {len(items)} record(s))")
+
+    def replay_dead_letters(self) -> int:
+        """Re-queue records from the dead-letter file (e.g. after a DB outage); returns how many."""
+        replay_path = f"{self.dead_letter_path}.replaying"
+        with self._dead_letter_lock:
+            if not os.path.exists(self.dead_letter_path):
+                return 0
+            os.replace(self.dead_letter_path, replay_path)
+        count = 0
+        with open(replay_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.submit(entry["kind"], entry["record"])
+                    count += 1
+        os.remove(replay_path)
+        return count
+
+    def stats(self) -> dict:
+        batches = self._counters["batches"]
+        return {
+            "pending": self._queue.qsize(),
+            "capacity": self._queue.maxsize,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "avg_batch_size": round(self._counters["written"] / batches, 2) if batches else 0.0,
+            "last_batch_ms": round(self._last_batch_ms, 3),
+            "rows_per_sec": round(self._counters["written"] / self._write_time_sec, 1) if self._write_time_sec else 0.0,
+            **self._counters,
+        }
@@ -0,0 +1,162 @@
+"""
+Full-text search over conversation summaries and persisted transcripts.
+
+PostgreSQL: a stored generated ``<column>_tsv`` column holding
+``to_tsvector(SEARCH_FTS_CONFIG, ...)`` with a GIN index on it, queried with
+``websearch_to_tsquery`` and ranked by ``ts_rank`` on the stored vector, so
+matching rows aren't re-parsed on every query; snippets (``ts_headline``) are
+only computed for the returned page.
+
+SQLite (local runs): external-content FTS5 tables kept in sync by triggers,
+ranked by ``bm25``. User input is quoted token by token so FTS5 operators in a
+search box can't produce syntax errors.
+
+The statements are plain SQL with ``:q``, ``:limit`` and ``:offset`` named
+parameters; ``setup_search`` creates whatever the current database lacks.
+"""
+import os
+from typing import List, Tuple
+
+SEARCH_FTS_CONFIG = os.getenv("SEARCH_FTS_CONFIG", "english")
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "20"))
+MAX_SEARCH_PAGE_SIZE = 100
+
+SCOPE_CONVERSATIONS = "conversations"
+SCOPE_MESSAGES = "messages"
+SEARCH_SCOPES = (SCOPE_CONVERSATIONS, SCOPE_MESSAGES)
+
+# scope -> (table, searched column, columns returned with each hit)
+_TARGETS = {
+    SCOPE_CONVERSATIONS: ("conversations", "summary", ("id", "session_id", "agent_id", "escalated", "timestamp")),
+    SCOPE_MESSAGES: ("messages", "content", ("id", "session_id", "seq", "role", "agent_id", "timestamp")),
+}
+
+_HIGHLIGHT = ("[", "]")
+
+
+def _tsvector(column: str) -> str:
+    return f"to_tsvector('{SEARCH_FTS_CONFIG}', coalesce({column}, ''))"
+
+
+def _tsv_column(column: str) -> str:
+    return f"{column}_tsv"
+
+
+def _pg_index_name(table: str, column: str) -> str:
+    return f"ix_{table}_{_tsv_column(column)}"
+
+
+def _pg_legacy_index_name(table: str, column: str) -> str:
+    """Expression index (``to_tsvector`` computed at query time) replaced by the stored column."""
+    return f"ix_{table}_{column}_fts"
+
+
+def setup_statements(dialect: str, existing_tables: set, concurrently: bool = False) -> List[str]:
+    """DDL for the search indexes; everything is idempotent except the one-off FTS5 rebuild."""
+    statements = []
+    for table, column, _ in _TARGETS.values():
+        if dialect == "postgresql":
+            online = "CONCURRENTLY " if concurrently else ""
+            statements += [
+                # adding a stored generated column rewrites the table under an exclusive lock
+                f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {_tsv_column(column)} tsvector "
+                f"GENERATED ALWAYS AS ({_tsvector(column)}) STORED",
+                f"CREATE INDEX {online}IF NOT EXISTS {_pg_index_name(table, column)} "
+                f"ON {table} USING GIN ({_tsv_column(column)})",
+                f"DROP INDEX {online}IF EXISTS {_pg_legacy_index_name(table, column)}",
+            ]
+        elif dialect == "sqlite":
+            fts = f"{table}_fts"
+            statements += [
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({column}, content='{table}', "
+                f"content_rowid='id', tokenize='porter unicode61')",
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END",
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); END",
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {column} ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); "
+                f"INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END",
+            ]
+            if fts not in existing_tables:
+                statements.append(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")  # index rows that predate the table
+    return statements
+
+
+def fts5_query(q: str) -> str:
+    """Quote every token so input is matched as words (implicit AND), never parsed as FTS5 syntax."""
+    return " ".join('"' + token.replace('"', '""') + '"' for token in q.split())
+
+
+def search_query(dialect: str, scope: str) -> str:
+    """Ranked, paginated search statement (best match first)."""
+    table, column, columns = _TARGETS[scope]
+    if dialect == "postgresql":
+        inner_cols = ", ".join(f"t.{c}" for c in columns)
+        outer_cols = ", ".join(f"hits.{c}" for c in columns)
+        start, stop = _HIGHLIGHT
+        return (
+            f"SELECT {outer_cols}, hits.rank, "
+            f"ts_headline('{SEARCH_FTS_CONFIG}', coalesce(src.{column}, ''), websearch_to_tsquery('{SEARCH_FTS_CONFIG}', :q), "
+            f"'StartSel={start}, StopSel={stop}, MaxFragments=1, MaxWords=24, MinWords=8') AS snippet "
+            f"FROM (SELECT {inner_cols}, ts_rank(t.{_tsv_column(column)}, query) AS rank "
+            f"FROM {table} t, websearch_to_tsquery('{SEARCH_FTS_CONFIG}', :q) query "
+            f"WHERE t.{_tsv_column(column)} @@ query "
+            f"ORDER BY rank DESC, t.id DESC LIMIT :limit OFFSET :offset) hits "
+            f"JOIN {table} src ON src.id = hits.id "
+            f"ORDER BY hits.rank DESC, hits.id DESC"
+        )
+    if dialect == "sqlite":
+        fts = f"{table}_fts"
+        cols = ", ".join(f"t.{c}" for c in columns)
+        start, stop = _HIGHLIGHT
+        return (
+            f"SELECT {cols}, -bm25({fts}) AS rank, snippet({fts}, 0, '{start}', '{stop}', '…', 16) AS snippet "
+            f"FROM {fts} JOIN {table} t ON t.id = {fts}.rowid "
+            f"WHERE {fts} MATCH :q ORDER BY bm25({fts}), t.id DESC LIMIT :limit OFFSET :offset"
+        )
+    raise ValueError(f"full-text search is not supported on {dialect}")
+
+
+def search_params(dialect: str, q: str, limit: int, offset: int) -> Tuple[dict, int]:
+    """Bound parameters (fetching one extra row to detect a next page) and the clamped page size."""
+    limit = max(1, min(limit, MAX_SEARCH_PAGE_SIZE))
+    return {
+        "q": fts5_query(q) if dialect == "sqlite" else q,
+        "limit": limit + 1,
+        "offset": max(0, offset),
+    }, limit
+
+
+def missing_postgres_indexes(engine) -> List[str]:
+    """Names of the Postgres GIN search indexes (on the stored ``_tsv`` columns) that don't exist yet."""
+    from sqlalchemy import text
+
+    wanted = [_pg_index_name(table, column) for table, column, _ in _TARGETS.values()]
+    with engine.connect() as conn:
+        existing = {row[0] for row in conn.execute(
+            text("SELECT indexname FROM pg_indexes WHERE indexname = ANY(:names)"), {"names": wanted}
+        )}
+    return [name for name in wanted if name not in existing]
+
+
+def setup_search(engine, concurrently: bool = False):
+    """Create the full-text indexes for ``engine``'s dialect.
+
+    init_db only calls this for SQLite; on Postgres migrate_add_indexes.py runs it with
+    ``concurrently=True`` so the GIN builds don't lock the tables. Adding the generated
+    ``_tsv`` columns still rewrites each table once, so the first run needs a quiet window.
+    """
+    from sqlalchemy import inspect, text
+
+    dialect = engine.dialect.name
+    if dialect not in ("postgresql", "sqlite"):
+        print(f"[INFO] Full-text search not set up: unsupported dialect {dialect}")
+        return
+    statements = setup_statements(dialect, set(inspect(engine).get_table_names()), concurrently)
+    options = {"isolation_level": "AUTOCOMMIT"} if concurrently else {}
+    with engine.connect().execution_options(**options) as conn:
+        for statement in statements:
+            conn.execute(text(statement))
+        if not concurrently:
+            conn.commit()
@@ -0,0 +1,74 @@
+"""
+Lazy loading of a session's stored transcript tail.
+
+A session restored after a restart starts with an empty in-memory
+``history`` and ``history_loaded = False``. The first touch loads the last
+few stored messages; concurrent first touches share that one load. Until a
+load succeeds the session stays unloaded, so a failed load (e.g. the
+database was briefly unreachable) is retried on the next touch instead of
+letting new messages restart the seq numbering at 0.
+
+Messages appended while the session is unloaded are kept in memory and only
+get their seqs (and are persisted) once the stored tail is known.
+"""
+import asyncio
+from typing import Awaitable, Callable, List, Tuple
+
+StoredMessage = Tuple[int, dict]  # (seq, message)
+
+
+async def ensure_loaded(session: dict, load: Callable[[], Awaitable[None]]):
+    """Run ``load`` once per session; concurrent callers share it.
+
+    ``session["history_loaded"]`` is False, the loading task, or True. If the load
+    raises, the flag goes back to False and every waiter sees the exception.
+    """
+    loading = session["history_loaded"]
+    if loading is True:
+        return
+    if loading is False:
+        loading = session["history_loaded"] = asyncio.ensure_future(load())
+    try:
+        await asyncio.shield(loading)
+    except BaseException:
+        # a cancelled caller leaves the shared load running; a failed load is retried next time
+        failed = loading.done() and (loading.cancelled() or loading.exception() is not None)
+        if failed and session["history_loaded"] is loading:
+            session["history_loaded"] = False
+        raise
+    session["history_loaded"] = True
+
+
+def restore_tail(session: dict, tail: List[StoredMessage]) -> List[StoredMessage]:
+    """Prepend the stored tail (oldest first) to the in-memory history.
+
+    New seqs continue after the highest stored seq. Returns ``(seq, message)`` for the
+    messages appended while the session was unloaded; they still need persisting.
+    """
+    appended = list(session["history"])
+    if tail:
+        session["history"][:0] = [message for _, message in tail]
+        session["history_offset"] = tail[-1][0] + 1 - len(tail)
+        session["turn_cursor"] += len(tail)  # restored messages were answered before the restart
+    first_new = session["history_offset"] + len(tail)
+    return [(first_new + i, message) for i, message in enumerate(appended)]
+
+
+def message_count(session: dict) -> int:
+    """Messages in the whole transcript, including those older than the in-memory tail."""
+    return session.get("history_offset", 0) + len(session.get("history", []))
+
+
+def next_seq(session: dict) -> int:
+    return message_count(session)
+
+
+async def read_page(session: dict, start: int, end: int,
+                    load_range: Callable[[int, int], Awaitable[List[dict]]]) -> List[dict]:
+    """Messages with seq in [start, end): the in-memory part plus, below ``history_offset``,
+    whatever ``load_range`` reads from the messages table."""
+    offset = session["history_offset"]
+    page = session["history"][max(0, start - offset):max(0, end - offset)]
+    if start < offset:
+        page = await load_range(start, min(end, offset)) + page
+    return page
@@ -0,0 +1,224 @@
+"""
+Ordered indexes over the in-memory session store, for paginated listings.
+
+``chat_sessions`` is a ``SessionStore``: a dict that registers every new
+session in a ``SessionIndex``, which keeps one sorted list of
+``(timestamp, session_id)`` per sort field (``created_at``,
+``last_activity``), plus the same lists for escalated sessions only.
+``append_history`` touches the session and ``SessionStore.set_escalated``
+moves it in or out of the escalated lists, so a page of ``GET /sessions`` is
+a bisect into the right list (``active``/``idle`` become a ``last_activity``
+cut-off) plus a walk over about ``limit`` entries; only those sessions get
+serialized.
+
+Cursors are opaque (base64 of the last returned ``[timestamp, session_id]``),
+so pages stay stable while new sessions arrive at the other end of the list.
+"""
+import base64
+import json
+import os
+import time
+from bisect import bisect_left, bisect_right, insort
+from typing import Callable, Dict, List, Optional, Tuple
+
+SESSION_IDLE_SEC = float(os.getenv("SESSION_IDLE_SEC", "900"))
+SESSIONS_PAGE_SIZE = int(os.getenv("SESSIONS_PAGE_SIZE", "50"))
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "200"))
+MAX_PAGE_SIZE = 500
+
+SORT_CREATED = "created_at"
+SORT_ACTIVITY = "last_activity"
+SORT_FIELDS = (SORT_CREATED, SORT_ACTIVITY)
+
+STATUS_ESCALATED = "escalated"
+STATUS_ACTIVE = "active"  # not escalated, activity within SESSION_IDLE_SEC
+STATUS_IDLE = "idle"      # not escalated, quiet for longer than that
+STATUSES = (STATUS_ESCALATED, STATUS_ACTIVE, STATUS_IDLE)
+
+_MAX_SID = "\U0010ffff"
+
+
+def encode_cursor(ts: float, session_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([ts, session_id]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    """Raises ValueError for anything that isn't a cursor we issued."""
+    try:
+        ts, session_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return float(ts), str(session_id)
+    except Exception as e:
+        raise ValueError(f"invalid cursor: {cursor!r}") from e
+
+
+class SessionIndex:
+    def __init__(self, idle_after: float = SESSION_IDLE_SEC, clock: Callable[[], float] = time.time):
+        self.idle_after = idle_after
+        self._clock = clock
+        self._times: Dict[str, Dict[str, float]] = {}
+        self._sorted: Dict[str, List[Tuple[float, str]]] = {field: [] for field in SORT_FIELDS}
+        # the same keys for escalated sessions only, so status=escalated never walks the rest
+        self._escalated: Dict[str, List[Tuple[float, str]]] = {field: [] for field in SORT_FIELDS}
+        self._escalated_ids: set = set()
+
+    def __len__(self) -> int:
+        return len(self._times)
+
+    def add(self, session_id: str, created_at: Optional[float] = None, escalated: bool = False):
+        if session_id in self._times:
+            return
+        ts = self._clock() if created_at is None else created_at
+        self._times[session_id] = {SORT_CREATED: ts, SORT_ACTIVITY: ts}
+        for field in SORT_FIELDS:
+            insort(self._sorted[field], (ts, session_id))
+        self.set_escalated(session_id, escalated)
+
+    def touch(self, session_id: str, ts: Optional[float] = None):
+        """Record activity; O(log n) search plus one list move."""
+        times = self._times.get(session_id)
+        if times is None:
+            return self.add(session_id, ts)
+        ts = self._clock() if ts is None else ts
+        old = (times[SORT_ACTIVITY], session_id)
+        lists = [self._sorted[SORT_ACTIVITY]]
+        if session_id in self._escalated_ids:
+            lists.append(self._escalated[SORT_ACTIVITY])
+        for keys in lists:
+            _discard(keys, old)
+            insort(keys, (ts, session_id))
+        times[SORT_ACTIVITY] = ts
+
+    def set_escalated(self, session_id: str, escalated: bool):
+        times = self._times.get(session_id)
+        if times is None or escalated == (session_id in self._escalated_ids):
+            return
+        for field in SORT_FIELDS:
+            if escalated:
+                insort(self._escalated[field], (times[field], session_id))
+            else:
+                _discard(self._escalated[field], (times[field], session_id))
+        if escalated:
+            self._escalated_ids.add(session_id)
+        else:
+            self._escalated_ids.discard(session_id)
+
+    def remove(self, session_id: str):
+        self.set_escalated(session_id, False)
+        times = self._times.pop(session_id, None)
+        if times is None:
+            return
+        for field in SORT_FIELDS:
+            _discard(self._sorted[field], (times[field], session_id))
+
+    def times(self, session_id: str) -> Dict[str, float]:
+        return self._times.get(session_id, {})
+
+    def status(self, session_id: str, now: Optional[float] = None) -> str:
+        if session_id in self._escalated_ids:
+            return STATUS_ESCALATED
+        now = self._clock() if now is None else now
+        last = self._times.get(session_id, {}).get(SORT_ACTIVITY, now)
+        return STATUS_ACTIVE if now - last < self.idle_after else STATUS_IDLE
+
+    def page(self, sessions: Dict[str, dict], sort: str = SORT_ACTIVITY, order: str = "desc",
+             status: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None,
+             limit: int = SESSIONS_PAGE_SIZE, cursor: Optional[str] = None) -> Tuple[List[str], Optional[str]]:
+        """Session ids for one page, and the cursor of the next page (None on the last one).
+
+        ``since``/``until`` bound the sort field (inclusive); ``status`` is one of STATUSES.
+        ``escalated`` walks its own index; ``active``/``idle`` are a ``last_activity`` cut-off,
+        so with ``sort=last_activity`` they are bounds on the keys too (with
+        ``sort=created_at`` they are checked per entry).
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"sort must be one of {', '.join(SORT_FIELDS)}")
+        if order not in ("asc", "desc"):
+            raise ValueError("order must be 'asc' or 'desc'")
+        if status is not None and status not in STATUSES:
+            raise ValueError(f"status must be one of {', '.join(STATUSES)}")
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+        now = self._clock()
+        keys = self._escalated[sort] if status == STATUS_ESCALATED else self._sorted[sort]
+        lo = 0 if since is None else bisect_left(keys, (since, ""))
+        hi = len(keys) if until is None else bisect_right(keys, (until, _MAX_SID))
+        if sort == SORT_ACTIVITY and status in (STATUS_ACTIVE, STATUS_IDLE):
+            # active: last_activity > now - idle_after; idle: everything up to that cut-off
+            cut = bisect_right(keys, (now - self.idle_after, _MAX_SID))
+            lo, hi = (max(lo, cut), hi) if status == STATUS_ACTIVE else (lo, min(hi, cut))
+        if cursor is not None:
+            position = decode_cursor(cursor)
+            if order == "desc":
+                hi = min(hi, bisect_left(keys, position))
+            else:
+                lo = max(lo, bisect_right(keys, position))
+
+        check_status = status in (STATUS_ACTIVE, STATUS_IDLE)  # escalated ones are interleaved (few)
+        indices = range(hi - 1, lo - 1, -1) if order == "desc" else range(lo, hi)
+        out: List[str] = []
+        last_key = None
+        for i in indices:
+            ts, session_id = keys[i]
+            if session_id not in sessions or (check_status and self.status(session_id, now) != status):
+                continue
+            if len(out) == limit:
+                return out, encode_cursor(*last_key)
+            out.append(session_id)
+            last_key = (ts, session_id)
+        return out, None
+
+
+def _discard(keys: List[Tuple[float, str]], key: Tuple[float, str]):
+    i = bisect_left(keys, key)
+    if i < len(keys) and keys[i] == key:
+        del keys[i]
+
+
+class SessionStore(dict):
+    """``chat_sessions``: a plain dict of session state that keeps a SessionIndex in step."""
+
+    def __init__(self, index: Optional[SessionIndex] = None):
+        super().__init__()
+        self.index = index if index is not None else SessionIndex()
+
+    def __setitem__(self, session_id: str, session: dict):
+        if session_id not in self:
+            self.index.add(session_id)
+        self.index.set_escalated(session_id, bool(session.get("escalated")))
+        super().__setitem__(session_id, session)
+
+    def set_escalated(self, session_id: str, escalated: bool):
+        """Change a session's ``escalated`` flag; always go through here so the index follows."""
+        session = self.get(session_id)
+        if session is not None:
+            session["escalated"] = escalated
+            self.index.set_escalated(session_id, escalated)
+
+    def __delitem__(self, session_id: str):
+        super().__delitem__(session_id)
+        self.index.remove(session_id)
+
+    def pop(self, session_id: str, *default):
+        if session_id in self:
+            self.index.remove(session_id)
+        return super().pop(session_id, *default)
+
+    def touch(self, session_id: str):
+        self.index.touch(session_id)
+
+
+def history_window(history_len: int, offset: int, limit: int = HISTORY_PAGE_SIZE,
+                   before: Optional[int] = None, after: Optional[int] = None) -> Tuple[int, int]:
+    """Seq range [start, end) of one history page.
+
+    ``history`` holds seqs ``offset .. offset + history_len - 1`` (older ones are only
+    in the messages table). With ``after`` the page walks forward from that seq;
+    otherwise it is the ``limit`` messages before ``before`` (default: the newest).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    total = offset + history_len
+    if after is not None:
+        start = min(max(0, after + 1), total)
+        return start, min(total, start + limit)
+    end = total if before is None else max(0, min(before, total))
+    return max(0, end - limit), end
@@ -0,0 +1,223 @@
+"""
+Conversation summaries for escalation alerts and the session summary endpoint.
+
+The default summary is extractive and local: the customer's most informative
+sentences (term-frequency scored, stopwords ignored) plus message counts and
+the latest customer message. It takes microseconds, so escalating never waits
+on Groq. When ``SUMMARY_LLM_UPGRADE`` is on, an LLM summary is generated in
+the background afterwards and replaces the local one once it catches up.
+
+Summaries are cached per session (``SessionSummary``) and keyed by the number
+of history messages they cover: repeated requests for an unchanged session
+are free, and new messages are folded into the existing extractive state and
+LLM summary instead of re-summarizing the whole conversation.
+"""
+import asyncio
+import heapq
+import math
+import os
+import re
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+SUMMARY_MAX_POINTS = int(os.getenv("SUMMARY_MAX_POINTS", "3"))
+SUMMARY_LLM_UPGRADE = os.getenv("SUMMARY_LLM_UPGRADE", "true").lower() in ("1", "true", "yes")
+
+SOURCE_EXTRACTIVE = "extractive"
+SOURCE_LLM = "llm"
+
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9'+./-]*")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+_STOPWORDS = frozenset("""
+a an the and or but if then so to of in on at for with from by about as is are was were be been being
+i me my we our you your it its this that these those there here do does did have has had can could
+would should will shall may might must not no yes ok okay please thanks thank hi hello hey just
+what which who whom how when where why any some all more most very too also get got want need like
+""".split())
+
+
+def _words(text: str) -> List[str]:
+    return [w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS and len(w) > 1]
+
+
+def _clip(text: str, limit: int = 160) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+
+class _ExtractiveState:
+    """Running term counts over the customer's sentences, extended one message at a time."""
+
+    __slots__ = ("message_count", "roles", "sentences", "freq", "last_user")
+
+    def __init__(self):
+        self.message_count = 0
+        self.roles: Counter = Counter()
+        self.sentences: List[tuple] = []  # (position, sentence, unique words)
+        self.freq: Counter = Counter()
+        self.last_user = ""
+
+    def extend(self, messages: List[dict]):
+        for m in messages:
+            self.message_count += 1
+            self.roles[m.get("role")] += 1
+            if m.get("role") != "user":
+                continue
+            self.last_user = m.get("content") or ""
+            for sentence in _SENTENCE_RE.split(self.last_user):
+                words = frozenset(_words(sentence))
+                if words:
+                    self.sentences.append((len(self.sentences), sentence.strip(), words))
+                    self.freq.update(words)
+
+    def render(self, max_points: int) -> str:
+        header = (f"Customer messages: {self.roles.get('user', 0)}, bot replies: {self.roles.get('assistant', 0)}, "
+                  f"agent replies: {self.roles.get('agent', 0)}")
+        if not self.sentences:
+            return f"{header}\nNo customer messages yet."
+
+        freq, total = self.freq, len(self.sentences)
+
+        def score(item):
+            position, _, words = item
+            # informative (recurring terms) but not just long; later sentences break ties
+            return sum(freq[w] for w in words) / math.sqrt(len(words)) + 0.5 * position / total
+
+        picked = sorted(heapq.nlargest(max_points, self.sentences, key=score))
+        lines = [header, "Key points:"]
+        lines += [f"- {_clip(sentence)}" for _, sentence, _ in picked]
+        lines.append(f"Latest customer message: {_clip(self.last_user)}")
+        return "\n".join(lines)
+
+
+def extractive_summary(history: List[dict], max_points: int = SUMMARY_MAX_POINTS) -> str:
+    """Pick the customer's most informative sentences; no model calls."""
+    state = _ExtractiveState()
+    state.extend(history)
+    return state.render(max_points)
+
+
+class SessionSummary:
+    """Cached summary state for one session, keyed by how many history messages it covers.
+
+    History is append-only, so new messages only ever extend the extractive state and
+    the LLM summary is updated from its previous text plus the messages since.
+    """
+
+    def __init__(self):
+        self._extractive = _ExtractiveState()
+        self._rendered: Optional[Tuple[int, int, str]] = None  # (message_count, max_points, text)
+        self.llm: Optional[Tuple[int, str]] = None  # (message_count, text); replaced atomically
+
+    @property
+    def message_count(self) -> int:
+        return self._extractive.message_count
+
+    def extend(self, history: List[dict]) -> int:
+        new = history[self._extractive.message_count:]
+        if new:
+            self._extractive.extend(new)
+        return len(new)
+
+    def extractive(self, max_points: int) -> str:
+        count = self._extractive.message_count
+        if self._rendered is None or self._rendered[:2] != (count, max_points):
+            self._rendered = (count, max_points, self._extractive.render(max_points))
+        return self._rendered[2]
+
+    def set_llm(self, message_count: int, text: str):
+        # a slower background summary must not replace a newer one
+        if self.llm is None or self.llm[0] <= message_count:
+            self.llm = (message_count, text)
+
+
+class SummaryService:
+    def __init__(self, llm_summarize: Optional[Callable[[List[dict]], str]] = None,
+                 llm_extend: Optional[Callable[[str, List[dict]], str]] = None,
+                 llm_upgrade: bool = SUMMARY_LLM_UPGRADE, max_points: int = SUMMARY_MAX_POINTS):
+        """Both LLM callables are blocking and always run in a worker thread.
+
+        ``llm_summarize(history)`` summarizes from scratch; ``llm_extend(previous, new_messages)``
+        folds new messages into an existing summary and is preferred once one exists.
+        """
+        self._llm_summarize = llm_summarize
+        self._llm_extend = llm_extend
+        self.llm_upgrade = llm_upgrade and llm_summarize is not None
+        self.max_points = max_points
+        self._upgrades: Dict[str, asyncio.Task] = {}
+        self._counters = {
+            "requests": 0, "cache_hits": 0, "messages_folded": 0,
+            "llm_full": 0, "llm_incremental": 0, "llm_failures": 0, "upgrades_skipped": 0,
+        }
+
+    def local(self, history: List[dict]) -> str:
+        return extractive_summary(history, self.max_points)
+
+    def summarize(self, key: str, summary: SessionSummary, history: List[dict],
+                  on_llm: Optional[Callable[[str], None]] = None) -> Tuple[str, str, int]:
+        """Current summary of ``history`` as (text, source, message_count).
+
+        Only messages the cached state hasn't seen are processed; if the LLM summary doesn't
+        cover them yet, the extractive one is returned and an LLM update is scheduled (needs
+        a running event loop). ``on_llm`` is called with the new LLM text in the worker thread.
+        """
+        self._counters["requests"] += 1
+        folded = summary.extend(history)
+        self._counters["messages_folded"] += folded
+        count = summary.message_count
+
+        llm = summary.llm
+        if llm is not None and llm[0] == count:
+            self._counters["cache_hits"] += 1
+            return llm[1], SOURCE_LLM, count
+        if not folded:
+            self._counters["cache_hits"] += 1
+        self.upgrade_in_background(key, summary, list(history[:count]), on_llm)
+        return summary.extractive(self.max_points), SOURCE_EXTRACTIVE, count
+
+    def upgrade_in_background(self, key: str, summary: SessionSummary, history: List[dict],
+                              on_llm: Optional[Callable[[str], None]] = None) -> Optional[asyncio.Task]:
+        """Bring ``summary.llm`` up to date with ``history`` off the request path.
+
+        At most one upgrade runs per ``key``; a request for a key that is already being
+        upgraded is skipped. Must be called from the event loop.
+        """
+        if not self.llm_upgrade:
+            return None
+        running = self._upgrades.get(key)
+        if running is not None and not running.done():
+            self._counters["upgrades_skipped"] += 1
+            return None
+        task = asyncio.get_running_loop().create_task(self._upgrade(key, summary, history, on_llm))
+        self._upgrades[key] = task
+        return task
+
+    async def _upgrade(self, key: str, summary: SessionSummary, history: List[dict], on_llm):
+        try:
+            await asyncio.to_thread(self._summarize_and_apply, summary, history, on_llm)
+        except Exception as e:
+            self._counters["llm_failures"] += 1
+            print(f"[ERROR] LLM summary for {key} failed, keeping extractive summary: {e}")
+        finally:
+            if self._upgrades.get(key) is asyncio.current_task():
+                del self._upgrades[key]
+
+    def _summarize_and_apply(self, summary: SessionSummary, history: List[dict], on_llm):
+        previous = summary.llm
+        if previous is not None and previous[0] >= len(history):
+            return
+        if previous is not None and self._llm_extend is not None:
+            text = self._llm_extend(previous[1], history[previous[0]:])
+            self._counters["llm_incremental"] += 1
+        else:
+            text = self._llm_summarize(history)
+            self._counters["llm_full"] += 1
+        text = (text or "").strip()
+        if not text:
+            return
+        summary.set_llm(len(history), text)
+        if on_llm is not None:
+            on_llm(text)
+
+    def stats(self) -> dict:
+        return {"llm_upgrade": self.llm_upgrade, "upgrades_in_flight": len(self._upgrades), **self._counters}
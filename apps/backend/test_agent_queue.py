@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test script for the indexed escalation work queue
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from agent_queue import EscalationQueue, CLAIM_OK, CLAIM_HELD, CLAIM_CONFLICT, CLAIM_MISSING, end_escalation
+
+
+def _iso(minutes_ago: int) -> str:
+    return (datetime.now() - timedelta(minutes=minutes_ago)).isoformat()
+
+
+def test_waiting_is_ordered_by_escalated_at():
+    queue = EscalationQueue()
+    queue.enqueue("agent_b", "s2", _iso(5))
+    queue.enqueue("agent_a", "s1", _iso(10))
+    queue.enqueue("agent_c", "s3", _iso(1))
+    assert [e["agent_id"] for e in queue.waiting()] == ["agent_a", "agent_b", "agent_c"]
+    assert [e["agent_id"] for e in queue.waiting(limit=1)] == ["agent_a"]
+    assert not queue.enqueue("agent_a", "s1", _iso(0))
+    print("✓ Waiting escalations are listed oldest first")
+
+
+def test_claim_is_exclusive():
+    queue = EscalationQueue()
+    queue.enqueue("agent_a", "s1", _iso(2))
+    assert queue.try_claim("agent_a", "alice@example.com") == CLAIM_OK
+    assert queue.try_claim("agent_a", "bob@example.com") == CLAIM_CONFLICT
+    assert queue.try_claim("agent_a", "alice@example.com") == CLAIM_HELD
+    assert queue.claim("agent_a", "alice@example.com")  # taking it again is not a conflict
+    assert not queue.claim("agent_a", "bob@example.com")
+    assert queue.try_claim("agent_x", "alice@example.com") == CLAIM_MISSING
+    assert queue.claimed_by("agent_a") == "alice@example.com"
+    assert len(queue) == 0
+
+    stats = queue.stats()
+    assert stats["claimed"] == 1
+    assert stats["claim_conflicts"] == 2
+    assert stats["avg_wait_to_claim_sec"] >= 119
+    print("✓ Only one employee can claim an escalation; the holder can re-claim it")
+
+
+def test_complete_keeps_order_index_in_step():
+    queue = EscalationQueue()
+    for i in range(200):
+        queue.enqueue(f"agent_{i}", f"s{i}", _iso(200 - i))
+    for i in range(150):
+        assert queue.complete(f"agent_{i}")
+    assert not queue.complete("agent_0")
+    assert len(queue) == 50
+    assert queue.waiting(limit=1)[0]["agent_id"] == "agent_150"
+    assert queue.claim("agent_150", "alice@example.com")
+    assert [e["agent_id"] for e in queue.waiting(limit=2)] == ["agent_151", "agent_152"]
+    assert len(queue._order) == len(queue) == 49
+    print("✓ Completed and claimed escalations leave the ordered index")
+
+
+def test_idle_claims_expire():
+    queue = EscalationQueue()
+    queue.enqueue("agent_a", "s1", _iso(5))
+    queue.enqueue("agent_b", "s2", _iso(4))
+    queue.claim("agent_a", "alice@example.com")
+    queue.claim("agent_b", "bob@example.com")
+    queue._claimed["agent_a"]["last_active_ts"] -= 3600
+    assert queue.expire_claimed(idle_sec=600) == ["agent_a"]
+    assert queue.claimed_by("agent_a") is None and queue.claimed_by("agent_b") == "bob@example.com"
+    assert queue.stats()["claims_expired"] == 1 and queue.stats()["claimed_active"] == 1
+    print("✓ Claims without agent activity expire")
+
+
+def _escalated_session(agent_id: str) -> dict:
+    return {"escalated": True, "agent_id": agent_id, "escalated_at": _iso(3), "low_confidence_streak": 2}
+
+
+def _customer_message_goes_to(session: dict) -> str:
+    # the check process_chat_message / the customer socket make before calling the bot
+    return "agent" if session.get("escalated") else "bot"
+
+
+def test_closed_escalation_hands_customer_back_to_bot():
+    queue = EscalationQueue()
+    session = _escalated_session("agent_a")
+    queue.enqueue("agent_a", "s1", session["escalated_at"])
+    queue.claim("agent_a", "alice@example.com")
+    assert _customer_message_goes_to(session) == "agent"
+
+    assert queue.complete("agent_a") and end_escalation(session, "agent_a")
+    assert _customer_message_goes_to(session) == "bot"
+    assert session["agent_id"] is None and session["low_confidence_streak"] == 0
+    assert queue.closed_session("agent_a") == "s1"  # can still be taken again
+
+    # a session already re-escalated to another agent is left alone
+    session = _escalated_session("agent_b")
+    assert not end_escalation(session, "agent_a") and session["escalated"]
+    print("✓ Closing an escalation hands the customer back to the bot")
+
+
+def test_expired_claim_hands_customer_back_to_bot():
+    queue = EscalationQueue(closed_max=1)
+    session = _escalated_session("agent_a")
+    queue.enqueue("agent_a", "s1", session["escalated_at"])
+    queue.claim("agent_a", "alice@example.com")
+    queue._claimed["agent_a"]["last_active_ts"] -= 3600
+    for agent_id in queue.expire_claimed(idle_sec=600):
+        end_escalation(session, agent_id)
+    assert _customer_message_goes_to(session) == "bot"
+    assert queue.closed_session("agent_a") == "s1"
+
+    # re-escalating under the same id takes it out of the closed set; the set is bounded
+    assert queue.enqueue("agent_a", "s1", _iso(0)) and queue.closed_session("agent_a") is None
+    queue.enqueue("agent_b", "s2", _iso(0))
+    queue.complete("agent_a")
+    queue.complete("agent_b")
+    assert queue.closed_session("agent_a") is None and queue.closed_session("agent_b") == "s2"
+    print("✓ Expired claims hand the customer back to the bot")
+
+
+if __name__ == "__main__":
+    test_waiting_is_ordered_by_escalated_at()
+    test_claim_is_exclusive()
+    test_complete_keeps_order_index_in_step()
+    test_idle_claims_expire()
+    test_closed_escalation_hands_customer_back_to_bot()
+    test_expired_claim_hands_customer_back_to_bot()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script for incremental analytics rollups
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from analytics import RollupAggregator, merge_rollups, bucket_start, default_window, to_local_naive, GRANULARITY_HOUR, GRANULARITY_DAY
+
+
+def test_events_accumulate_per_bucket():
+    agg = RollupAggregator()
+    t1 = datetime(2024, 5, 1, 10, 15)
+    t2 = datetime(2024, 5, 1, 11, 5)
+    agg.session_started(t1)
+    agg.message("user", ts=t1)
+    agg.message("assistant", confidence=0.8, ts=t1)
+    agg.message("assistant", confidence=0.4, ts=t2)
+    agg.message("system", ts=t2)  # not counted
+    agg.escalation(t2)
+
+    hourly = agg.pending(GRANULARITY_HOUR)
+    assert [r["bucket_start"] for r in hourly] == [datetime(2024, 5, 1, 10), datetime(2024, 5, 1, 11)]
+    assert hourly[0]["user_messages"] == 1 and hourly[0]["bot_messages"] == 1 and hourly[0]["confidence_count"] == 1
+    daily = agg.pending(GRANULARITY_DAY)
+    assert len(daily) == 1 and daily[0]["bot_messages"] == 2 and daily[0]["escalations"] == 1
+
+    records = agg.drain()
+    assert len(records) == 3 and agg.stats() == {"pending_buckets": 0, "flushed_records": 3}
+    assert agg.drain() == []
+    print("✓ Events accumulate into hourly and daily buckets and drain as deltas")
+
+
+def test_merge_stored_rows_with_pending_deltas():
+    h10, h11, h12 = (datetime(2024, 5, 1, h) for h in (10, 11, 12))
+    stored = [
+        {"bucket_start": h10, "sessions_started": 4, "user_messages": 10, "bot_messages": 9, "agent_messages": 0,
+         "escalations": 1, "confidence_sum": 6.3, "confidence_count": 9},
+        {"bucket_start": h11, "sessions_started": 2, "user_messages": 3, "bot_messages": 2, "agent_messages": 1,
+         "escalations": 1, "confidence_sum": 1.0, "confidence_count": 2},
+    ]
+    agg = RollupAggregator()
+    agg.session_started(datetime(2024, 5, 1, 11, 30))
+    agg.message("assistant", confidence=0.9, ts=datetime(2024, 5, 1, 12, 1))
+
+    buckets, totals = merge_rollups(stored, agg.pending(GRANULARITY_HOUR), since=h10, until=h12)
+    assert [b["bucket_start"] for b in buckets] == ["2024-05-01T10:00:00", "2024-05-01T11:00:00"]
+    assert buckets[0]["escalation_rate"] == 0.25 and buckets[0]["average_confidence"] == 0.7
+    assert buckets[1]["sessions_started"] == 3  # stored 2 + one unflushed
+    assert totals["sessions_started"] == 7 and totals["escalations"] == 2
+    assert totals["average_confidence"] == round(7.3 / 11, 4)
+
+    empty_buckets, empty_totals = merge_rollups([], [])
+    assert empty_buckets == [] and empty_totals["average_confidence"] is None
+    print("✓ Dashboards combine stored rollups with unflushed deltas")
+
+
+def test_bucket_boundaries():
+    ts = datetime(2024, 5, 1, 23, 59, 59, 999)
+    assert bucket_start(ts, GRANULARITY_HOUR) == datetime(2024, 5, 1, 23)
+    assert bucket_start(ts, GRANULARITY_DAY) == datetime(2024, 5, 1)
+    since, until = default_window(GRANULARITY_HOUR, now=ts)
+    assert since == datetime(2024, 4, 29, 23) and until > ts
+    print("✓ Buckets align to hour and day boundaries")
+
+
+def test_timezone_aware_bounds():
+    h10 = datetime(2024, 5, 1, 10)
+    stored = [{"bucket_start": h10, "sessions_started": 1, "user_messages": 0, "bot_messages": 0, "agent_messages": 0,
+               "escalations": 0, "confidence_sum": 0, "confidence_count": 0}]
+    # the same instants as naive local time, expressed as UTC-aware values (?since=...Z)
+    since = h10.astimezone(timezone.utc)
+    until = (h10 + timedelta(hours=1)).astimezone(timezone.utc)
+    assert to_local_naive(since) == h10 and to_local_naive(h10) is h10 and to_local_naive(None) is None
+    buckets, totals = merge_rollups(stored, [], since=since, until=until)
+    assert [b["bucket_start"] for b in buckets] == ["2024-05-01T10:00:00"] and totals["sessions_started"] == 1
+    assert merge_rollups(stored, [], since=until)[0] == []
+    print("✓ Timezone-aware bounds are compared as local time")
+
+
+if __name__ == "__main__":
+    test_events_accumulate_per_bucket()
+    test_merge_stored_rows_with_pending_deltas()
+    test_bucket_boundaries()
+    test_timezone_aware_bounds()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Test script for the precomputed bot test run aggregates
+"""
+
+import os
+import sys
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bot_tests import run_aggregates, percentile, case_passed
+
+
+def test_percentiles_use_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([120], 99) == 120.0
+    assert percentile([], 50) == 0.0
+    print("✓ Latency percentiles use the nearest-rank method")
+
+
+def test_run_aggregates():
+    aggregates = run_aggregates([0.9, 0.6, 0.3, 0.8], [400, 100, 300, 200])
+    assert aggregates["total_tests"] == 4
+    assert (aggregates["passed_tests"], aggregates["failed_tests"]) == (3, 1)
+    assert aggregates["accuracy_percentage"] == 75.0
+    assert round(aggregates["average_confidence"], 3) == 0.65
+    assert aggregates["average_response_ms"] == 250.0
+    assert (aggregates["p50_response_ms"], aggregates["p95_response_ms"], aggregates["max_response_ms"]) == (200.0, 400.0, 400.0)
+    assert case_passed(0.6) and not case_passed(0.59)
+
+    empty = run_aggregates([], [])
+    assert empty["total_tests"] == 0 and empty["accuracy_percentage"] == 0.0 and empty["p99_response_ms"] == 0.0
+    print("✓ Run aggregates match the accuracy-test pass rule")
+
+
+if __name__ == "__main__":
+    test_percentiles_use_nearest_rank()
+    test_run_aggregates()
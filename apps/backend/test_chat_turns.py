@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Test script for per-session turn serialization and burst coalescing
+"""
+
+import asyncio
+import os
+import sys
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from chat_turns import SessionTurnCoordinator
+
+
+def test_burst_shares_one_turn():
+    async def run():
+        calls = []
+
+        async def run_turn(session_id):
+            calls.append(session_id)
+            await asyncio.sleep(0.01)
+            return {"reply": f"turn {len(calls)}"}
+
+        coordinator = SessionTurnCoordinator(run_turn, coalesce_window=0.02)
+        results = await asyncio.gather(*(coordinator.submit("s1") for _ in range(3)))
+        assert calls == ["s1"]
+        assert results == [{"reply": "turn 1"}] * 3
+        assert coordinator.stats()["llm_calls_saved"] == 2
+        assert coordinator.stats()["sessions_in_flight"] == 0
+
+    asyncio.run(run())
+    print("✓ A burst of messages is answered by a single turn")
+
+
+def test_messages_during_flight_get_one_follow_up():
+    async def run():
+        active = 0
+        max_active = 0
+        calls = 0
+
+        async def run_turn(session_id):
+            nonlocal active, max_active, calls
+            calls += 1
+            this_call = calls
+            active += 1
+            max_active = max(max_active, active)
+            await asyncio.sleep(0.05)
+            active -= 1
+            return this_call
+
+        coordinator = SessionTurnCoordinator(run_turn, coalesce_window=0, supersede=False)
+        first = asyncio.ensure_future(coordinator.submit("s1"))
+        await asyncio.sleep(0.01)  # first turn is now in flight
+        follow_ups = [asyncio.ensure_future(coordinator.submit("s1")) for _ in range(4)]
+        other = asyncio.ensure_future(coordinator.submit("s2"))
+
+        assert await first == 1
+        assert {await f for f in follow_ups} == {3}  # s2 ran concurrently as call 2
+        await other
+        assert calls == 3
+        assert max_active == 2  # s1 and s2 overlap, but never two turns of s1
+        assert coordinator.stats()["llm_calls_saved"] == 3
+
+    asyncio.run(run())
+    print("✓ Messages arriving mid-turn are merged into one follow-up turn")
+
+
+def test_turn_errors_propagate_to_callers():
+    async def run():
+        async def run_turn(session_id):
+            raise RuntimeError("groq down")
+
+        coordinator = SessionTurnCoordinator(run_turn, coalesce_window=0)
+        try:
+            await coordinator.submit("s1")
+        except RuntimeError as e:
+            assert "groq down" in str(e)
+        else:
+            raise AssertionError("expected RuntimeError")
+        # fire-and-forget callers don't leak "exception never retrieved" warnings
+        coordinator.submit_nowait("s1")
+        await asyncio.sleep(0.01)
+        assert coordinator.stats()["turn_errors"] == 2
+
+    asyncio.run(run())
+    print("✓ Turn failures reach awaiting callers")
+
+
+def test_newer_message_supersedes_in_flight_turn():
+    async def run():
+        started = []
+
+        async def run_turn(session_id):
+            started.append(session_id)
+            await asyncio.sleep(0.05)
+            return len(started)
+
+        coordinator = SessionTurnCoordinator(run_turn, coalesce_window=0, max_supersedes=1)
+        first = asyncio.ensure_future(coordinator.submit("s1"))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(coordinator.submit("s1"))  # supersedes turn 1
+        await asyncio.sleep(0.01)
+        third = asyncio.ensure_future(coordinator.submit("s1"))  # limit reached: queued as follow-up
+
+        assert await first == 2 and await second == 2
+        assert await third == 3
+        stats = coordinator.stats()
+        assert stats["turns_superseded"] == 1
+        assert stats["turns_run"] == 2
+
+    asyncio.run(run())
+    print("✓ A newer message cancels and restarts the in-flight turn")
+
+
+def test_cancel_drops_unawaited_work():
+    async def run():
+        finished = []
+
+        async def run_turn(session_id):
+            await asyncio.sleep(0.05)
+            finished.append(session_id)
+
+        coordinator = SessionTurnCoordinator(run_turn, coalesce_window=0)
+        future = coordinator.submit_nowait("s1")
+        await asyncio.sleep(0.01)
+        assert coordinator.cancel("s1")
+        await asyncio.sleep(0.06)
+        assert future.cancelled()
+        assert finished == []
+        assert coordinator.stats()["turns_cancelled"] == 1
+        assert coordinator.stats()["sessions_in_flight"] == 0
+
+        # a REST caller still waiting keeps the turn alive
+        waiting = asyncio.ensure_future(coordinator.submit("s2"))
+        await asyncio.sleep(0.01)
+        assert not coordinator.cancel("s2")
+        await waiting
+        assert finished == ["s2"]
+
+        # ...but once that caller goes away, the turn can be cancelled again
+        waiting = asyncio.ensure_future(coordinator.submit("s3"))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        await asyncio.sleep(0)
+        assert coordinator.cancel("s3")
+        await asyncio.sleep(0.06)
+        assert finished == ["s2"]
+
+    asyncio.run(run())
+    print("✓ Disconnect cancels work nobody is waiting for")
+
+
+if __name__ == "__main__":
+    test_burst_shares_one_turn()
+    test_messages_during_flight_get_one_follow_up()
+    test_turn_errors_propagate_to_callers()
+    test_newer_message_supersedes_in_flight_turn()
+    test_cancel_drops_unawaited_work()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test script for the WebSocket connection manager's per-connection send queues
+"""
+
+import asyncio
+import os
+import sys
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from connections import ConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self, stall: bool = False, fail: bool = False):
+        self.sent = []
+        self.closed_with = None
+        self.stall = stall
+        self.fail = fail
+        self.release = asyncio.Event()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        if self.fail:
+            raise RuntimeError("socket is dead")
+        if self.stall:
+            await self.release.wait()
+        self.sent.append(message)
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+
+def test_broadcast_does_not_wait_for_slow_watcher():
+    async def run():
+        manager = ConnectionManager(queue_size=8)
+        customer, watcher = FakeWebSocket(), FakeWebSocket(stall=True)
+        await manager.connect(customer, "c1")
+        await manager.connect(watcher, "w1")
+        manager.session_connections["s1"] = "c1"
+        manager.session_watchers["s1"] = {"w1"}
+
+        await asyncio.wait_for(manager.broadcast_to_session("hello", "s1"), timeout=1)
+        await asyncio.sleep(0.01)
+        assert customer.sent == ["hello"]
+        assert watcher.sent == []
+
+        watcher.release.set()
+        await asyncio.sleep(0.01)
+        assert watcher.sent == ["hello"]
+        manager.disconnect("c1")
+        manager.disconnect("w1")
+
+    asyncio.run(run())
+    print("✓ Broadcast is not blocked by a stalled watcher")
+
+
+def test_slow_consumer_drops_typing_then_disconnects():
+    async def run():
+        manager = ConnectionManager(queue_size=3, policy="drop_typing")
+        ws = FakeWebSocket(stall=True)
+        await manager.connect(ws, "w1")
+        await asyncio.sleep(0)  # writer picks up nothing yet
+
+        assert manager.enqueue("typing-1", "w1", droppable=True)
+        assert manager.enqueue("msg-1", "w1")
+        assert manager.enqueue("msg-2", "w1")
+        # queue full: typing is refused outright
+        assert not manager.enqueue("typing-2", "w1", droppable=True)
+        # a real message evicts the queued typing event instead
+        assert manager.enqueue("msg-3", "w1")
+        assert manager.stats()["typing_dropped"] == 2
+
+        # still full of real messages: connection gets disconnected
+        assert not manager.enqueue("msg-4", "w1")
+        await asyncio.sleep(0.01)
+        stats = manager.stats()
+        assert stats["slow_consumer_disconnects"] == 1
+        assert stats["connections"] == 0
+        assert "w1" not in manager.active_connections
+        assert ws.closed_with == 1013
+
+    asyncio.run(run())
+    print("✓ Slow consumer drops typing events first, then gets disconnected")
+
+
+def test_dead_socket_is_evicted_without_raising():
+    async def run():
+        manager = ConnectionManager()
+        ws = FakeWebSocket(fail=True)
+        await manager.connect(ws, "c1")
+        manager.session_connections["s1"] = "c1"
+
+        await manager.broadcast_to_session("hello", "s1")
+        await asyncio.sleep(0.01)
+        assert manager.stats()["send_errors"] == 1
+        assert "s1" not in manager.session_connections
+        # further sends are silently ignored
+        await manager.broadcast_to_session("again", "s1")
+
+    asyncio.run(run())
+    print("✓ Dead socket is evicted and does not raise into the sender")
+
+
+if __name__ == "__main__":
+    test_broadcast_does_not_wait_for_slow_watcher()
+    test_slow_consumer_drops_typing_then_disconnects()
+    test_dead_socket_is_evicted_without_raising()
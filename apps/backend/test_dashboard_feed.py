@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test script for push-based dashboard deltas over /ws/agent
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dashboard_feed import DashboardFeed
+
+
+def test_immediate_deltas_are_versioned():
+    published = []
+    feed = DashboardFeed(lambda frame: published.append(json.loads(frame)) or 2)
+    feed.session_escalated("agent_a", "s1", "2024-01-01T10:00:00", 3)
+    feed.session_taken("agent_a", "s1", "alice@example.com")
+    feed.session_closed("agent_a", "s1")
+
+    assert [e["op"] for e in published] == ["escalated", "taken", "closed"]
+    assert [e["version"] for e in published] == [1, 2, 3]
+    assert all(e["type"] == "queue_delta" for e in published)
+    assert feed.stats()["frames_delivered"] == 6
+    print("✓ Escalated/taken/closed deltas are pushed immediately with versions")
+
+
+def test_message_counts_are_coalesced():
+    async def run():
+        published = []
+        feed = DashboardFeed(lambda frame: published.append(json.loads(frame)) or 1, flush_interval=0.02)
+        for count in range(1, 6):
+            feed.message_count_changed("s1", count)
+        feed.message_count_changed("s2", 1)
+        assert published == []
+
+        await asyncio.sleep(0.05)
+        assert len(published) == 1
+        sessions = {s["session_id"]: s["message_count"] for s in published[0]["sessions"]}
+        assert sessions == {"s1": 5, "s2": 1}
+        assert feed.stats()["message_counts_coalesced"] == 4
+
+    asyncio.run(run())
+    print("✓ Message-count changes are batched into one delta")
+
+
+if __name__ == "__main__":
+    test_immediate_deltas_are_versioned()
+    test_message_counts_are_coalesced()
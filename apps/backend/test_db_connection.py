@@ -40,6 +40,32 @@ def test_database_connection():
         print(f"✗ Database connection test failed: {e}")
         return False
 
+def test_async_session():
+    """Test the async engine used by request handlers"""
+    try:
+        import asyncio
+        from sqlalchemy import func, select
+        from database import AsyncSessionLocal, async_engine, pool_stats
+        from models import User
+
+        print("\nTesting async database session...")
+
+        async def count_users():
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(select(func.count()).select_from(User))
+                count = result.scalar_one()
+            await async_engine.dispose()
+            return count
+
+        user_count = asyncio.run(count_users())
+        print(f"✓ Async session works, {user_count} users found")
+        print(f"✓ Pool stats: {pool_stats()}")
+        return True
+
+    except Exception as e:
+        print(f"✗ Async session test failed: {e}")
+        return False
+
 def test_authentication():
     """Test authentication functions"""
     try:
@@ -98,6 +124,7 @@ def main():
     
     tests = [
         ("Database Connection", test_database_connection),
+        ("Async Session", test_async_session),
         ("Authentication", test_authentication),
         ("Models", test_models)
     ]
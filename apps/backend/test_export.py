@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming NDJSON export
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import sys
+from datetime import datetime
+from types import SimpleNamespace
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from export import ndjson_chunks, gzip_chunks, message_record, conversation_record
+
+
+def _messages(count: int):
+    return [SimpleNamespace(session_id="s1", seq=i, role="user" if i % 2 == 0 else "assistant",
+                            content=f"message {i} with \"quotes\"\nand newlines", confidence=None,
+                            agent_id=None, timestamp=datetime(2024, 5, 1, 10, 0, i % 60)) for i in range(count)]
+
+
+async def _partitions(rows, size):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+async def _collect(chunks) -> list:
+    return [chunk async for chunk in chunks]
+
+
+def test_one_chunk_per_partition():
+    rows = _messages(25)
+    chunks = asyncio.run(_collect(ndjson_chunks(_partitions(rows, 10), message_record)))
+    assert len(chunks) == 3
+    lines = b"".join(chunks).decode().splitlines()
+    assert len(lines) == 25  # embedded newlines stay escaped inside each record
+    first = json.loads(lines[0])
+    assert first["seq"] == 0 and first["timestamp"] == "2024-05-01T10:00:00"
+    assert first["content"].endswith("\nand newlines")
+    print("✓ Rows stream as NDJSON, one chunk per cursor partition")
+
+
+def test_gzip_stream_round_trips():
+    rows = _messages(2000)
+    chunks = asyncio.run(_collect(gzip_chunks(ndjson_chunks(_partitions(rows, 500), message_record))))
+    plain = gzip.decompress(b"".join(chunks)).decode()
+    assert [json.loads(line)["seq"] for line in plain.splitlines()] == list(range(2000))
+    assert sum(len(c) for c in chunks) < len(plain) / 5
+    print("✓ Gzip output is a single valid stream")
+
+
+def test_conversation_record():
+    row = SimpleNamespace(id=7, session_id="s1", agent_id="agent_1", escalated=1, escalated_at=None,
+                          timestamp=datetime(2024, 5, 1), email=None, phone=None, summary="Needs help")
+    assert conversation_record(row) == {
+        "id": 7, "session_id": "s1", "agent_id": "agent_1", "escalated": True, "escalated_at": None,
+        "timestamp": "2024-05-01T00:00:00", "email": None, "phone": None, "summary": "Needs help",
+    }
+    print("✓ Conversation rows map to flat JSON records")
+
+
+if __name__ == "__main__":
+    test_one_chunk_per_partition()
+    test_gzip_stream_round_trips()
+    test_conversation_record()
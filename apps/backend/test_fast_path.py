@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test script for the greeting / thanks / human-intent fast path
+"""
+
+import os
+import sys
+from typing import NamedTuple
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fast_path import (
+    FastPathRouter, INTENT_GREETING, INTENT_THANKS, INTENT_GOODBYE, INTENT_HUMAN,
+    user_wants_human_agent
+)
+
+
+def test_small_talk_is_classified():
+    router = FastPathRouter()
+    cases = {
+        "hi": INTENT_GREETING,
+        "Hello there!": INTENT_GREETING,
+        "good morning team": INTENT_GREETING,
+        "thanks a lot!!": INTENT_THANKS,
+        "ok thank you": INTENT_THANKS,
+        "thanks, bye": INTENT_GOODBYE,
+        "That's all": INTENT_GOODBYE,
+        "I want to talk to a human": INTENT_HUMAN,
+        "connect me with a live agent please": INTENT_HUMAN,
+    }
+    for message, intent in cases.items():
+        assert router.classify(message) == intent, message
+    print("✓ Greetings, thanks, goodbyes and human requests are recognised")
+
+
+def test_questions_fall_through_to_rag():
+    router = FastPathRouter()
+    for message in ["hi, what does your DevOps plan cost?", "history of supportsages",
+                    "thanks, but how do I reset my server?", "does SupportSages offer helpdesk support?"]:
+        assert router.classify(message) is None, message
+    assert not user_wants_human_agent("hello")
+    print("✓ Real questions are never answered from templates")
+
+
+def test_route_batches_and_counts_hits():
+    router = FastPathRouter(templates={INTENT_GREETING: "Hey! What can we do for you?"})
+
+    match = router.route(["hi", "hello there"])
+    assert match.intent == INTENT_GREETING and match.reply == "Hey! What can we do for you?"
+    assert router.route(["hi", "what are your SRE services?"]) is None
+    assert router.route(["what is VAPT?", "actually, let me speak to a person"]).intent == INTENT_HUMAN
+
+    stats = router.stats()
+    assert stats["turns"] == 3 and stats["misses"] == 1
+    assert stats["hits"][INTENT_GREETING] == 1 and stats["hits"][INTENT_HUMAN] == 1
+    assert stats["hit_rate"] == round(2 / 3, 4)
+
+    assert FastPathRouter(enabled=False).route(["hi"]) is None
+    print("✓ Routing covers whole bursts and reports hit rates")
+
+
+class IntentPrediction(NamedTuple):
+    intent: str
+    score: float
+    margin: float
+
+
+class _StubClassifier:
+    """Stands in for IntentClassifier: returns fixed predictions by message."""
+
+    def __init__(self, predictions):
+        self.predictions = predictions
+        self.seen = []
+
+    def classify_batch(self, messages):
+        self.seen.extend(messages)
+        return [self.predictions.get(m) for m in messages]
+
+
+def test_classifier_catches_paraphrases():
+    stub = _StubClassifier({
+        "could a real person look at this?": IntentPrediction(INTENT_HUMAN, 0.71, 0.2),
+        "that sorted it, legend": IntentPrediction(INTENT_THANKS, 0.66, 0.15),
+        "that sorted it, legend, but one more thing about my kubernetes cluster": IntentPrediction(INTENT_THANKS, 0.6, 0.1),
+    })
+    router = FastPathRouter(classifier=stub, classifier_max_words=8)
+
+    assert router.route(["hi"]).intent == INTENT_GREETING
+    assert stub.seen == []  # keyword hits never reach the embedding model
+    assert router.route(["could a real person look at this?"]).intent == INTENT_HUMAN
+    assert router.route(["that sorted it, legend"]).reply == router.templates[INTENT_THANKS]
+    # long messages never get a canned reply from the classifier
+    assert router.route(["that sorted it, legend, but one more thing about my kubernetes cluster"]) is None
+    assert router.stats()["classifier_hits"] == 2
+    print("✓ Embedding predictions extend the keyword rules")
+
+
+if __name__ == "__main__":
+    test_small_talk_is_classified()
+    test_questions_fall_through_to_rag()
+    test_route_batches_and_counts_hits()
+    test_classifier_catches_paraphrases()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Test script for Idempotency-Key handling of retried POST /chat calls
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from idempotency import IdempotencyStore, IdempotencyKeyReused, fingerprint
+
+
+def test_retry_joins_in_flight_and_replays_result():
+    async def run():
+        store = IdempotencyStore(ttl=60)
+        calls = []
+
+        async def handler():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            return {"reply": "hello"}
+
+        fp = fingerprint("s1", "hi")
+        original, retry = await asyncio.gather(
+            store.run("s1:k1", fp, handler),
+            store.run("s1:k1", fp, handler),
+        )
+        assert original == ({"reply": "hello"}, False)
+        assert retry == ({"reply": "hello"}, True)
+        assert await store.run("s1:k1", fp, handler) == ({"reply": "hello"}, True)
+        assert len(calls) == 1
+        stats = store.stats()
+        assert (stats["executed"], stats["joined"], stats["replayed"]) == (1, 1, 1)
+
+    asyncio.run(run())
+    print("✓ Retries join the in-flight request or replay the stored reply")
+
+
+def test_key_reuse_with_different_payload_is_rejected():
+    async def run():
+        store = IdempotencyStore()
+
+        async def handler():
+            return {"reply": "ok"}
+
+        await store.run("s1:k1", fingerprint("s1", "hi"), handler)
+        try:
+            await store.run("s1:k1", fingerprint("s1", "something else"), handler)
+        except IdempotencyKeyReused:
+            pass
+        else:
+            raise AssertionError("expected IdempotencyKeyReused")
+
+    asyncio.run(run())
+    print("✓ Reusing a key for a different message is rejected")
+
+
+def test_records_are_bounded_and_expire():
+    async def run():
+        store = IdempotencyStore(ttl=0.05, max_keys=3)
+
+        async def handler():
+            return {"reply": "ok"}
+
+        for i in range(5):
+            await store.run(f"k{i}", "fp", handler)
+        assert store.stats()["stored"] == 3
+        assert store.stats()["evicted"] == 2
+
+        time.sleep(0.06)
+        _, replayed = await store.run("k4", "fp", handler)
+        assert replayed is False  # expired, so the handler ran again
+        assert store.stats()["stored"] == 1
+
+    asyncio.run(run())
+    print("✓ Stored replies are bounded and expire after the TTL")
+
+
+def test_failures_are_not_stored():
+    async def run():
+        store = IdempotencyStore()
+        attempts = []
+
+        async def handler():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError("groq timeout")
+            return {"reply": "ok"}
+
+        try:
+            await store.run("k", "fp", handler)
+        except RuntimeError:
+            pass
+        assert await store.run("k", "fp", handler) == ({"reply": "ok"}, False)
+
+    asyncio.run(run())
+    print("✓ Failed requests can be retried with the same key")
+
+
+def test_reply_is_stored_when_original_caller_is_cancelled():
+    async def run():
+        store = IdempotencyStore()
+        calls = []
+
+        async def handler():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            return {"reply": "ok"}
+
+        original = asyncio.ensure_future(store.run("k", "fp", handler))
+        await asyncio.sleep(0.005)
+        original.cancel()  # client disconnected mid-request
+        await asyncio.sleep(0.03)
+        assert store.stats()["inflight"] == 0
+        assert await store.run("k", "fp", handler) == ({"reply": "ok"}, True)
+        assert len(calls) == 1
+
+    asyncio.run(run())
+    print("✓ A reply finished after the caller went away is still stored")
+
+
+def test_expired_records_are_dropped_from_any_mapping():
+    async def run():
+        records = {}  # e.g. a shared store: not an OrderedDict, so no background expiry
+        store = IdempotencyStore(ttl=0.02, records=records)
+
+        async def handler():
+            return {"reply": "ok"}
+
+        async def failing():
+            raise RuntimeError("groq timeout")
+
+        await store.run("k", "fp", handler)
+        assert "k" in records
+        time.sleep(0.03)
+        try:
+            await store.run("k", "fp", failing)
+        except RuntimeError:
+            pass
+        assert "k" not in records  # the stale record went away on read, not on overwrite
+
+        await store.run("k", "other fp", handler)  # expired key can be reused
+        assert records["k"]["fingerprint"] == "other fp"
+
+    asyncio.run(run())
+    print("✓ Expired records are dropped on read for any mapping")
+
+
+if __name__ == "__main__":
+    test_retry_joins_in_flight_and_replays_result()
+    test_key_reuse_with_different_payload_is_rejected()
+    test_records_are_bounded_and_expire()
+    test_failures_are_not_stored()
+    test_reply_is_stored_when_original_caller_is_cancelled()
+    test_expired_records_are_dropped_from_any_mapping()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test script for the centroid-based intent classifier
+"""
+
+import os
+import sys
+import zlib
+
+import numpy as np
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from intent_classifier import IntentClassifier
+
+
+class BagOfWordsEmbeddings:
+    """Deterministic stand-in for the sentence model: hashed bag of words."""
+
+    dim = 512
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().replace("?", " ").replace(",", " ").split():
+                out[row, zlib.crc32(word.encode()) % self.dim] += 1.0
+        return out.tolist()
+
+
+EXAMPLES = {
+    "greeting": ["hello", "hello there", "hi hello"],
+    "human_agent": ["talk to a person", "a real person please", "person from support"],
+    "support_question": ["kubernetes migration cost", "server monitoring pricing", "pricing for kubernetes"],
+}
+
+
+def test_centroids_are_built_once():
+    embeddings = BagOfWordsEmbeddings()
+    classifier = IntentClassifier(embeddings, examples=EXAMPLES, min_score=0.3, min_margin=0.05)
+    classifier.warm()
+    built = embeddings.calls
+    classifier.warm()
+    classifier.classify("hello")
+    assert embeddings.calls == built + 1  # one embedding per message, no rebuild
+    assert classifier.stats()["ready"]
+    print("✓ Centroids are computed once and reused")
+
+
+def test_classify_and_thresholds():
+    classifier = IntentClassifier(BagOfWordsEmbeddings(), examples=EXAMPLES, min_score=0.3, min_margin=0.05)
+    assert classifier.classify("hello there").intent == "greeting"
+    assert classifier.classify("can I get a real person").intent == "human_agent"
+    assert classifier.classify("kubernetes pricing").intent == "support_question"
+    assert classifier.classify("zzz qqq") is None  # nothing in common with any centroid
+
+    predictions = classifier.classify_batch(["hello", "person please", "xyz"])
+    assert [p.intent if p else None for p in predictions] == ["greeting", "human_agent", None]
+    stats = classifier.stats()
+    assert stats["classified"] == 7 and stats["below_threshold"] == 2
+    print("✓ Messages map to the nearest centroid above the score threshold")
+
+
+if __name__ == "__main__":
+    test_centroids_are_built_once()
+    test_classify_and_thresholds()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming, resumable SQLite migration
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from migrate_from_sqlite import migrate_rows, read_checkpoint
+
+
+def _legacy_db(rows: int) -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    conn.execute("""
+        CREATE TABLE conversations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, summary TEXT, email TEXT, phone TEXT,
+            agent_id TEXT, session_id TEXT, escalated INTEGER DEFAULT 0, escalated_at TEXT
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO conversations (timestamp, summary, session_id, escalated, escalated_at) VALUES (?, ?, ?, ?, ?)",
+        [("2024-05-01T10:00:00" if i % 2 else "not a date", f"summary {i}", f"s{i}", i % 3 == 0,
+          "2024-05-01T10:05:00" if i % 3 == 0 else None) for i in range(rows)],
+    )
+    return conn
+
+
+def _checkpoint_path():
+    return os.path.join(tempfile.mkdtemp(), "conversations.db.checkpoint")
+
+
+def test_rows_stream_in_chunks():
+    conn, chunks = _legacy_db(25), []
+    migrated = migrate_rows(conn, chunks.append, _checkpoint_path(), batch_size=10)
+    assert migrated == 25
+    assert [len(c) for c in chunks] == [10, 10, 5]
+    records = [r for c in chunks for r in c]
+    assert [r["session_id"] for r in records] == [f"s{i}" for i in range(25)]
+    assert records[0]["escalated"] is True and records[0]["escalated_at"].minute == 5
+    assert records[1]["escalated"] is False and records[1]["escalated_at"] is None
+    assert records[0]["timestamp"] is not None  # unparseable timestamps fall back to now
+    print("✓ Rows are streamed and bulk-written in chunks")
+
+
+def test_interrupted_run_resumes_from_checkpoint():
+    conn, path, written = _legacy_db(25), _checkpoint_path(), []
+
+    def flaky(records):
+        if len(written) == 10:
+            raise RuntimeError("connection reset")
+        written.extend(records)
+
+    try:
+        migrate_rows(conn, flaky, path, batch_size=10)
+    except RuntimeError:
+        pass
+    assert read_checkpoint(path) == 10
+
+    assert migrate_rows(conn, written.extend, path, batch_size=10) == 15
+    assert [r["session_id"] for r in written] == [f"s{i}" for i in range(25)]  # nothing lost or duplicated
+    assert migrate_rows(conn, written.extend, path, batch_size=10) == 0
+    print("✓ An interrupted migration resumes after the last committed chunk")
+
+
+if __name__ == "__main__":
+    test_rows_stream_in_chunks()
+    test_interrupted_run_resumes_from_checkpoint()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Test script for password hashing in the bcrypt worker pool
+"""
+
+import asyncio
+import os
+import sys
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# cheap hashes: the round trip is what's under test, not bcrypt's cost
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import auth
+from auth import get_password_hash_async, verify_password_async, verify_password, password_pool_stats
+
+
+def test_hash_verify_round_trip_through_pool():
+    async def run():
+        hashed = await get_password_hash_async("correct horse")
+        assert hashed != "correct horse" and verify_password("correct horse", hashed)
+        ok, wrong = await asyncio.gather(
+            verify_password_async("correct horse", hashed),
+            verify_password_async("battery staple", hashed),
+        )
+        assert ok is True and wrong is False
+
+    before = password_pool_stats()
+    asyncio.run(run())
+    after = password_pool_stats()
+    assert after["hashes"] == before["hashes"] + 1
+    assert after["verifies"] == before["verifies"] + 2
+    assert after["in_flight"] == 0
+    assert after["workers"] == auth.PASSWORD_HASH_WORKERS >= 1
+    print("✓ Passwords hash and verify through the worker pool")
+
+
+if __name__ == "__main__":
+    test_hash_verify_round_trip_through_pool()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test script for the write-behind persistence queue
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from persistence import WriteBehindQueue
+
+
+def _dead_letter_path():
+    return os.path.join(tempfile.mkdtemp(), "dead_letter.jsonl")
+
+
+def test_records_are_batched_in_order():
+    batches = []
+    release = threading.Event()
+
+    def write_batch(items):
+        release.wait(1)
+        batches.append(list(items))
+
+    q = WriteBehindQueue(write_batch, batch_size=50, flush_interval=0.01, dead_letter_path=_dead_letter_path())
+    q.start()
+    q.submit("conversation", {"session_id": "s0"})
+    for i in range(1, 10):
+        q.submit("conversation", {"session_id": f"s{i}"})  # pile up behind the first write
+    q.submit("conversation_summary", {"session_id": "s0", "summary": "llm"})
+    release.set()
+    assert q.flush(timeout=2)
+
+    written = [item for batch in batches for item in batch]
+    assert [r["session_id"] for _, r in written][:10] == [f"s{i}" for i in range(10)]
+    assert written[-1][0] == "conversation_summary"
+    assert len(batches) < 11  # multi-row batches, not one transaction per record
+    stats = q.stats()
+    assert stats["written"] == 11 and stats["pending"] == 0
+    q.stop()
+    print("✓ Records are written in order, several per transaction")
+
+
+def test_failures_retry_then_dead_letter():
+    path = _dead_letter_path()
+    attempts = []
+
+    def write_batch(items):
+        attempts.append(len(items))
+        if any(r.get("poison") for _, r in items):
+            raise RuntimeError("constraint violation")
+
+    q = WriteBehindQueue(write_batch, batch_size=10, max_retries=1, retry_backoff=0, dead_letter_path=path)
+    q.submit("conversation", {"session_id": "ok1"})
+    q.submit("conversation", {"session_id": "bad", "poison": True})
+    q.submit("conversation", {"session_id": "ok2"})
+    q.flush()  # no worker started: drains inline
+
+    with open(path) as f:
+        dead = [json.loads(line) for line in f]
+    assert [d["record"]["session_id"] for d in dead] == ["bad"]
+    assert dead[0]["error"] == "constraint violation"
+    stats = q.stats()
+    assert stats["written"] == 2 and stats["dead_lettered"] == 1 and stats["retries"] == 1
+    print("✓ A poison record is dead-lettered without losing the rest of its batch")
+
+
+def test_overflow_goes_to_dead_letter_and_replays():
+    path = _dead_letter_path()
+    written = []
+    q = WriteBehindQueue(lambda items: written.extend(items), max_pending=2, dead_letter_path=path)
+    results = [q.submit("conversation", {"n": n}) for n in range(3)]
+    assert results == [True, True, False]
+    assert q.stats()["overflowed"] == 1
+
+    q.flush()
+    assert q.replay_dead_letters() == 1
+    assert not os.path.exists(path)
+    q.stop()
+    assert sorted(r["n"] for _, r in written) == [0, 1, 2]
+    print("✓ Overflow is dead-lettered and can be replayed")
+
+
+if __name__ == "__main__":
+    test_records_are_batched_in_order()
+    test_failures_retry_then_dead_letter()
+    test_overflow_goes_to_dead_letter_and_replays()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script for full-text search (SQLite FTS5 fallback; Postgres shares the query shape)
+"""
+
+import os
+import sqlite3
+import sys
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from search import setup_statements, search_query, search_params, fts5_query, SCOPE_CONVERSATIONS, SCOPE_MESSAGES
+
+
+def _db(conversations=(), messages=()) -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute("CREATE TABLE conversations (id INTEGER PRIMARY KEY, session_id TEXT, agent_id TEXT, escalated BOOLEAN, timestamp TEXT, summary TEXT)")
+    conn.execute("CREATE TABLE messages (id INTEGER PRIMARY KEY, session_id TEXT, seq INTEGER, role TEXT, agent_id TEXT, timestamp TEXT, content TEXT)")
+    conn.executemany("INSERT INTO conversations (session_id, escalated, summary) VALUES (?, 1, ?)", conversations)
+    conn.executemany("INSERT INTO messages (session_id, seq, role, content) VALUES (?, ?, 'user', ?)", messages)
+    return conn
+
+
+def _setup(conn):
+    existing = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for statement in setup_statements("sqlite", existing):
+        conn.execute(statement)
+
+
+def _search(conn, scope, q, limit=20, offset=0):
+    params, limit = search_params("sqlite", q, limit, offset)
+    rows = conn.execute(search_query("sqlite", scope), params).fetchall()
+    return rows[:limit], len(rows) > limit
+
+
+def test_existing_rows_are_indexed_and_ranked():
+    conn = _db(conversations=[
+        ("s1", "Customer cannot log in to the billing portal."),
+        ("s2", "Kubernetes pods evicted nightly; memory limits raised, pods still evicted."),
+        ("s3", "Asked about pricing for managed Kubernetes."),
+    ])
+    _setup(conn)  # rows that predate the FTS table are picked up by the rebuild
+    hits, more = _search(conn, SCOPE_CONVERSATIONS, "kubernetes evicted")
+    assert [h["session_id"] for h in hits] == ["s2"] and not more
+    hits, _ = _search(conn, SCOPE_CONVERSATIONS, "kubernetes")
+    assert {h["session_id"] for h in hits} == {"s2", "s3"}
+    assert "[evicted]" in _search(conn, SCOPE_CONVERSATIONS, "evicted")[0][0]["snippet"]
+    assert _search(conn, SCOPE_CONVERSATIONS, "evicting")[0]  # porter stemming
+    print("✓ Summaries are indexed, ranked and highlighted")
+
+
+def test_triggers_follow_writes():
+    conn = _db()
+    _setup(conn)
+    _setup(conn)  # idempotent
+    conn.execute("INSERT INTO conversations (session_id, escalated, summary) VALUES ('s1', 1, 'refund request')")
+    assert _search(conn, SCOPE_CONVERSATIONS, "refund")[0]
+    conn.execute("UPDATE conversations SET summary = 'invoice dispute' WHERE session_id = 's1'")
+    assert not _search(conn, SCOPE_CONVERSATIONS, "refund")[0]
+    assert _search(conn, SCOPE_CONVERSATIONS, "invoice")[0]
+    conn.execute("DELETE FROM conversations")
+    assert not _search(conn, SCOPE_CONVERSATIONS, "invoice")[0]
+    print("✓ Inserts, updates and deletes keep the index in sync")
+
+
+def test_message_pagination_and_hostile_input():
+    conn = _db(messages=[(f"s{i % 3}", i, f"my server {i} is down again") for i in range(7)])
+    _setup(conn)
+    page1, more1 = _search(conn, SCOPE_MESSAGES, "server down", limit=5)
+    page2, more2 = _search(conn, SCOPE_MESSAGES, "server down", limit=5, offset=5)
+    assert len(page1) == 5 and more1 and len(page2) == 2 and not more2
+    assert {h["seq"] for h in page1} | {h["seq"] for h in page2} == set(range(7))
+
+    for q in ('down"', "NOT server", "server AND (", "col:server", "*"):
+        _search(conn, SCOPE_MESSAGES, q)  # must not raise fts5 syntax errors
+    assert fts5_query('say "hi"') == '"say" """hi"""'
+    print("✓ Messages paginate and search input is never parsed as FTS5 syntax")
+
+
+def test_postgres_ranks_on_stored_tsvector():
+    statements = setup_statements("postgresql", set(), concurrently=True)
+    assert any("ADD COLUMN IF NOT EXISTS summary_tsv tsvector GENERATED ALWAYS AS" in s and s.endswith("STORED")
+               for s in statements)
+    assert "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_messages_content_tsv ON messages USING GIN (content_tsv)" in statements
+    assert "DROP INDEX CONCURRENTLY IF EXISTS ix_messages_content_fts" in statements
+    sql = search_query("postgresql", SCOPE_MESSAGES)
+    assert "ts_rank(t.content_tsv, query)" in sql and "WHERE t.content_tsv @@ query" in sql
+    assert "to_tsvector" not in sql  # nothing re-parsed per matching row
+    print("✓ Postgres search ranks against the stored tsvector column")
+
+
+if __name__ == "__main__":
+    test_existing_rows_are_indexed_and_ranked()
+    test_triggers_follow_writes()
+    test_message_pagination_and_hostile_input()
+    test_postgres_ranks_on_stored_tsvector()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test script for lazy transcript-tail loading and history paging
+"""
+
+import asyncio
+import os
+import sys
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from session_history import ensure_loaded, restore_tail, next_seq, message_count, read_page
+
+
+def _session() -> dict:
+    return {"history": [], "history_offset": 0, "history_loaded": False, "turn_cursor": 0}
+
+
+def _stored(seqs):
+    return [(seq, {"role": "user", "content": f"m{seq}"}) for seq in seqs]
+
+
+def test_seq_continues_after_restored_tail():
+    session = _session()
+    assert restore_tail(session, _stored(range(70, 120))) == []
+    assert session["history_offset"] == 70 and len(session["history"]) == 50
+    assert session["turn_cursor"] == 50
+    assert next_seq(session) == 120
+    assert message_count(session) == 120  # what /sessions and dashboard deltas report
+
+    # messages appended while the load was failing get their seqs once it succeeds
+    session = _session()
+    session["history"].append({"role": "user", "content": "sent during outage"})
+    pending = restore_tail(session, _stored(range(10, 15)))
+    assert pending == [(15, {"role": "user", "content": "sent during outage"})]
+    assert next_seq(session) == 16
+
+    # a gap in the stored seqs never leads to reusing the highest one
+    session = _session()
+    restore_tail(session, _stored([1, 2, 5]))
+    assert next_seq(session) == 6
+
+    session = _session()
+    assert restore_tail(session, []) == [] and next_seq(session) == 0
+    print("✓ New messages continue the stored seq numbering")
+
+
+def test_concurrent_first_touches_share_one_load():
+    async def run():
+        session = _session()
+        loads = []
+
+        async def load():
+            loads.append(1)
+            await asyncio.sleep(0.01)
+            restore_tail(session, _stored(range(3)))
+
+        await asyncio.gather(*(ensure_loaded(session, load) for _ in range(5)))
+        await ensure_loaded(session, load)
+        assert len(loads) == 1 and session["history_loaded"] is True
+        assert len(session["history"]) == 3
+
+    asyncio.run(run())
+    print("✓ Concurrent first touches share one load")
+
+
+def test_failed_load_is_retried():
+    async def run():
+        session = _session()
+        attempts = []
+
+        async def load():
+            attempts.append(1)
+            await asyncio.sleep(0)
+            if len(attempts) == 1:
+                raise ConnectionError("database unavailable")
+            restore_tail(session, _stored(range(40, 42)))
+
+        results = await asyncio.gather(ensure_loaded(session, load), ensure_loaded(session, load), return_exceptions=True)
+        assert all(isinstance(r, ConnectionError) for r in results)
+        assert session["history_loaded"] is False and len(attempts) == 1
+
+        await ensure_loaded(session, load)
+        assert session["history_loaded"] is True and next_seq(session) == 42
+
+    asyncio.run(run())
+    print("✓ A failed load leaves the session unloaded and is retried")
+
+
+def test_read_page_below_history_offset():
+    async def run():
+        session = _session()
+        restore_tail(session, _stored(range(100, 150)))
+        reads = []
+
+        async def load_range(start, end):
+            reads.append((start, end))
+            return [{"role": "user", "content": f"m{seq}"} for seq in range(start, end)]
+
+        page = await read_page(session, 90, 110, load_range)
+        assert [m["content"] for m in page] == [f"m{seq}" for seq in range(90, 110)]
+        assert reads == [(90, 100)]
+
+        assert len(await read_page(session, 0, 20, load_range)) == 20 and reads[-1] == (0, 20)
+        reads.clear()
+        assert [m["content"] for m in await read_page(session, 140, 150, load_range)][0] == "m140"
+        assert reads == []  # fully in memory
+
+    asyncio.run(run())
+    print("✓ Pages below the in-memory tail are read from storage")
+
+
+if __name__ == "__main__":
+    test_seq_continues_after_restored_tail()
+    test_concurrent_first_touches_share_one_load()
+    test_failed_load_is_retried()
+    test_read_page_below_history_offset()
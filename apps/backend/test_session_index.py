@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test script for the session index behind paginated GET /sessions and history pages
+"""
+
+import os
+import sys
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from session_index import SessionIndex, SessionStore, history_window, encode_cursor, decode_cursor
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _store(count: int, clock: FakeClock) -> SessionStore:
+    store = SessionStore(SessionIndex(idle_after=60, clock=clock))
+    for i in range(count):
+        clock.now = 1000.0 + i
+        store[f"s{i}"] = {"escalated": i % 4 == 0}
+    return store
+
+
+def _all_pages(store: SessionStore, **kwargs) -> list:
+    pages, cursor = [], None
+    while True:
+        ids, cursor = store.index.page(store, cursor=cursor, **kwargs)
+        pages.append(ids)
+        if cursor is None:
+            return pages
+
+
+def test_cursor_pages_cover_everything_once():
+    clock = FakeClock()
+    store = _store(10, clock)
+    pages = _all_pages(store, limit=4)
+    assert pages == [["s9", "s8", "s7", "s6"], ["s5", "s4", "s3", "s2"], ["s1", "s0"]]
+    assert _all_pages(store, sort="created_at", order="asc", limit=6) == [
+        ["s0", "s1", "s2", "s3", "s4", "s5"], ["s6", "s7", "s8", "s9"]]
+
+    assert decode_cursor(encode_cursor(1005.0, "s5")) == (1005.0, "s5")
+    ids, cursor = store.index.page(store, limit=3)
+    store["s10"] = {"escalated": False}  # a new session doesn't shift the next page
+    assert store.index.page(store, limit=3, cursor=cursor)[0] == ["s6", "s5", "s4"]
+    try:
+        store.index.page(store, cursor="garbage")
+        assert False, "bad cursor accepted"
+    except ValueError:
+        pass
+    print("✓ Cursor pages are stable and cover every session once")
+
+
+def test_filters_by_status_and_time_range():
+    clock = FakeClock()
+    store = _store(10, clock)
+    clock.now = 1100.0
+    store.touch("s1")  # s1 is the only recently active session
+    store.touch("s4")
+
+    assert store.index.page(store, status="escalated")[0] == ["s4", "s8", "s0"]
+    assert store.index.page(store, status="active")[0] == ["s1"]
+    assert store.index.page(store, status="idle", limit=3)[0] == ["s9", "s7", "s6"]
+    assert store.index.page(store, sort="created_at", since=1003, until=1005)[0] == ["s5", "s4", "s3"]
+    assert store.index.times("s1") == {"created_at": 1001.0, "last_activity": 1100.0}
+
+    assert store.index.page(store, status="idle", sort="created_at", order="asc", limit=3)[0] == ["s2", "s3", "s5"]
+    assert _all_pages(store, status="escalated", limit=2) == [["s4", "s8"], ["s0"]]
+
+    store.set_escalated("s4", False)
+    store.set_escalated("s3", True)
+    assert store["s3"]["escalated"] and not store["s4"]["escalated"]
+    assert store.index.page(store, status="escalated")[0] == ["s8", "s3", "s0"]
+    assert store.index.page(store, status="active")[0] == ["s4", "s1"]
+    assert store.index.status("s3") == "escalated" and store.index.status("s4") == "active"
+
+    del store["s1"]
+    del store["s8"]
+    assert store.index.page(store, status="active")[0] == ["s4"]
+    assert store.index.page(store, status="escalated")[0] == ["s3", "s0"]
+    assert len(store.index) == 8
+    print("✓ Status and time-range filters use the index")
+
+
+def test_status_filters_do_not_scan_other_sessions():
+    clock = FakeClock()
+    store = _store(2000, clock)  # every 4th session escalated
+    clock.now = 1000.0 + 2000 + 30  # idle_after=60: only s1971..s1999 are recent
+
+    class CountingSessions(dict):
+        lookups = 0
+
+        def __contains__(self, session_id):
+            CountingSessions.lookups += 1
+            return super().__contains__(session_id)
+
+    sessions = CountingSessions(store)
+    ids, cursor = store.index.page(sessions, status="escalated", order="asc", limit=5)
+    assert ids == ["s0", "s4", "s8", "s12", "s16"] and cursor is not None
+    assert CountingSessions.lookups <= 6
+
+    CountingSessions.lookups = 0
+    ids, _ = store.index.page(sessions, status="active", limit=100)
+    assert len(ids) == 22 and all(store.index.status(sid) == "active" for sid in ids)
+    assert CountingSessions.lookups == 29  # only the keys after the idle cut-off
+    print("✓ Escalated/active pages only walk their own part of the index")
+
+
+def test_history_window():
+    # 30 messages in memory holding seqs 70..99
+    assert history_window(30, 70, limit=10) == (90, 100)
+    assert history_window(30, 70, limit=10, before=90) == (80, 90)
+    assert history_window(30, 70, limit=10, before=75) == (65, 75)  # reaches into the messages table
+    assert history_window(30, 70, limit=10, before=5) == (0, 5)
+    assert history_window(30, 70, limit=10, after=94) == (95, 100)
+    print("✓ History pages are computed from seqs")
+
+
+if __name__ == "__main__":
+    test_cursor_pages_cover_everything_once()
+    test_filters_by_status_and_time_range()
+    test_status_filters_do_not_scan_other_sessions()
+    test_history_window()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test script for local extractive summaries and background LLM upgrades
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from summaries import SummaryService, SessionSummary, extractive_summary, SOURCE_EXTRACTIVE, SOURCE_LLM
+
+HISTORY = [
+    {"role": "user", "content": "Hi"},
+    {"role": "assistant", "content": "Hello! How can I help?"},
+    {"role": "user", "content": "Our Kubernetes cluster on AWS keeps evicting pods. The nodes run out of memory every night."},
+    {"role": "assistant", "content": "That sounds like a resource limits issue."},
+    {"role": "user", "content": "We tried raising memory limits on the cluster but the pods still get evicted."},
+    {"role": "user", "content": "Can someone from your team look at the cluster today?"},
+]
+
+
+def test_extractive_summary_picks_key_points():
+    summary = extractive_summary(HISTORY, max_points=2)
+    lines = summary.splitlines()
+    assert lines[0] == "Customer messages: 4, bot replies: 2, agent replies: 0"
+    assert "Hi" not in lines[2:4]  # small talk never makes the cut
+    assert any("evict" in line for line in lines[2:4])
+    assert lines[-1] == "Latest customer message: Can someone from your team look at the cluster today?"
+    assert "No customer messages yet." in extractive_summary([{"role": "assistant", "content": "Hello"}])
+    print("✓ Extractive summary keeps the informative customer sentences")
+
+
+def test_llm_upgrade_runs_in_background():
+    async def run():
+        applied = []
+
+        def slow_llm(history):
+            time.sleep(0.05)
+            return f"LLM summary of {len(history)} messages"
+
+        service = SummaryService(slow_llm)
+        summary = SessionSummary()
+        start = time.perf_counter()
+        text, source, count = service.summarize("escalation:agent_1", summary, HISTORY, on_llm=applied.append)
+        assert service.summarize("escalation:agent_1", summary, HISTORY)[1] == SOURCE_EXTRACTIVE
+        assert time.perf_counter() - start < 0.05  # nothing above waited on the LLM
+        assert (source, count) == (SOURCE_EXTRACTIVE, 6) and text.startswith("Customer messages:")
+
+        await asyncio.sleep(0.1)
+        assert applied == ["LLM summary of 6 messages"]
+        assert service.summarize("escalation:agent_1", summary, HISTORY) == ("LLM summary of 6 messages", SOURCE_LLM, 6)
+        stats = service.stats()
+        assert stats["llm_full"] == 1 and stats["upgrades_skipped"] == 1
+        assert stats["upgrades_in_flight"] == 0
+
+    asyncio.run(run())
+    print("✓ LLM summary is generated off the request path")
+
+
+def test_new_messages_extend_cached_summary():
+    async def run():
+        full_calls, extend_calls = [], []
+
+        def llm_full(history):
+            full_calls.append(len(history))
+            return "summary v1"
+
+        def llm_extend(previous, new_messages):
+            extend_calls.append((previous, len(new_messages)))
+            return previous + " + more"
+
+        service = SummaryService(llm_full, llm_extend)
+        summary = SessionSummary()
+        history = list(HISTORY[:4])
+        service.summarize("session:s1", summary, history)
+        await asyncio.sleep(0.01)
+        assert service.summarize("session:s1", summary, history)[0] == "summary v1"
+
+        history += HISTORY[4:]
+        text, source, count = service.summarize("session:s1", summary, history)
+        assert source == SOURCE_EXTRACTIVE and count == 6
+        assert "Can someone from your team" in text  # extractive state picked up the new messages
+        await asyncio.sleep(0.01)
+        assert service.summarize("session:s1", summary, history)[0] == "summary v1 + more"
+
+        assert full_calls == [4]
+        assert extend_calls == [("summary v1", 2)]  # only the two new messages went to the LLM
+        stats = service.stats()
+        assert stats["messages_folded"] == 6
+        assert stats["cache_hits"] == 2
+
+    asyncio.run(run())
+    print("✓ New messages extend the cached summary instead of re-summarizing")
+
+
+def test_llm_failure_keeps_local_summary():
+    async def run():
+        def broken_llm(history):
+            raise RuntimeError("groq unavailable")
+
+        service = SummaryService(broken_llm)
+        summary = SessionSummary()
+        service.summarize("session:s1", summary, HISTORY)
+        await asyncio.sleep(0.01)
+        assert summary.llm is None
+        assert service.summarize("session:s1", summary, HISTORY)[1] == SOURCE_EXTRACTIVE
+        assert service.stats()["llm_failures"] == 1
+        assert SummaryService(None).upgrade_in_background("session:s1", summary, HISTORY) is None
+
+    asyncio.run(run())
+    print("✓ A failed upgrade leaves the extractive summary in place")
+
+
+if __name__ == "__main__":
+    test_extractive_summary_picks_key_points()
+    test_llm_upgrade_runs_in_background()
+    test_new_messages_extend_cached_summary()
+    test_llm_failure_keeps_local_summary()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Test script for typing-indicator throttling and stop detection
+"""
+
+import asyncio
+import os
+import sys
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from typing_throttle import TypingThrottle
+
+
+def test_burst_is_throttled_and_stop_is_emitted():
+    async def run():
+        throttle = TypingThrottle(interval=10, idle_timeout=0.05)
+        stops = []
+
+        async def on_stop():
+            stops.append("stopped")
+
+        forwarded = [throttle.observe("conn1", on_stop) for _ in range(20)]
+        assert forwarded[0] is True
+        assert not any(forwarded[1:])
+
+        await asyncio.sleep(0.15)
+        assert stops == ["stopped"]
+        stats = throttle.stats()
+        assert stats["forwarded"] == 1
+        assert stats["suppressed"] == 19
+        assert stats["stopped"] == 1
+        assert stats["active"] == 0
+
+    asyncio.run(run())
+    print("✓ Typing burst forwards one event and one stop event")
+
+
+def test_clear_cancels_stop_event():
+    async def run():
+        throttle = TypingThrottle(interval=1, idle_timeout=0.05)
+        stops = []
+
+        async def on_stop():
+            stops.append("stopped")
+
+        throttle.observe("agent_a:s1", on_stop)
+        throttle.observe("agent_a:s2", on_stop)
+        throttle.clear_prefix("agent_a:")
+        await asyncio.sleep(0.1)
+        assert stops == []
+        assert throttle.stats()["active"] == 0
+
+    asyncio.run(run())
+    print("✓ Clearing typing state suppresses the stop event")
+
+
+if __name__ == "__main__":
+    test_burst_is_throttled_and_stop_is_emitted()
+    test_clear_cancels_stop_event()
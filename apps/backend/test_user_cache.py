@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Test script for the authenticated-user cache
+"""
+
+import os
+import sys
+import time
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from user_cache import UserCache
+
+
+def test_hits_skip_lookup_until_ttl():
+    cache = UserCache(ttl=0.05, max_entries=10)
+    assert cache.get("a@example.com") is None
+    assert cache.put("a@example.com", {"role": "admin"})
+    assert cache.get("a@example.com") == {"role": "admin"}
+    time.sleep(0.06)
+    assert cache.get("a@example.com") is None
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2 and stats["expired"] == 1
+    assert stats["size"] == 0
+    print("✓ Cached users are served until the TTL expires")
+
+
+def test_invalidation_drops_entry_and_stale_puts():
+    cache = UserCache(ttl=60)
+    cache.put("a@example.com", {"is_active": True})
+    cache.put("b@example.com", {"is_active": True})
+
+    generation = cache.generation()  # a lookup starts reading the old row...
+    cache.invalidate("a@example.com")  # ...while an admin deactivates the user
+    assert cache.get("a@example.com") is None
+    assert not cache.put("a@example.com", {"is_active": True}, generation)
+    assert cache.get("a@example.com") is None
+    assert cache.get("b@example.com") == {"is_active": True}
+
+    cache.invalidate()
+    assert cache.stats()["size"] == 0
+    assert cache.stats()["stale_puts"] == 1
+    print("✓ Invalidation wins over lookups that raced it")
+
+
+def test_lru_bound_and_disabled():
+    cache = UserCache(ttl=60, max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evicted"] == 1
+
+    off = UserCache(ttl=0)
+    assert not off.put("a", 1) and off.get("a") is None
+    print("✓ Cache is LRU-bounded and can be disabled")
+
+
+if __name__ == "__main__":
+    test_hits_skip_lookup_until_ttl()
+    test_invalidation_drops_entry_and_stale_puts()
+    test_lru_bound_and_disabled()
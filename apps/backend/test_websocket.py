@@ -6,6 +6,7 @@ Test script for WebSocket functionality
 import asyncio
 import websockets
 import json
+import os
 import time
 
 async def test_websocket_chat():
@@ -45,7 +46,9 @@ async def test_websocket_chat():
                 print(f"\n2. Testing agent WebSocket connection for agent {agent_id}...")
                 
                 try:
-                    async with websockets.connect(f"ws://localhost:8000/ws/agent/{agent_id}") as agent_websocket:
+                    # agent messages need an employee/admin JWT (from /auth/login)
+                    token = os.getenv("AGENT_TOKEN", "")
+                    async with websockets.connect(f"ws://localhost:8000/ws/agent/{agent_id}?token={token}") as agent_websocket:
                         print("✅ Agent WebSocket connected")
                         
                         # Send agent message
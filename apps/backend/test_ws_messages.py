@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test script for the WebSocket wire format (encode-once + typed frame decoding)
+"""
+
+import json
+import os
+import sys
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ws_messages import (
+    encode, decode_frame, FrameDecodeError,
+    UserMessageFrame, AgentMessageFrame, TypingFrame, UnknownFrame
+)
+
+
+def test_encode_roundtrip():
+    event = {"type": "bot_message", "message": "Grüße ✓", "escalated": False, "confidence_score": 0.8}
+    encoded = encode(event)
+    assert isinstance(encoded, str)
+    assert json.loads(encoded) == event
+    print("✓ encode() produces a JSON string that round-trips")
+
+
+def test_decode_typed_frames():
+    frame = decode_frame('{"type": "user_message", "message": "hi"}')
+    assert isinstance(frame, UserMessageFrame) and frame.message == "hi" and frame.session_id is None
+
+    frame = decode_frame('{"type": "agent_message", "session_id": "s1", "message": "hello"}')
+    assert isinstance(frame, AgentMessageFrame) and frame.session_id == "s1"
+
+    frame = decode_frame('{"type": "typing"}')
+    assert isinstance(frame, TypingFrame)
+
+    frame = decode_frame('{"type": "ping"}')
+    assert isinstance(frame, UnknownFrame) and frame.type == "ping"
+
+    # null message is normalised to an empty string
+    assert decode_frame('{"type": "user_message", "message": null}').message == ""
+    print("✓ Frames decode into typed structs")
+
+
+def test_decode_rejects_bad_frames():
+    for raw in ["not json", "[1, 2]", '{"type": "agent_message", "message": "x"}',
+                '{"type": "user_message", "message": 42}',
+                '{"type": "agent_message", "session_id": "s1", "message": {"text": "hi"}}']:
+        try:
+            decode_frame(raw)
+        except FrameDecodeError:
+            continue
+        raise AssertionError(f"expected FrameDecodeError for {raw!r}")
+    print("✓ Invalid frames raise FrameDecodeError")
+
+
+if __name__ == "__main__":
+    test_encode_roundtrip()
+    test_decode_typed_frames()
+    test_decode_rejects_bad_frames()
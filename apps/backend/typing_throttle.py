@@ -0,0 +1,87 @@
+"""
+Server-side throttling for typing indicators.
+
+Clients send a ``typing`` frame on practically every keystroke. We forward at
+most one indicator per ``TYPING_FORWARD_INTERVAL_SEC`` per connection and emit
+a single "stopped typing" event once no typing frame has been seen for
+``TYPING_IDLE_TIMEOUT_SEC``.
+"""
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+TYPING_FORWARD_INTERVAL_SEC = float(os.getenv("TYPING_FORWARD_INTERVAL_SEC", "1.0"))
+TYPING_IDLE_TIMEOUT_SEC = float(os.getenv("TYPING_IDLE_TIMEOUT_SEC", "3.0"))
+
+
+class _TypingState:
+    __slots__ = ("last_forwarded", "last_seen", "stop_task")
+
+    def __init__(self):
+        self.last_forwarded: Optional[float] = None
+        self.last_seen = 0.0
+        self.stop_task: Optional[asyncio.Task] = None
+
+
+class TypingThrottle:
+    def __init__(self, interval: float = TYPING_FORWARD_INTERVAL_SEC, idle_timeout: float = TYPING_IDLE_TIMEOUT_SEC):
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        self._states: Dict[str, _TypingState] = {}
+        self._counters = {"received": 0, "forwarded": 0, "suppressed": 0, "stopped": 0}
+
+    def observe(self, key: str, on_stop: Callable[[], Awaitable[None]]) -> bool:
+        """Record a typing frame for ``key``; returns True if it should be forwarded.
+
+        ``on_stop`` is awaited once the sender has been idle for ``idle_timeout``.
+        """
+        now = time.monotonic()
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _TypingState()
+        state.last_seen = now
+        self._counters["received"] += 1
+
+        if state.stop_task is None or state.stop_task.done():
+            state.stop_task = asyncio.create_task(self._stop_when_idle(key, state, on_stop))
+
+        if state.last_forwarded is not None and now - state.last_forwarded < self.interval:
+            self._counters["suppressed"] += 1
+            return False
+        state.last_forwarded = now
+        self._counters["forwarded"] += 1
+        return True
+
+    def clear(self, key: str):
+        """Forget typing state without emitting a stop event (e.g. a message was sent or the socket closed)."""
+        state = self._states.pop(key, None)
+        if state and state.stop_task and not state.stop_task.done():
+            state.stop_task.cancel()
+
+    def clear_prefix(self, prefix: str):
+        """Clear every key starting with ``prefix`` (all sessions an agent connection typed into)."""
+        for key in [k for k in self._states if k.startswith(prefix)]:
+            self.clear(key)
+
+    async def _stop_when_idle(self, key: str, state: _TypingState, on_stop: Callable[[], Awaitable[None]]):
+        while True:
+            remaining = state.last_seen + self.idle_timeout - time.monotonic()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(remaining)
+        if self._states.get(key) is state:
+            del self._states[key]
+        self._counters["stopped"] += 1
+        try:
+            await on_stop()
+        except Exception as e:
+            print(f"[WS][WARN] Failed to send stopped-typing event for {key}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "forward_interval_sec": self.interval,
+            "idle_timeout_sec": self.idle_timeout,
+            "active": len(self._states),
+            **self._counters,
+        }
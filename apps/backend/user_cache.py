@@ -0,0 +1,93 @@
+"""
+TTL cache of authenticated users, keyed by the JWT subject (email).
+
+``get_current_user`` runs on every protected request, dashboard polling
+included, and used to query ``users`` each time. Resolved users are kept for
+``AUTH_USER_CACHE_TTL_SEC`` seconds (LRU-bounded by ``AUTH_USER_CACHE_SIZE``);
+``update_user`` invalidates the entry so deactivations and role changes apply
+immediately on this process, and the TTL bounds staleness everywhere else.
+
+Lookups that race an invalidation must not repopulate the cache with the row
+they read before it: take ``generation()`` before querying and pass it to
+``put``, which drops the value if an invalidation happened in between.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+AUTH_USER_CACHE_TTL_SEC = float(os.getenv("AUTH_USER_CACHE_TTL_SEC", "60"))
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "1000"))
+
+
+class UserCache:
+    def __init__(self, ttl: float = AUTH_USER_CACHE_TTL_SEC, max_entries: int = AUTH_USER_CACHE_SIZE):
+        """A ``ttl`` of 0 disables caching (every lookup is a miss)."""
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._counters = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0, "invalidations": 0, "stale_puts": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                self._counters["expired"] += 1
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any, generation: Optional[int] = None) -> bool:
+        """Cache ``value``; False if caching is off or an invalidation happened since ``generation``."""
+        if not self.enabled:
+            return False
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                self._counters["stale_puts"] += 1
+                return False
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evicted"] += 1
+            return True
+
+    def invalidate(self, *keys: Hashable):
+        """Drop the given keys (or everything, when called without keys)."""
+        with self._lock:
+            self._generation += 1
+            self._counters["invalidations"] += 1
+            if not keys:
+                self._entries.clear()
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "enabled": self.enabled,
+                "ttl_sec": self.ttl,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+                **self._counters,
+            }
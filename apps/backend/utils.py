@@ -19,3 +19,17 @@ def generate_brief_summary(chat_log):
     ]
     result = chat_with_groq(prompt).content
     return result
+
+
+def extend_brief_summary(previous_summary, new_messages):
+    """Fold new messages into an existing summary instead of re-reading the whole chat."""
+    text = "\n".join(
+        f"{m['role'].capitalize()}: {m['content']}"
+        for m in new_messages if m['role'] in ['user', 'assistant', 'agent']
+    )[:5000]
+    prompt = [
+        {"role": "system", "content": "Update the conversation summary with the new messages. Keep it brief and clear, and return only the updated summary."},
+        {"role": "user", "content": f"Current summary:\n{previous_summary}\n\nNew messages:\n{text}"}
+    ]
+    result = chat_with_groq(prompt).content
+    return result
@@ -0,0 +1,121 @@
+"""
+WebSocket wire format.
+
+Outbound events are serialized exactly once with the fastest available JSON
+encoder (orjson, then msgspec, then the stdlib) and the resulting string is
+fanned out to every recipient. Inbound frames are decoded into small typed
+structs instead of raw dict lookups.
+"""
+import json
+from dataclasses import dataclass
+from typing import Optional, Union
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # optional speedup
+    msgspec = None
+
+
+if orjson is not None:
+    JSON_BACKEND = "orjson"
+
+    def encode(event: dict) -> str:
+        return orjson.dumps(event).decode("utf-8")
+
+    _loads = orjson.loads
+elif msgspec is not None:
+    JSON_BACKEND = "msgspec"
+    _msgspec_encoder = msgspec.json.Encoder()
+    _msgspec_decoder = msgspec.json.Decoder()
+
+    def encode(event: dict) -> str:
+        return _msgspec_encoder.encode(event).decode("utf-8")
+
+    _loads = _msgspec_decoder.decode
+else:
+    JSON_BACKEND = "json"
+    _stdlib_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+    def encode(event: dict) -> str:
+        return _stdlib_encoder.encode(event)
+
+    _loads = json.loads
+
+
+class FrameDecodeError(ValueError):
+    """Raised when an incoming frame is not valid JSON or misses required fields."""
+
+
+# -----------------------------------------------------------------------------
+# Incoming frames
+# -----------------------------------------------------------------------------
+@dataclass(slots=True)
+class UserMessageFrame:
+    message: str
+    session_id: Optional[str] = None
+    timestamp: Optional[str] = None
+
+
+@dataclass(slots=True)
+class AgentMessageFrame:
+    session_id: str
+    message: str
+
+
+@dataclass(slots=True)
+class TypingFrame:
+    session_id: Optional[str] = None
+
+
+@dataclass(slots=True)
+class UnknownFrame:
+    type: Optional[str]
+
+
+ClientFrame = Union[UserMessageFrame, AgentMessageFrame, TypingFrame, UnknownFrame]
+
+
+def _opt_str(data: dict, key: str) -> Optional[str]:
+    value = data.get(key)
+    return value if isinstance(value, str) else None
+
+
+def _message(data: dict, frame_type: str) -> str:
+    # missing/null is an empty message; anything else that isn't a string is rejected
+    value = data.get("message")
+    if value is None:
+        return ""
+    if not isinstance(value, str):
+        raise FrameDecodeError(f"{frame_type} message must be a string")
+    return value
+
+
+def decode_frame(raw: Union[str, bytes]) -> ClientFrame:
+    """Decode a client frame into its typed struct."""
+    try:
+        data = _loads(raw)
+    except Exception as e:
+        raise FrameDecodeError(f"Invalid JSON frame: {e}") from e
+    if not isinstance(data, dict):
+        raise FrameDecodeError("Frame must be a JSON object")
+
+    frame_type = data.get("type")
+    if frame_type == "user_message":
+        return UserMessageFrame(
+            message=_message(data, frame_type),
+            session_id=_opt_str(data, "session_id"),
+            timestamp=_opt_str(data, "timestamp"),
+        )
+    if frame_type == "agent_message":
+        session_id = data.get("session_id")
+        if not isinstance(session_id, str):
+            raise FrameDecodeError("agent_message requires session_id")
+        return AgentMessageFrame(session_id=session_id, message=_message(data, frame_type))
+    if frame_type == "typing":
+        return TypingFrame(session_id=_opt_str(data, "session_id"))
+    return UnknownFrame(type=frame_type if isinstance(frame_type, str) else None)
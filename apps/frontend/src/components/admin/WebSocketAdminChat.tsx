@@ -92,6 +92,13 @@ export function WebSocketAdminChat({ sessionId, agentId, onIntervene, showInterv
         } else {
             wsUrl = `ws://localhost:8000/ws/agent/${agentId}`
         }
+        // the agent socket requires the logged-in employee's token; replies are claimed in their name
+        const token = typeof window !== 'undefined' ? localStorage.getItem('chatbot_auth_token') : null
+        if (!token) {
+            setError('Please log in to join this conversation.')
+            return
+        }
+        wsUrl += `?token=${encodeURIComponent(token)}`
         const websocket = new WebSocket(wsUrl)
 
         websocket.onopen = () => {